@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cliente de referencia para LoRa BBS Gateway (MIT, ver LICENSE).
+
+Habla con el BBS a través de una Pico con el puente SLIP-LoRa:
+ - Envía cada línea tecleada en una trama SLIP con la dirección del nodo.
+ - Negocia compresión deflate con el diccionario del BBS ('+z <id>').
+ - Negocia el transporte fiable ('+r'): confirma los fragmentos con ACK
+   selectivos y los entrega en orden aunque se pierdan paquetes.
+ - Decodifica las tramas dirigidas a su dirección y las muestra, junto con las
+   de difusión (sala pública en vivo, siempre en texto plano).
+
+Uso:
+    python bbs_client.py /dev/ttyACM0 --addr 0001
+    python bbs_client.py --ratios      # mide la compresión por opción de menú
+    python bbs_client.py --profiles    # mide los bytes por opción en cada perfil
+"""
+import argparse
+import contextlib
+import io
+import sys
+import threading
+
+from bbs_server_rpi import (
+    BAUDRATE, BBS_ZDICT_ID, BROADCAST_ADDR, LORA_MTU, MENU_TEXT, PROFILES, SLIP_ADDR_LEN, ArqReceiver,
+    DeflateCodec, JobExecutor, LiveFilter, LoRaBBS, ReadCursors, SearchIndex, Session, SlipDecoder, lora_airtime, utf8_cut,
+)
+from plugins.trivia import TriviaPool, parse_trivia
+
+
+class BBSClient:
+    def __init__(self, port, baud, addr, compress=True, reliable=True):
+        import serial
+        self.ser = serial.Serial(port, baud, timeout=1.0)
+        self.addr = addr
+        self.compress = compress
+        self.arq = ArqReceiver() if reliable else None
+        self.live = LiveFilter()  # la difusión de la sala solo mientras el BBS dice que estamos en ella
+        self.lock = threading.Lock()
+
+    def send_line(self, text):
+        self._send((text + "\n").encode("utf-8"))
+
+    def _send(self, data):
+        payload = self.addr.to_bytes(SLIP_ADDR_LEN, "big") + data
+        with self.lock:
+            self.ser.write(LoRaBBS._slip_encode(payload))
+            self.ser.flush()
+
+    def _reader(self):
+        decoder = SlipDecoder()
+        while True:
+            data = self.ser.read(max(1, self.ser.in_waiting))
+            for addr, payload in decoder.feed(data):
+                if addr == BROADCAST_ADDR:
+                    sys.stdout.write(self.live.feed_broadcast(payload).decode("utf-8", errors="replace"))
+                    sys.stdout.flush()
+                    continue
+                if addr != self.addr:
+                    continue
+                bodies = [payload]
+                if self.arq and ArqReceiver.is_frame(payload):
+                    bodies, ack = self.arq.feed(payload)
+                    if ack:
+                        self._send(ack)
+                for body in bodies:
+                    if self.compress:
+                        body = DeflateCodec.decompress(body)
+                    sys.stdout.write(self.live.feed_session(body).decode("utf-8", errors="replace"))
+                sys.stdout.flush()
+
+    def run(self):
+        threading.Thread(target=self._reader, daemon=True).start()
+        # La primera línea abre la sesión; con '+r' y '+z' además pide transporte fiable y compresión
+        options = (["+r"] if self.arq else []) + ([f"+z {BBS_ZDICT_ID:08x}"] if self.compress else [])
+        self.send_line(" ".join(options) or "hola")
+        for line in sys.stdin:
+            self.send_line(line.rstrip("\r\n"))
+
+
+# ------------ Medición de compresión ------------
+SAMPLE_NEWS = [
+    "El Gobierno anuncia nuevas medidas económicas para el próximo trimestre",
+    "La selección nacional gana el partido amistoso por dos goles a uno",
+    "Suben los precios de la gasolina por tercera semana consecutiva",
+    "Científicos descubren una nueva especie de rana en la selva amazónica",
+    "El Banco Central mantiene sin cambios la tasa de interés de referencia",
+    "Alerta por lluvias intensas en la región norte durante el fin de semana",
+    "Inauguran el nuevo hospital general con capacidad para 300 pacientes",
+    "La inflación anual se ubica en su nivel más bajo de los últimos dos años",
+    "Investigadores desarrollan una batería que se carga en cinco minutos",
+    "Miles de personas asisten al festival de música en la capital",
+]
+SAMPLE_WIKI = (
+    "LoRa (de «long range», largo alcance) es una técnica de modulación de radio propietaria "
+    "derivada de la tecnología de espectro ensanchado por chirp (CSS). Fue desarrollada por Cycleo, "
+    "una empresa de Grenoble, Francia, adquirida por Semtech en 2012. LoRa utiliza bandas de radio "
+    "sin licencia, como 433 MHz, 868 MHz en Europa y 915 MHz en América, y permite la comunicación "
+    "a larga distancia con un consumo de energía muy bajo, por lo que se usa en redes de sensores "
+    "y en la Internet de las cosas.\n"
+)
+SAMPLE_LLM = (
+    "LoRa es una tecnología de comunicación inalámbrica de largo alcance y bajo consumo. "
+    "Permite enviar pequeños paquetes de datos a varios kilómetros de distancia usando "
+    "la modulación de espectro ensanchado por chirp. Es muy usada en la Internet de las cosas, "
+    "en redes de sensores agrícolas y en proyectos comunitarios como Meshtastic.\n"
+)
+SAMPLE_TRIVIA = (
+    "¿Qué significa LoRa?\nA) Low Rate\nB) Long Range\nC) Local Radio\nD) Long Radio\n"
+    "Respuesta: B\n"
+)
+SAMPLE_RATES = {"USD": 0.0588, "EUR": 0.0541, "JPY": 8.6712, "GBP": 0.0463}
+
+RATIO_SCRIPTS = {
+    "1": ["lora"],
+    "2": ["LoRa"],
+    "3": ["Madrid"],
+    "4": ["México"],
+    "5": ["1", "qué es LoRa", "salir"],
+    "6": ["viewpublic", "public hola a todos", "salir"],
+    "7": ["list", "read general", "salir"],
+    "8": ["B", "salir"],
+    "9": ["2025 12", "salir"],
+    "10": ["México"],
+    "0": [],
+}
+
+
+class _Capture:
+    """Sustituye a Radio y a su TxScheduler: acumula los bytes que saldrían por la radio."""
+    def __init__(self):
+        self.data = bytearray()
+        self.tx = self
+
+    def enqueue(self, sess, data):
+        self.data += data
+
+    def flush(self, sess):
+        pass
+
+
+class _NoMail:
+    """Buzón vacío para _Recorder (sin archivos)."""
+    log = None
+
+    def count(self, user):
+        return 0
+
+    def page(self, user, after=0, limit=5):
+        return [], 0
+
+
+class _NoCursors:
+    """Cursores de lectura en memoria para _Recorder (sin archivos)."""
+    log = None
+
+    def __init__(self):
+        self.pos = {}
+
+    def get(self, user):
+        return self.pos.get(user)
+
+    def advance(self, user, pos):
+        self.pos[user] = max(pos, self.pos.get(user, 0))
+
+    unseen = ReadCursors.unseen
+
+
+class _Recorder(LoRaBBS):
+    """LoRaBBS sin radio ni red: guarda lo enviado y lee la entrada de un guion."""
+    def __init__(self, profile="verbose"):
+        self.online_users = {"ana", "bob"}
+        self.plugins = {}
+        self.plugins_lock = threading.RLock()
+        self.plugin_times = {}
+        self.menu_text = MENU_TEXT
+        self.search = SearchIndex(path=None)
+        self.script = []
+        self.capture = _Capture()
+        self.radios = [self.capture]
+        self.handler_stats = {}
+        self.jobs = JobExecutor(self._deliver_job, workers=0)
+        self.job_results = {}
+        self._session = Session(1, self.capture)
+        self._session.name = "ana"
+        self._session.profile = profile
+        self.sessions = {1: self._session}
+        self.sessions_lock = threading.Lock()
+
+    @property
+    def session(self):
+        return self._session
+
+    def read_line_blocking(self, timeout=None, commands=True):
+        return self.script.pop(0) if self.script else "salir"
+
+    def _open_room(self, plugin):
+        return False  # el guion se recorre entero con run()
+
+    def _new_plugin(self, module):
+        """Los plugins con datos de ejemplo en memoria y sus consultas externas sustituidas."""
+        name = module.__name__.rsplit(".", 1)[1]
+        if name == "chat":
+            chat_public = [f"[2025-06-01 10:{i:02d}:00] ana: mensaje de prueba número {i}" for i in range(10)]
+            return module.Plugin(self, chat_public=chat_public, mailbox=_NoMail(), cursors=_NoCursors())
+        if name == "tablon":
+            return module.Plugin(self, boards={
+                "General": [{"user": "bob", "msg": "Reunión de radioaficionados el sábado",
+                             "timestamp": "2025-06-01 09:00:00"}], "LoRa": [], "Off-Topic": []})
+        if name == "trivia":
+            pool = TriviaPool(lambda: SAMPLE_TRIVIA, depth=0, path=None)
+            pool.questions.extend([parse_trivia(SAMPLE_TRIVIA)] * 3)
+            return module.Plugin(self, pool=pool)
+        plugin = module.Plugin(self)
+        stubs = {
+            "search_duckduckgo": lambda query: "LoRa - Wikipedia, la enciclopedia libre\n"
+                                               "https://es.wikipedia.org/wiki/LoRa\n",
+            "search_wikipedia": lambda term, lang="es": SAMPLE_WIKI,
+            "get_weather": lambda city: f"{city}: ⛅️  +18°C\n",
+            "get_news_google_rss": lambda country, hl="es-419":
+                f"Últimas noticias de {country.title()}:\n" + "".join(f"- {t}\n" for t in SAMPLE_NEWS),
+            "get_llm_models": lambda: (["qwen2.5-7b-instruct"], ""),
+            "stream_llm": lambda model, prompt, on_text, *args: on_text(SAMPLE_LLM) or SAMPLE_LLM,
+            "cached_answer": lambda model, prompt: None,
+            "fetch_rates": lambda base: (SAMPLE_RATES, ""),
+        }
+        for attr, fn in stubs.items():
+            if hasattr(plugin, attr):
+                setattr(plugin, attr, fn)
+        return plugin
+
+
+def _packets(data, pack):
+    """Empaqueta data como lo haría TxScheduler. Devuelve (bytes al aire, paquetes, airtime)."""
+    buf = bytearray(data)
+    total = count = 0
+    airtime = 0.0
+    while buf:
+        cut, packet = pack(buf)
+        del buf[:cut]
+        size = len(packet) + SLIP_ADDR_LEN
+        total += size
+        count += 1
+        airtime += lora_airtime(size)
+    return total, count, airtime
+
+
+def _run_option(option, profile="verbose"):
+    """Bytes que envía el BBS al ejecutar una opción del menú con su guion de ejemplo."""
+    rec = _Recorder(profile)
+    rec.script = list(RATIO_SCRIPTS[option])
+    with contextlib.redirect_stdout(io.StringIO()):  # sin los avisos de carga de plugins
+        rec._handle_command(option)
+    return bytes(rec.capture.data)
+
+
+def measure_profiles():
+    print(f"{'opción':>6} " + " ".join(f"{p:>8}" for p in PROFILES) + f" {'ahorro':>7}")
+    totals = [0] * len(PROFILES)
+    for option in RATIO_SCRIPTS:
+        sizes = [len(_run_option(option, p)) for p in PROFILES]
+        totals = [t + n for t, n in zip(totals, sizes)]
+        print(f"{option:>6} " + " ".join(f"{n:>8}" for n in sizes) + f" {1 - sizes[-1] / sizes[0]:>7.0%}")
+    print(f"{'total':>6} " + " ".join(f"{n:>8}" for n in totals) + f" {1 - totals[-1] / totals[0]:>7.0%}")
+
+
+def measure_ratios():
+    cap = LORA_MTU - SLIP_ADDR_LEN
+    codec = DeflateCodec()
+
+    def plain(buf):
+        cut = utf8_cut(buf, cap)
+        return cut, bytes(buf[:cut])
+
+    print(f"{'opción':>6} {'plano':>7} {'deflate':>8} {'ratio':>6} {'aire plano':>11} {'aire deflate':>13}")
+    totals = [0, 0, 0.0, 0.0]
+    for option in RATIO_SCRIPTS:
+        data = _run_option(option)
+        p_bytes, _, p_air = _packets(data, plain)
+        z_bytes, _, z_air = _packets(data, lambda buf: codec.pack(buf, cap))
+        totals = [totals[0] + p_bytes, totals[1] + z_bytes, totals[2] + p_air, totals[3] + z_air]
+        print(f"{option:>6} {p_bytes:>7} {z_bytes:>8} {z_bytes / p_bytes:>6.0%} {p_air:>10.1f}s {z_air:>12.1f}s")
+    print(f"{'total':>6} {totals[0]:>7} {totals[1]:>8} {totals[1] / totals[0]:>6.0%} "
+          f"{totals[2]:>10.1f}s {totals[3]:>12.1f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cliente de referencia LoRa BBS")
+    ap.add_argument("port", nargs="?", help="puerto serie de la Pico (ej. /dev/ttyACM0, COM5)")
+    ap.add_argument("--baud", type=int, default=BAUDRATE)
+    ap.add_argument("--addr", default="0001", help="dirección del nodo en hexadecimal")
+    ap.add_argument("--no-compress", action="store_true", help="no negociar compresión")
+    ap.add_argument("--no-reliable", action="store_true", help="no negociar transporte fiable")
+    ap.add_argument("--ratios", action="store_true", help="medir compresión por opción y salir")
+    ap.add_argument("--profiles", action="store_true", help="medir bytes por opción en cada perfil y salir")
+    args = ap.parse_args()
+    if args.ratios:
+        measure_ratios()
+        return
+    if args.profiles:
+        measure_profiles()
+        return
+    if not args.port:
+        ap.error("falta el puerto serie")
+    BBSClient(args.port, args.baud, int(args.addr, 16), compress=not args.no_compress,
+              reliable=not args.no_reliable).run()
+
+
+if __name__ == "__main__":
+    main()
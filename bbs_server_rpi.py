@@ -1,851 +1,2760 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-MIT License
-
-Copyright (c) 2025 Allan (Slam)
-
-Permission is hereby granted, free of charge, to any person obtaining a copy
-of this software and associated documentation files (the "Software"), to deal
-in the Software without restriction, including without limitation the rights
-to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
-copies of the Software, and to permit persons to whom the Software is
-furnished to do so, subject to the following conditions:
-
-The above copyright notice and this permission notice shall be included in all
-copies or substantial portions of the Software.
-
-THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
-AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
-LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
-OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
-SOFTWARE.
-
-LoRa BBS Gateway - versión 0.1
- - DuckDuckGo con parsing robusto (fallback regex).
- - Wikipedia con encoding UTF-8 y headers.
- - Ver clima.
- - Consultar noticias según país.
- - Consultar IA (LM Studio local).
- - Chat/Foro: mensajes públicos y privados.
- - Tablón de anuncios: categorías, función de añadir y leer.
- - Juego Trivia: usando LLM.
- - Calendario: actual y por fecha específica.
- - Tasa de cambios: ver valor actual según país. 
- - LLM: timeout 180s, bucle de prompts hasta 'salir'/'quit', cambio de modelo.
- - Sesión persistente, estable, solo responde a órdenes.
-"""
-import serial
-import threading
-import time
-import http.client
-import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
-import json
-import calendar
-from datetime import datetime  # (Opcional) usa time para timestamp
-import re
-# ---------------- CONFIG ----------------
-SERIAL_PORT = "COM14"  # /dev/ttyACM0 o /dev/ttyS0 en Linux
-BAUDRATE = 115200 # velocidad por defecto
-LM_BASE_URL = "127.0.0.1:1234"  # cambiar IP a servidor LM Studio local
-LLM_TIMEOUT = 180  # 3 min para carga de modelo
-# ------------ MENU PRINCIPAL -------------------
-MENU_TEXT = (    
-    "\n=== 📡 LoRa BBS Gateway v0.1 ===\n"    
-    "1) Buscar en DuckDuckGo\n"
-    "2) Buscar en Wikipedia\n"
-    "3) Ver clima actual\n"
-    "4) Noticias recientes (Google News)\n"
-    "5) Consultar LLM local\n"
-    "6) Chat/Foro\n"
-    "7) Tablón de anuncios\n"
-    "8) Jugar Trivia\n"
-    "9) Calendario\n"
-    "10) Tasas de Cambio\n"
-    "0) Créditos\n"
-    "q) Desconectar\n"
-    "> "
-)
-# ------------------------------------------------
-class LoRaBBS:
-    def __init__(self, port, baud):
-        self.ser = serial.Serial(port, baud, timeout=0.1)
-        self.lock = threading.Lock()
-        self.session_active = False
-        self.session_name = None
-        # --- Foro/Chat conf ---
-        self.online_users = set()
-        self.chat_public = []
-        self.private_messages = {}
-        self.chat_file = "chat_public.json"
-        self.private_file = "private_chat.json"
-        self.load_chat()
-        self.load_private()        
-        
-        # --- Tablero de anuncios ---
-        self.boards = {}  # {categoria: [{'user': msg, 'timestamp': ts}]}
-        self.boards_file = "boards.json"
-        self.load_boards()        
-        
-        # --- Juego interactivo por LLM ---
-        self.score = 0 # Puntaje por sesión
-        
-        # --- MultiTareas ---        
-        threading.Thread(target=self._reader_loop, daemon=True).start()
-        print(f"[*] Servidor BBS activo en {port} @ {baud} bps")
-
-    # --- utilidades ---
-    def send(self, text: str):
-        with self.lock:
-            self.ser.write(text.encode('utf-8', errors='ignore'))
-            self.ser.flush()
-
-    def read_line_blocking(self, timeout=None):
-        buf = b""
-        start = time.time()
-        while True:
-            if self.ser.in_waiting:
-                b = self.ser.read(1)
-                if b in (b'\n', b'\r'):
-                    if buf:
-                        break
-                    else:
-                        continue
-                buf += b
-            else:
-                if timeout and (time.time() - start) > timeout:
-                    break
-                time.sleep(0.02)
-        return buf.decode('utf-8', errors='ignore').strip()
-
-    # --- funcionalidades ---
-    def search_duckduckgo(self, query):
-        import http.client
-        import urllib.parse
-        import re
-
-        try:
-            q = urllib.parse.quote_plus(query)
-            conn = http.client.HTTPSConnection("duckduckgo.com", timeout=10)
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-                ),
-                "Accept-Language": "es-ES,es;q=0.9"
-            }
-
-            conn.request("GET", f"/html/?q={q}&kl=es-es", headers=headers)
-            resp = conn.getresponse()
-
-            if resp.status != 200:
-                conn.close()
-                return f"Error de servidor DuckDuckGo: {resp.status} {resp.reason}\n"
-
-            html = resp.read().decode('utf-8', errors='ignore')
-            conn.close()
-
-            # Patrón robusto: cualquier <a> que sea un resultado de búsqueda
-            pattern = (
-                r'<a[^>]+class="[^"]*result__a[^"]*"[^>]+href="([^"]+)"[^>]*>'
-                r'(.*?)</a>'
-            )
-
-            matches = re.findall(pattern, html, re.S | re.I)
-
-            # fallback: intentar encontrar la primera coincidencia aunque sea parcial
-            if not matches:
-                fb = re.search(pattern, html, re.S | re.I)
-                if fb:
-                    matches = [(fb.group(1), fb.group(2))]
-
-            if not matches:
-                return "No se encontraron resultados.\n"
-
-            link_raw, title_raw = matches[0]
-
-            # Limpieza del título
-            title = re.sub(r'<.*?>', '', title_raw)
-            title = re.sub(r'\s+', ' ', title).strip()
-            if len(title) > 200:
-                title = title[:200] + "..."
-
-            # Normalización del enlace
-            link = link_raw.strip()
-
-            # Formatos típicos de DuckDuckGo
-            if link.startswith('//'):
-                link = "https:" + link
-            elif link.startswith('/l/?uddg='):
-                # Redirección codificada
-                target = link.split("uddg=", 1)[1]
-                link = urllib.parse.unquote(target)
-            elif link.startswith('/'):
-                link = "https://duckduckgo.com" + link
-
-            return f"{title}\n{link}\n"
-
-        except Exception as e:
-            return f"Error DuckDuckGo: {e}\n"
-
-
-    def search_wikipedia(self, term, lang="es"):
-        try:
-            # Encoding robusto para títulos con acentos/español
-            title = urllib.parse.quote(term.replace(" ", "_").encode('utf-8').decode('utf-8'))
-            conn = http.client.HTTPSConnection(f"{lang}.wikipedia.org", timeout=10)
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            conn.request("GET", f"/api/rest_v1/page/summary/{title}", headers=headers)
-            resp = conn.getresponse()
-            raw = resp.read().decode('utf-8', errors='ignore')
-            conn.close()
-            if resp.status != 200:
-                return f"No se encontró página para '{term}' ({resp.status})\n"
-            data = json.loads(raw)
-            summary = data.get("extract") or "Sin resumen disponible."
-            if len(summary) > 900:
-                summary = summary[:900] + "..."
-            return f"{summary}\n"
-        except json.JSONDecodeError:
-            return f"Respuesta inválida de Wikipedia para '{term}'\n"
-        except Exception as e:
-            return f"Error Wikipedia: {e}\n"
-
-    def get_weather(self, city):
-        try:
-            conn = http.client.HTTPSConnection("wttr.in", timeout=6)
-            path = f"/{urllib.parse.quote(city)}?format=3"
-            conn.request("GET", path)
-            resp = conn.getresponse()
-            data = resp.read().decode('utf-8', errors='ignore')
-            conn.close()
-            return f"{data}\n"
-        except Exception as e:
-            return f"Error clima: {e}\n"
-
-    def get_news_google_rss(self, country, hl="es-419"):
-        # Mapeo de nombres de países comunes a códigos ISO (gl y ceid)
-        country_to_code = {
-            "México": "MX", "Mexico": "MX","MX":"MX",
-            "Estados Unidos": "US", "USA": "US", "United States": "US",
-            "España": "ES", "Spain": "ES",
-            "Argentina": "AR",
-            "Brasil": "BR", "Brazil": "BR",
-            "Chile": "CL",
-            "China":"CH",
-            "Colombia": "CO",
-            "Cuba":"CU","CU":"CU",
-            "Perú": "PE", "Peru": "PE",
-            "Puerto Rico":"PR",
-            "Venezuela": "VE",
-            "Francia": "FR", "France": "FR",
-            "Alemania": "DE", "Germany": "DE",
-            "Reino Unido": "GB", "UK": "GB", "United Kingdom": "GB",
-            "Italia": "IT", "Italy": "IT",
-            "Canadá": "CA", "Canada": "CA",
-            "Australia": "AU"            
-        }
-        code = country_to_code.get(country.title().strip(), None)
-        if code is None:
-            return f"País no reconocido: '{country}'. Usa ej. 'México', 'España', 'USA'.\n"
-        # Ajustar hl según el país (español para América Latina, es-ES para España)
-        if code == "ES":
-            hl = "es-ES"
-        try:
-            conn = http.client.HTTPSConnection("news.google.com", timeout=8)
-            conn.request("GET", f"/rss?hl={hl}&gl={code}&ceid={code}:{hl}")
-            resp = conn.getresponse()
-            xml_data = resp.read().decode('utf-8', errors='ignore')
-            conn.close()
-            root = ET.fromstring(xml_data)
-            items = root.findall(".//item")[:10]
-            if not items:
-                return "No hay noticias disponibles para este país.\n"
-            out = f"Últimas noticias de {country.title()}:\n"
-            for it in items:
-                title = it.findtext("title", "Sin título")
-                out += f"- {title}\n"
-            return out
-        except ET.ParseError:
-            return "Error al parsear el feed RSS.\n"
-        except Exception as e:
-            return f"Error noticias: {e}\n"
-
-    # --- LLM ---
-    def get_llm_models(self):
-        try:
-            conn = http.client.HTTPConnection(LM_BASE_URL, timeout=8)
-            conn.request("GET", "/v1/models")
-            resp = conn.getresponse()
-            raw = resp.read().decode('utf-8', errors='ignore')
-            conn.close()
-            if resp.status != 200:
-                return [], f"Error al obtener modelos ({resp.status})\n"
-            j = json.loads(raw)
-            if isinstance(j, dict) and "data" in j:
-                models = [m.get("id", "sin_id") for m in j["data"]]
-            elif isinstance(j, list):
-                models = [m.get("id", "sin_id") for m in j]
-            else:
-                models = ["modelo_por_defecto"]
-            return models, ""
-        except Exception as e:
-            return [], f"Error LLM/models: {e}\n"
-
-    def call_llm(self, model, prompt):
-        try:
-            conn = http.client.HTTPConnection(LM_BASE_URL, timeout=LLM_TIMEOUT)
-            payload = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 4096  # Aumentado para respuestas más largas; ajusta según el modelo si es necesario
-            }
-            body = json.dumps(payload)
-            headers = {"Content-Type": "application/json"}
-            conn.request("POST", "/v1/chat/completions", body, headers)
-            resp = conn.getresponse()
-            # Leer la respuesta completa hasta EOF
-            raw = b""
-            while True:
-                chunk = resp.read(4096)  # Leer en chunks para manejar respuestas muy grandes
-                if not chunk:
-                    break
-                raw += chunk
-            raw = raw.decode('utf-8', errors='ignore')
-            conn.close()
-            if resp.status != 200:
-                return f"Error LLM ({resp.status}): {raw}\n"
-            j = json.loads(raw)
-            text = None
-            if "choices" in j and len(j["choices"]) > 0:
-                c = j["choices"][0]
-                if isinstance(c, dict) and "message" in c and "content" in c["message"]:
-                    text = c["message"]["content"]
-                elif "text" in c:
-                    text = c["text"]
-            if not text:
-                text = json.dumps(j)
-            # Sin truncado: retorna el texto completo
-            return text + "\n"
-        except Exception as e:
-            return f"Error LLM/chat: {e}\n"
-    # --- Foro/Chat ---
-    # Añadir estos métodos nuevos a la clase LoRaBBS:
-    def load_chat(self):
-        try:
-            with open(self.chat_file, 'r', encoding='utf-8') as f:
-                self.chat_public = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.chat_public = []
-
-    def save_chat(self):
-        try:
-            with open(self.chat_file, 'w', encoding='utf-8') as f:
-                json.dump(self.chat_public, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
-
-    def load_private(self):
-        try:
-            with open(self.private_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.private_messages = {to_user: {sender: msg_list for sender, msg_list in senders.items()} 
-                                         for to_user, senders in data.items()}
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.private_messages = {}
-
-    def save_private(self):
-        try:
-            with open(self.private_file, 'w', encoding='utf-8') as f:
-                json.dump(self.private_messages, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
-
-    def chat_system(self):
-        self.send("=== Modo Chat/Foro ===\n")
-        self.send("Comandos:\n")
-        self.send("- public <mensaje>: Postear en sala pública\n")
-        self.send("- to <usuario> <mensaje>: Enviar privado (se guarda si no está presente)\n")
-        self.send("- getusers: Listar usuarios presentes\n")
-        self.send("- viewpublic: Ver últimos 10 mensajes públicos\n")
-        self.send("- viewprivate: Ver privados pendientes\n")
-        self.send("- salir: Volver al menú\n")
-        self.send("> ")
-        while True:
-            line = self.read_line_blocking()
-            if not line:
-                continue
-            cmd = line.strip()
-            if cmd.lower() == "salir":
-                break
-            elif cmd == "getusers":
-                if self.online_users:
-                    self.send(f"Usuarios presentes: {', '.join(sorted(self.online_users))}\n")
-                else:
-                    self.send("No hay usuarios presentes.\n")
-            elif cmd == "viewpublic":
-                if self.chat_public:
-                    recent = self.chat_public[-10:]
-                    self.send("Sala pública (últimos 10):\n---\n")
-                    for msg in recent:
-                        self.send(f"{msg}\n")
-                    self.send("---\n")
-                else:
-                    self.send("Sala pública vacía.\n")
-            elif cmd == "viewprivate":
-                if self.session_name in self.private_messages and self.private_messages[self.session_name]:
-                    self.send("Mensajes privados pendientes:\n---\n")
-                    for sender, msg_list in self.private_messages[self.session_name].items():
-                        for msg in msg_list:
-                            self.send(f"{sender}: {msg}\n")
-                    self.send("---\n")
-                else:
-                    self.send("No hay mensajes privados pendientes.\n")
-            elif cmd.startswith("public "):
-                msg = cmd[7:].strip()
-                if msg:
-                    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-                    entry = f"[{timestamp}] {self.session_name}: {msg}"
-                    self.chat_public.append(entry)
-                    self.save_chat()
-                    self.send("Mensaje enviado a la sala pública.\n")
-                else:
-                    self.send("Mensaje vacío, ignoro.\n")
-            elif cmd.startswith("to "):
-                parts = cmd[3:].split(maxsplit=1)
-                if len(parts) != 2:
-                    self.send("Uso: to <usuario> <mensaje>\n")
-                    continue
-                target, msg = parts[0].strip(), parts[1].strip()
-                if not msg:
-                    self.send("Mensaje vacío, ignoro.\n")
-                    continue
-                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-                stored_msg = f"[{timestamp}] {msg}"
-                if target not in self.private_messages:
-                    self.private_messages[target] = {}
-                if self.session_name not in self.private_messages[target]:
-                    self.private_messages[target][self.session_name] = []
-                self.private_messages[target][self.session_name].append(stored_msg)
-                self.save_private()
-                if target in self.online_users:
-                    self.send(f"Mensaje privado enviado a {target}.\n")
-                else:
-                    self.send(f"{target} no está presente. Mensaje guardado para cuando se conecte.\n")
-            else:
-                self.send("Comando desconocido. Revisa la ayuda implícita con los comandos.\n")
-        self.send("Saliendo del modo Chat/Foro.\n")
-    # --- Tablero de anuncios --- 
-    def load_boards(self):
-        try:
-            with open(self.boards_file, 'r', encoding='utf-8') as f:
-                self.boards = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.boards = {"General": [], "LoRa": [], "Off-Topic": []}
-
-    def save_boards(self):
-        try:
-            with open(self.boards_file, 'w', encoding='utf-8') as f:
-                json.dump(self.boards, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass 
-    def bulletin_system(self):
-        self.send("=== Tablón de Anuncios ===\nCategorías: General, LoRa, Off-Topic\n")
-        self.send("Comandos: list (categorías), read <cat>, post <cat> <msg>, salir\n> ")
-        while True:
-            line = self.read_line_blocking()
-            if not line:
-                continue
-            cmd = line.strip().lower()
-            if cmd == "salir":
-                break
-            elif cmd == "list":
-                self.send(f"Categorías disponibles: {', '.join(self.boards.keys())}\n")
-            elif cmd.startswith("read "):
-                cat = cmd[5:].strip().title()
-                if cat in self.boards:
-                    posts = self.boards[cat][-5:]  # Últimos 5
-                    self.send(f"Tablón '{cat}' (últimos 5):\n---\n")
-                    for post in posts:
-                        self.send(f"[{post['timestamp']}] {post['user']}: {post['msg']}\n")
-                    self.send("---\n")
-                else:
-                    self.send("Categoría no existe.\n")
-            elif cmd.startswith("post "):
-                parts = cmd[5:].split(maxsplit=1)
-                if len(parts) == 2:
-                    cat, msg = parts[0].strip().title(), parts[1].strip()
-                    if cat in self.boards and msg:
-                        ts = time.strftime("%Y-%m-%d %H:%M:%S")
-                        self.boards[cat].append({"user": self.session_name, "msg": msg, "timestamp": ts})
-                        self.save_boards()
-                        self.send("Post enviado.\n")
-                    else:
-                        self.send("Categoría inválida o mensaje vacío.\n")
-                else:
-                    self.send("Uso: post <cat> <msg>\n")
-            else:
-                self.send("Comando desconocido.\n")
-        self.send("Saliendo del tablón.\n")    
-    # --- Juego Trivia con LLM ---
-    def trivia_game(self):
-        self.send("=== Trivia Tech ===\nResponde preguntas generadas por LLM. ¡Acumula puntos!\n'salir' para parar.\n")
-        models, err = self.get_llm_models()
-        if err or not models:
-            self.send("Error en LLM. Juego cancelado.\n")
-            return
-        model = models[0]  # Usa el primero
-        self.score = 0
-        while True:
-            prompt = "Genera una pregunta trivia simple sobre tecnología/LoRa, con 4 opciones (A,B,C,D) y la respuesta correcta al final (ej. 'Respuesta: B'). Mantén corto."
-            q_out = self.call_llm(model, prompt)
-            self.send(f"Pregunta:\n{q_out}\nTu respuesta (A/B/C/D): ")
-            ans = self.read_line_blocking().strip().upper()
-            if ans.lower() == 'salir':
-                break
-            check_prompt = f"Pregunta: {q_out}\nRespuesta usuario: {ans}\n¿Es correcta? Responde solo 'Sí' o 'No'."
-            check = self.call_llm(model, check_prompt).strip().lower()
-            if 'sí' in check or 'si' in check:
-                self.score += 1
-                self.send("¡Correcto! +1 punto.\n")
-            else:
-                self.send("Incorrecto. Sigue intentándolo.\n")
-            self.send(f"Puntuación: {self.score}\n")
-        self.send(f"¡Fin del juego! Puntuación final: {self.score}\n")    
-    # --- Calendario ---    
-    def calendar_system(self):
-        self.send("=== 📅 Calendario ===\n")
-        # Configurar calendario con domingo como primer día (firstweekday=7)
-        cal = calendar.TextCalendar(firstweekday=7)
-        # Obtener mes actual
-        now = datetime.now()
-        year, month = now.year, now.month
-        # Generar calendario del mes actual
-        month_cal = cal.formatmonth(year, month, w=2, l=1)  # w=2 ancho día, l=1 líneas
-        # Reemplazar headers en inglés por español abreviado (D L M M J V S)
-        spanish_days = " D  L  M  M  J  V  S"
-        month_cal = month_cal.replace("Mo Tu We Th Fr Sa Su", spanish_days)
-        month_cal = month_cal.replace("Mo", " L").replace("Tu", " M").replace("We", " M").replace("Th", " J").replace("Fr", " V").replace("Sa", " S").replace("Su", " D")
-        # Nombres de meses en español (simple mapeo)
-        months_es = {1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril", 5: "Mayo", 6: "Junio",
-                     7: "Julio", 8: "Agosto", 9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"}
-        month_name = months_es.get(month, f"Mes {month}")
-        #self.send(f"{month_name} {year}\n")
-        self.send(month_cal)
-        self.send(f"\nMes actual: {month_name} {year}\n")
-        self.send("Ingresa año y mes (ej: 2025 12) para ver otro, o 'salir':\n> ")
-        while True:
-            line = self.read_line_blocking()
-            if not line:
-                continue
-            cmd = line.strip().lower()
-            if cmd == "salir":
-                break
-            parts = line.strip().split()
-            if len(parts) == 2:
-                try:
-                    y, m = int(parts[0]), int(parts[1])
-                    if 1 <= m <= 12:
-                        other_cal = cal.formatmonth(y, m, w=2, l=1)
-                        # Aplicar headers españoles
-                        other_cal = other_cal.replace("Mo Tu We Th Fr Sa Su", spanish_days)
-                        other_cal = other_cal.replace("Mo", " L").replace("Tu", " M").replace("We", " M").replace("Th", " J").replace("Fr", " V").replace("Sa", " S").replace("Su", " D")
-                        other_month = months_es.get(m, f"Mes {m}")
-                        #self.send(f"{other_month} {y}\n")
-                        self.send(other_cal)
-                    else:
-                        self.send("Mes inválido (1-12).\n")
-                except ValueError:
-                    self.send("Formato inválido. Usa: año mes (ej: 2025 12)\n")
-            self.send("Ingresa año y mes o 'salir':\n> ")
-        self.send("Saliendo del calendario.\n")
-    # --- Tasas de cambio ---
-    def exchange_rates_system(self):
-        self.send("=== 💱 Tasas de Cambio ===\n")
-        self.send("Ingresa el país (ej: México, España, USA, Japón):\n> ")
-        country_input = self.read_line_blocking().strip()
-        if not country_input:
-            self.send("País no ingresado.\n")
-            return
-
-        # Mapeo de países comunes a códigos de moneda base (ISO 4217)
-        country_to_currency = {
-            "México": "MXN", "Mexico": "MXN", "MX": "MXN",
-            "Cuba":"CUP",
-            "Estados Unidos": "USD", "USA": "USD", "United States": "USD", "US": "USD",
-            "España": "EUR", "Spain": "EUR", "ES": "EUR",
-            "Alemania": "EUR", "Germany": "EUR", "DE": "EUR",
-            "Francia": "EUR", "France": "EUR", "FR": "EUR",
-            "Italia": "IT", "Italy": "EUR",
-            "Reino Unido": "GBP", "UK": "GBP", "United Kingdom": "GBP", "GB": "GBP",
-            "Japón": "JPY", "Japan": "JPY", "JP": "JPY",
-            "Argentina": "ARS", "AR": "ARS",
-            "Brasil": "BRL", "Brazil": "BRL", "BR": "BRL",
-            "Chile": "CLP", "CL": "CLP",
-            "Colombia": "COP", "CO": "COP",
-            "Perú": "PEN", "Peru": "PEN", "PE": "PEN",
-            "Venezuela": "VES", "VE": "VES",
-            "Canadá": "CAD", "Canada": "CAD", "CA": "CAD",
-            "Australia": "AUD", "AU": "AUD",
-            "China": "CNY", "CH": "CNY"
-        }
-        base_currency = country_to_currency.get(country_input.title(), None)
-        if not base_currency:
-            self.send(f"País '{country_input}' no reconocido. Moneda base no disponible.\n")
-            self.send("Países disponibles: México, USA, España, UK, Japón, etc.\n")
-            return
-
-        self.send(f"Moneda base para {country_input}: {base_currency}\n")
-        self.send("Obteniendo tasas... (usando API gratuita)\n")
-
-        # Monedas fiat objetivo
-        fiat_targets = {"USD": "Dólar EE.UU.", "EUR": "Euro", "JPY": "Yen Japonés", "GBP": "Libra Esterlina"}
-
-        try:
-            # Fetch de exchangerate-api.com (gratuito, sin clave para uso básico)
-            url = f"https://api.exchangerate-api.com/v4/latest/{base_currency}"
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                rates = data.get('rates', {})
-
-            if not rates:
-                self.send("Error al obtener tasas fiat.\n")
-                return
-
-            self.send("Tasas de cambio (1 {base} ≈):\n".format(base=base_currency))
-            for code, name in fiat_targets.items():
-                rate = rates.get(code, 0)
-                if rate > 0:
-                    self.send(f"{name} ({code}): {rate:.4f}\n")
-                else:
-                    self.send(f"{name} ({code}): No disponible\n")
-
-        except Exception as e:
-            self.send(f"Error en tasas fiat: {e}\n")
-            return
-
-        # Opcional: Criptomonedas
-        """
-        self.send("\n¿Mostrar tasas a criptos (BTC, XMR, DASH, XRP)? (s/n):\n> ")
-        crypto_choice = self.read_line_blocking().strip().lower()
-        if crypto_choice in ('s', 'si', 'y', 'yes'):
-            self.send("Obteniendo tasas a criptos (usando CoinGecko API gratuita)...\n")
-            crypto_targets = {
-                "bitcoin": "BTC - Bitcoin",
-                "monero": "XMR - Monero",
-                "dash": "DASH - Dash",
-                "ripple": "XRP - Ripple"
-            }
-
-            try:
-                # Fetch de CoinGecko para precios en USD, luego convertir
-                # Primero, obtener precio de base en USD si no es USD
-                base_to_usd = 1.0 if base_currency == "USD" else rates.get("USD", 1.0)
-                usd_to_base = 1 / base_to_usd if base_to_base > 0 else 1.0
-
-                # IDs de CoinGecko para criptos
-                crypto_ids = "bitcoin,monero,dash,ripple"
-                url_crypto = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_ids}&vs_currencies=usd"
-                with urllib.request.urlopen(url_crypto, timeout=10) as response:
-                    crypto_data = json.loads(response.read().decode('utf-8'))
-
-                self.send("Tasas de cambio a criptos (1 {base} ≈):\n".format(base=base_currency))
-                for id_, name in crypto_targets.items():
-                    usd_price = crypto_data.get(id_, {}).get('usd', 0)
-                    if usd_price > 0:
-                        # crypto por base: (usd_price / base_to_usd)
-                        crypto_per_base = usd_price / base_to_usd
-                        self.send(f"{name}: {crypto_per_base:.8f}\n")
-                    else:
-                        self.send(f"{name}: No disponible\n")
-
-            except Exception as e:
-                self.send(f"Error en tasas cripto: {e}\n")
-                return
-        """
-        self.send("\nSaliendo de Tasas de Cambio.\n")
-    # --- bucle principal ---
-    def _reader_loop(self):
-        while True:
-            try:
-                if not self.session_active:
-                    line = self.read_line_blocking(timeout=1)  # Polling ligero
-                    if line:
-                        self.session_active = True
-                        self.send("\n>>> Conexión aceptada.\n")
-                        #self.send(MENU_TEXT) # mostrar el menu directamente
-                        self.send("Nombre de usuario:\n> ")
-                        name = self.read_line_blocking(timeout=30)
-                        if name:
-                            self.session_name = name.strip() or "Anon"
-                        else:
-                            self.session_name = "Anon"
-                        self.online_users.add(self.session_name)
-                        self.send(f"Bienvenido a LoRa BBS Gateway v0.1, {self.session_name}!\n")
-                        # Mostrar privados pendientes al conectar
-                        if self.session_name in self.private_messages and self.private_messages[self.session_name]:
-                            self.send("Tienes mensajes privados pendientes:\n---\n")
-                            for sender, msg_list in list(self.private_messages[self.session_name].items()):
-                                for msg in msg_list:
-                                    self.send(f"{sender}: {msg}\n")
-                            del self.private_messages[self.session_name]
-                            self.save_private()
-                            self.send("---\n(Mensajes leídos y eliminados.)\n")
-                        self.send(MENU_TEXT)
-                    continue
-
-                cmd = self.read_line_blocking()
-                if not cmd:
-                    continue
-                cmd = cmd.strip()
-                if cmd.lower() in ("q", "quit", "exit", "disconnect"):
-                    self.online_users.discard(self.session_name)
-                    self.send("Desconectando sesión...\n")
-                    self.ser.flush()
-                    self.session_active = False
-                    continue
-
-                if cmd == "1":
-                    self.send("Término para buscar (DuckDuckGo):\n> ")
-                    q = self.read_line_blocking(timeout=30)
-                    if q:
-                        out = self.search_duckduckgo(q)
-                        self.send(out)
-                    else:
-                        self.send("Sin entrada.\n")
-                    self.send(MENU_TEXT)
-                    continue
-
-                if cmd == "2":
-                    self.send("Término para Wikipedia:\n> ")
-                    q = self.read_line_blocking(timeout=30)
-                    if q:
-                        out = self.search_wikipedia(q)
-                        self.send(out)
-                    else:
-                        self.send("Sin entrada.\n")
-                    self.send(MENU_TEXT)
-                    continue
-
-                if cmd == "3":
-                    self.send("Ciudad para el clima:\n> ")
-                    q = self.read_line_blocking(timeout=30)
-                    if q:
-                        out = self.get_weather(q)
-                        self.send(out)
-                    else:
-                        self.send("Sin entrada.\n")
-                    self.send(MENU_TEXT)
-                    continue
-
-                if cmd == "4":
-                    self.send("País para ver noticias:\n>")
-                    q = self.read_line_blocking(timeout=30)
-                    if q:
-                        out = self.get_news_google_rss(q)
-                        self.send(out)
-                    else:
-                        self.send("Sin entrada.\n")
-                    self.send(MENU_TEXT)
-                    continue
-
-                if cmd == "5":
-                    models, err = self.get_llm_models()
-                    if err:
-                        self.send(err)
-                        self.send(MENU_TEXT)
-                        continue
-                    if not models:
-                        self.send("No hay modelos disponibles.\n")
-                        self.send(MENU_TEXT)
-                        continue
-                    self.send("Modelos disponibles:\n")
-                    for i, m in enumerate(models):
-                        self.send(f"{i+1}) {m}\n")
-                    self.send("Selecciona modelo (número o nombre):\n> ")
-                    choice = self.read_line_blocking(timeout=40)
-                    if not choice:
-                        self.send("Sin selección.\n")
-                        self.send(MENU_TEXT)
-                        continue
-                    if choice.isdigit() and 1 <= int(choice) <= len(models):
-                        model = models[int(choice)-1]
-                    else:
-                        model = choice.strip()
-                    self.send(f"\nUsando modelo: {model}\n")
-                    self.send("Comandos: 'modelos' para cambiar, 'salir'/'quit' para volver al menú\n")
-                    while True:
-                        self.send("Prompt:\n> ")
-                        prompt = self.read_line_blocking(timeout=120)
-                        if not prompt:
-                            self.send("Tiempo agotado. Intenta de nuevo.\n")
-                            continue
-                        p_lower = prompt.lower().strip()
-                        if p_lower in ("salir", "quit"):
-                            self.send("Saliendo del modo LLM...\n")
-                            break
-                        if p_lower in ("modelos", "modelo", "cambiar"):
-                            models, err = self.get_llm_models()
-                            if err:
-                                self.send(err)
-                                continue
-                            self.send("Modelos disponibles:\n")
-                            for i, m in enumerate(models):
-                                self.send(f"{i+1}) {m}\n")
-                            self.send("Selecciona nuevo modelo:\n> ")
-                            new_choice = self.read_line_blocking(timeout=40)
-                            if new_choice:
-                                if new_choice.isdigit() and 1 <= int(new_choice) <= len(models):
-                                    model = models[int(new_choice)-1]
-                                else:
-                                    model = new_choice.strip()
-                                self.send(f"Modelo cambiado a: {model}\n")
-                            continue
-                        out = self.call_llm(model, prompt)
-                        self.send(out)
-                        self.send("(Escribe otro prompt, 'modelos' para cambiar o 'salir'/'quit' para volver)\n")
-                    self.send(MENU_TEXT)
-                    continue
-                if cmd == "6":
-                    self.chat_system()
-                    self.send(MENU_TEXT)
-                    continue  
-                if cmd == "7": 
-                    self.bulletin_system();
-                    self.send(MENU_TEXT); 
-                    continue   
-                if cmd == "8":
-                    self.trivia_game()
-                    self.send(MENU_TEXT)
-                    continue
-                if cmd == "9":
-                    self.calendar_system()
-                    self.send(MENU_TEXT)
-                    continue
-                if cmd == "10":
-                    self.exchange_rates_system()
-                    self.send(MENU_TEXT)
-                    continue    
-                if cmd == "0":
-                    self.send("Hecho por Slam (2025)\n")
-                    self.send("Github.com: https://github.com/aayes89\n")
-                    self.send(MENU_TEXT)
-                    continue
-                self.send("Comando desconocido.\n")
-                self.send(MENU_TEXT)
-            except Exception as e:
-                print(f"[ERROR en reader_loop] {e}")
-                time.sleep(1)
-
-def main():
-    bbs = LoRaBBS(SERIAL_PORT, BAUDRATE)
-    while True:
-        time.sleep(1)
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MIT License
+
+Copyright (c) 2025 Allan (Slam)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+LoRa BBS Gateway - versión 0.1
+ - DuckDuckGo con parsing robusto (fallback regex).
+ - Wikipedia con encoding UTF-8 y headers.
+ - Ver clima.
+ - Consultar noticias según país.
+ - Consultar IA (LM Studio local).
+ - Chat/Foro: mensajes públicos y privados (buzón paginado, se borran al confirmar con 'ack').
+ - Tablón de anuncios: categorías, función de añadir y leer.
+ - Juego Trivia: usando LLM, con preguntas pregeneradas y corrección local.
+ - Calendario: actual y por fecha específica.
+ - Tasa de cambios: ver valor actual según país. 
+ - Tasas cruzadas entre cualquier par de monedas y conversión de importes, con una sola tabla de referencia.
+ - LLM: timeout 180s, bucle de prompts hasta 'salir'/'quit', cambio de modelo.
+ - LLM en streaming: el texto sale por radio a medida que se genera ('stop' lo corta).
+ - Sesión persistente, estable, solo responde a órdenes.
+ - Multisesión: una sesión por nodo remoto (dirección de la trama SLIP).
+ - Sesiones en espera (menú, chat, tablón) sin hilo propio: un hilo solo mientras hay una línea que atender.
+ - Varias radios (RADIOS) en un solo proceso: estado compartido, cola y duty cycle por radio.
+ - Compresión deflate opcional con diccionario del BBS (negociada con '+z').
+ - Transporte fiable opcional ('+r'): fragmentos numerados, ACK selectivo y repetición solo de lo perdido.
+ - Perfiles de salida por sesión (completo, compacto, mínimo) para ahorrar aire.
+ - Respuestas largas paginadas: solo sale la primera página, el resto con 'more' ('skip' descarta).
+ - Caché de consultas externas (TTL por fuente, LRU, persistente, sirve datos viejos sin red).
+ - Respuestas del LLM en caché por modelo y prompt normalizado: una pregunta repetida sale al momento.
+ - Precarga periódica de noticias, clima y tasas configurados (respuesta al momento, con su edad).
+ - Consultas lentas (red, LLM) en segundo plano: 'jobs', 'cancel N', 'resultados'.
+ - Cliente HTTP con conexiones persistentes por host (sin handshake TLS en cada consulta).
+ - Chat, privados y tablón en registros solo-anexar (JSON Lines) con escritura agrupada.
+ - Sala pública en vivo: cada mensaje sale una sola vez, en una trama de difusión para todos los nodos.
+ - Búsqueda en chat y tablón ('search <término>'): índice invertido incremental, sin tildes.
+ - Métricas: histogramas de latencia, bytes, tiempo al aire, caché y errores por
+   integración, en formato Prometheus (HTTP local o archivo) y con 'metricas' para operadores.
+ - Opciones del menú como plugins (plugins/): se importan al primer uso y se pueden desactivar.
+"""
+import serial
+import threading
+import time
+import queue
+import contextvars
+import array
+import bisect
+import collections
+import contextlib
+import math
+import zlib
+import unicodedata
+import os
+import http.client
+import http.server
+import urllib.parse
+import json
+import re
+import importlib
+import sys
+# ---------------- CONFIG ----------------
+SERIAL_PORT = "COM14"  # /dev/ttyACM0 o /dev/ttyS0 en Linux
+# Varias Picos en un mismo BBS, p. ej. una por frecuencia o SF: ((puerto, SF, descripción), ...)
+# (("/dev/ttyACM0", 9, "433.175 MHz SF9"), ("/dev/ttyACM1", 7, "434.665 MHz SF7")). Vacío = solo SERIAL_PORT.
+RADIOS = ()
+BAUDRATE = 115200 # velocidad por defecto
+LM_BASE_URL = "127.0.0.1:1234"  # cambiar IP a servidor LM Studio local
+LLM_TIMEOUT = 180  # 3 min para carga de modelo
+LLM_MAX_TOKENS = 1024  # tope de tokens por respuesta en streaming (ajustable con 'limite')
+LLM_MAX_BYTES = 2048  # tope de bytes enviados por respuesta (ajustable con 'limite')
+LLM_STREAM_CHUNK = 180  # bytes acumulados antes de mandar un trozo a la radio
+LLM_STREAM_FLUSH = 2.0  # o segundos desde el último trozo, lo que ocurra antes
+SERIAL_READ_TIMEOUT = None  # lectura bloqueante hasta el primer byte; el hilo lector no despierta en reposo
+SLIP_ADDR_LEN = 2  # bytes de dirección del nodo al inicio de cada trama SLIP
+BROADCAST_ADDR = 0xFFFF  # dirección de difusión: todos los nodos a su alcance decodifican la trama
+SLIP_MAX_FRAME = 1024  # descarta tramas sin cierre que crezcan más allá de esto
+SESSION_IDLE_TIMEOUT = 600  # segundos sin actividad antes de cerrar una sesión
+# ------------- RADIO (SX1278) -------------------
+LORA_MTU = 255  # payload máximo por paquete LoRa
+LORA_SF = 9  # spreading factor
+LORA_BW = 125000  # ancho de banda en Hz
+LORA_CR = 1  # coding rate 4/(4+CR) -> 1 = 4/5
+LORA_PREAMBLE = 8  # símbolos de preámbulo
+LORA_DUTY_CYCLE = 0.10  # fracción de tiempo al aire permitida (ETSI 433 MHz: 10%)
+LORA_DUTY_WINDOW = 3600  # ventana de cálculo del duty cycle en segundos
+TX_FLUSH_DELAY = 0.15  # segundos que se espera para agrupar send() en un paquete
+TX_REPORT_INTERVAL = 300  # cada cuánto se imprime el uso de aire por sesión
+RADIO_MOVE_DUTY = 0.5  # con varias radios: al entrar, si la del nodo pasa de este uso del duty cycle se sugiere otra
+COMPRESSION_ENABLED = True  # permitir que los clientes negocien compresión ('+z')
+DEFAULT_PROFILE = "verbose"  # perfil de salida inicial: verbose, compact o terse
+PAGE_BYTES = 600  # bytes por página de respuesta (ajustable con 'pagina <bytes>', 0 = sin paginar)
+PAGER_IDLE_TIMEOUT = 300  # segundos que se guarda el resto de una respuesta esperando 'more'
+# ------------- TRANSPORTE FIABLE ('+r') ---------
+ARQ_ENABLED = True  # permitir que los clientes negocien fragmentos numerados con ACK selectivo
+ARQ_WINDOW = 8  # fragmentos sin confirmar como máximo (hasta 16, lo que cabe en el mapa del ACK)
+ARQ_WINDOW_AIRTIME = 8.0  # ...y no más de estos segundos al aire por ventana
+ARQ_ACK_MARGIN = 1.5  # espera extra del ACK, además del aire del fragmento y del propio ACK
+ARQ_MAX_TRIES = 5  # esperas de ACK vencidas seguidas antes de dar el nodo por perdido
+# ------------- CACHÉ DE CONSULTAS ---------------
+CACHE_FILE = "cache.json"  # None para no guardar la caché en disco
+CACHE_TTL = {  # segundos que una respuesta se considera fresca, por fuente
+    "duckduckgo": 6 * 3600,
+    "wikipedia": 24 * 3600,
+    "weather": 30 * 60,
+    "news": 20 * 60,
+    "rates": 60 * 60,
+    "llm": 7 * 24 * 3600,  # respuestas completas del modo LLM por modelo y prompt normalizado
+}
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_BYTES = 512 * 1024
+CACHE_STALE_MAX = 3 * 24 * 3600  # si la red falla, servir datos viejos hasta esta edad
+CACHE_SAVE_INTERVAL = 60  # segundos mínimos entre escrituras a disco
+# ------------- PRECARGA (consultas más pedidas) -
+WARM_COUNTRIES = ("México", "España")  # noticias (opción 4)
+WARM_CITIES = ("Ciudad de México", "Madrid")  # clima (opción 3)
+WARM_RATES = True  # tabla de referencia de tasas (opción 10)
+WARM_LEAD = 0.8  # refrescar al llegar a esta fracción del TTL de su fuente
+WARM_HOURS = None  # horas permitidas, ej. range(0, 7) para la tarifa nocturna del enlace; None = siempre
+WARM_POLL = 60  # segundos entre revisiones
+RATES_REFERENCE = "USD"  # única tabla que se descarga; el resto de pares se calcula en memoria
+# ------------- TRABAJOS EN SEGUNDO PLANO --------
+JOB_WORKERS = 2  # hilos para consultas lentas (LLM, búsquedas, clima, noticias)
+JOB_QUEUE_MAX = 16  # trabajos en espera como máximo
+JOB_INLINE_WAIT = 1.0  # si termina antes de esto, la respuesta sale directa sin aviso de cola
+JOB_INBOX_MAX = 10  # resultados guardados por usuario desconectado
+# ------------- HTTP (conexiones persistentes) ---
+HTTP_POOL_MAX_IDLE = 2  # conexiones abiertas en reposo por host
+HTTP_IDLE_TIMEOUT = 30  # segundos en reposo antes de cerrar una conexión
+HTTP_HOST_OVERRIDES = {}  # {host: "http://ip:puerto"} para usar espejos o servidores de prueba
+# ------------- ALMACENAMIENTO -------------------
+CHAT_LOG = "chat_public.jsonl"  # un registro JSON por línea, solo se añade al final
+PRIVATE_LOG = "private_chat.jsonl"
+CHAT_CURSORS_LOG = "chat_cursors.jsonl"  # hasta qué mensaje de la sala pública leyó cada usuario
+BOARDS_LOG = "boards_{}.jsonl"  # un archivo por categoría
+BOARD_CATEGORIES = ("General", "LoRa", "Off-Topic")
+STORE_COMMIT_DELAY = 0.2  # segundos que se juntan escrituras antes de un único write+fsync
+PRIVATE_COMPACT_MIN = 200  # registros de privados antes de considerar compactar
+MAIL_PAGE = 5  # privados mostrados por página ('viewprivate', 'next')
+CHAT_NEW_PAGE = 10  # mensajes públicos nuevos por página ('new'); también los "nuevos" de un usuario sin cursor
+CURSORS_COMPACT_MIN = 200  # registros de cursores antes de considerar compactar
+CHAT_LIVE = True  # difundir al momento los mensajes públicos a quien está en la sala
+CHAT_LIVE_DEFAULT = True  # suscripción inicial de cada sesión ('live on|off' en Chat/Foro)
+LIVE_ON = "\x0e"  # marca en la salida de un nodo: muestra la difusión de la sala ("\x0e<nick>\x1f")
+LIVE_OFF = "\x0f"  # marca en la salida de un nodo: deja de mostrarla (salió de la sala o 'live off')
+LIVE_FROM = "\x1e"  # cada mensaje difundido empieza por "\x1e<nick de quien publica>\x1f"
+LIVE_SEP = "\x1f"
+# ------------- BÚSQUEDA -------------------------
+SEARCH_INDEX_FILE = "search_index.json"  # índice de chat y tablón (se rehace desde los registros si falta)
+SEARCH_HITS = 5  # resultados mostrados por búsqueda
+SEARCH_SNIPPET = 60  # caracteres de texto por resultado
+SEARCH_STOPWORDS = frozenset("de la el en y a los las del que un una por con para se al lo es no su".split())
+# ------------- TRIVIA ---------------------------
+TRIVIA_POOL_FILE = "trivia_pool.json"  # preguntas pregeneradas (sobreviven a reinicios)
+TRIVIA_POOL_DEPTH = 10  # preguntas listas que se intentan mantener
+TRIVIA_PROMPT = ("Genera una pregunta trivia simple sobre tecnología/LoRa, con 4 opciones (A,B,C,D) "
+                 "y la respuesta correcta al final (ej. 'Respuesta: B'). Mantén corto.")
+# ------------- MÉTRICAS -------------------------
+METRICS_PORT = 9108  # /metrics en formato Prometheus en 127.0.0.1 (None = desactivado)
+METRICS_FILE = None  # o escribir el mismo texto aquí cada TX_REPORT_INTERVAL (node_exporter textfile)
+METRICS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180)  # segundos
+OPERATORS = ()  # nicks que pueden usar 'metricas' por radio (el terminal serie directo siempre puede)
+# ------------- PLUGINS (opciones del menú) -----
+PLUGINS = {  # opción -> módulo de plugins/; se importa la primera vez que alguien la elige
+    "1": "duckduckgo", "2": "wikipedia", "3": "clima", "4": "noticias", "5": "llm",
+    "6": "chat", "7": "tablon", "8": "trivia", "9": "calendario", "10": "tasas",
+}
+PLUGINS_DISABLED = ()  # módulos que no se cargan nunca, ej. ("llm", "trivia") sin LM Studio
+# ------------ MENU PRINCIPAL -------------------
+MENU_TEXT = (    
+    "\n=== 📡 LoRa BBS Gateway v0.1 ===\n"    
+    "1) Buscar en DuckDuckGo\n"
+    "2) Buscar en Wikipedia\n"
+    "3) Ver clima actual\n"
+    "4) Noticias recientes (Google News)\n"
+    "5) Consultar LLM local\n"
+    "6) Chat/Foro\n"
+    "7) Tablón de anuncios\n"
+    "8) Jugar Trivia\n"
+    "9) Calendario\n"
+    "10) Tasas de Cambio\n"
+    "0) Créditos\n"
+    "q) Desconectar\n"
+    "> "
+)
+# ------------ PERFILES DE SALIDA ----------------
+# verbose: todo tal cual. compact: menú en una línea, cabeceras cortas y solo ASCII.
+# terse: como compact pero sin cabeceras ni ayudas.
+PROFILES = ("verbose", "compact", "terse")
+PROFILE_ALIASES = {"v": "verbose", "completo": "verbose", "c": "compact", "compacto": "compact",
+                   "t": "terse", "minimo": "terse", "mínimo": "terse"}
+MENU_PROMPT_COMPACT = "[1-10,0,q m=menu]> "
+MENU_PROMPT_TERSE = "> "
+_ASCII_MAP = str.maketrans({"≈": "~", "°": "o", "«": '"', "»": '"', "“": '"', "”": '"', "‘": "'",
+                            "’": "'", "–": "-", "—": "-", "…": "...", "€": "EUR", "¿": "", "¡": ""})
+
+
+def to_ascii(text):
+    """Translitera acentos (á -> a, ñ -> n) y elimina emoji: un byte por carácter."""
+    text = unicodedata.normalize("NFKD", text.translate(_ASCII_MAP))
+    return text.encode("ascii", "ignore").decode("ascii")
+# ------------ COMPRESIÓN ------------------------
+# Diccionario precargado para deflate: textos fijos del BBS y palabras frecuentes.
+# Lo más repetido va al final (deflate alcanza mejor las distancias cortas).
+# Cliente y servidor deben usar exactamente el mismo: se identifica por su adler32.
+ZDICT_PHRASES = (
+    " de la ", " que ", " en el ", " los ", " las ", " para ", " por ", " con ", " una ", " del ",
+    "Dólar EE.UU. (USD): ", "Euro (EUR): ", "Yen Japonés (JPY): ", "Libra Esterlina (GBP): ",
+    "Tasas de cambio (1 ", "Moneda base para ", "Obteniendo tasas... (usando API gratuita)\n",
+    " D  L  M  M  J  V  S\n", "Ingresa año y mes o 'salir':\n> ", "Mes actual: ",
+    "Pregunta:\n", "Tu respuesta (A/B/C/D): ", "Respuesta: ", "¡Correcto! +1 punto.\n",
+    "Incorrecto. Sigue intentándolo.\n", "Puntuación: ",
+    "Comandos: list (categorías), read <cat>, post <cat> <msg>, search <término>, salir\n",
+    "Categorías: General, LoRa, Off-Topic\n", "Post enviado.\n",
+    "Comandos:\n- public <mensaje>: Postear en sala pública\n"
+    "- to <usuario> <mensaje>: Enviar privado (se guarda si no está presente)\n"
+    "- getusers: Listar usuarios presentes\n- viewpublic: Ver últimos 10 mensajes públicos\n"
+    "- viewprivate: Ver privados pendientes (de a 5; 'next' sigue)\n"
+    "- ack [id ...]: Borrar privados ya leídos\n- search <término>: Buscar en la sala pública\n"
+    "- salir: Volver al menú\n",
+    "Mensaje enviado a la sala pública.\n", "Mensajes privados pendientes:\n---\n",
+    "Modelos disponibles:\n", "Prompt:\n> ",
+    "(Escribe otro prompt, 'modelos' para cambiar o 'salir'/'quit' para volver)\n",
+    "Últimas noticias de ", "Error ", "Sin entrada.\n", "Comando desconocido.\n", "Saliendo del ",
+)
+BBS_ZDICT = ("".join(ZDICT_PHRASES) + MENU_TEXT).encode("utf-8")
+BBS_ZDICT_ID = zlib.adler32(BBS_ZDICT)
+# ------------- TRAMAS SLIP ---------------------
+SLIP_END = 0xC0
+SLIP_ESC = 0xDB
+SLIP_ESC_END = 0xDC
+SLIP_ESC_ESC = 0xDD
+
+
+class SlipDecoder:
+    """Decodificador incremental de tramas SLIP.
+
+    feed() recibe bloques de bytes tal como llegan del puerto y devuelve una
+    lista de (dirección, datos): las tramas completas con su dirección de
+    origen y el texto plano recibido fuera de tramas con dirección None.
+    """
+    END = bytes([SLIP_END])
+
+    def __init__(self, addr_len=SLIP_ADDR_LEN):
+        self.addr_len = addr_len
+        self.frame = bytearray()
+        self.in_frame = False
+        self.discard = False  # trama demasiado larga: se ignora hasta su END
+
+    def feed(self, data):
+        out = []
+        view = memoryview(data)
+        pos, n = 0, len(data)
+        while pos < n:
+            end = data.find(self.END, pos)
+            stop = n if end < 0 else end
+            if self.in_frame:
+                if not self.discard:
+                    self.frame += view[pos:stop]
+                    if len(self.frame) > SLIP_MAX_FRAME:
+                        self.frame.clear()
+                        self.discard = True  # el resto no es texto plano: puede llegar en otras lecturas
+            elif stop > pos:
+                out.append((None, bytes(view[pos:stop])))
+            if end < 0:
+                break
+            if self.discard:
+                self.discard = False
+                self.in_frame = False  # el END que cierra la trama descartada
+            elif self.in_frame and self.frame:
+                payload = self._unescape(self.frame)
+                if len(payload) > self.addr_len:
+                    addr = int.from_bytes(payload[:self.addr_len], "big")
+                    out.append((addr, payload[self.addr_len:]))
+                self.frame.clear()
+                self.in_frame = False  # tras una trama completa se vuelve a texto plano
+            else:
+                self.in_frame = True  # END abre una trama (END END también)
+            pos = end + 1
+        return out
+
+    @staticmethod
+    def _unescape(frame):
+        # En una trama válida cada ESC va seguido de ESC_END o ESC_ESC
+        return (bytes(frame)
+                .replace(bytes([SLIP_ESC, SLIP_ESC_END]), bytes([SLIP_END]))
+                .replace(bytes([SLIP_ESC, SLIP_ESC_ESC]), bytes([SLIP_ESC])))
+
+
+class LineBuffer:
+    """Acumula bytes y entrega líneas completas en cuanto llega CR o LF."""
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        self.buf += data
+        last = max(self.buf.rfind(b"\n"), self.buf.rfind(b"\r"))
+        if last < 0:
+            return []
+        chunk = bytes(self.buf[:last])
+        del self.buf[:last + 1]
+        lines = (p.decode('utf-8', errors='ignore').strip() for p in re.split(rb'[\r\n]', chunk))
+        return [line for line in lines if line]
+
+
+def utf8_cut(buf, limit):
+    """Mayor n <= limit tal que buf[:n] no parte un carácter UTF-8."""
+    cut = min(limit, len(buf))
+    while 1 < cut < len(buf) and (buf[cut] & 0xC0) == 0x80:
+        cut -= 1
+    return cut
+
+
+class DeflateCodec:
+    """Compresión por paquete con deflate crudo y diccionario BBS_ZDICT.
+
+    Cada paquete se comprime por separado (una pérdida no arrastra a los
+    siguientes) y lleva un byte de marca: 0x01 deflate, 0x00 texto plano
+    cuando comprimir no ahorra nada.
+    """
+    MARK_PLAIN = 0x00
+    MARK_DEFLATE = 0x01
+
+    @staticmethod
+    def compress(data):
+        c = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict=BBS_ZDICT)
+        return c.compress(data) + c.flush()
+
+    @staticmethod
+    def decompress(payload):
+        if payload[:1] == bytes([DeflateCodec.MARK_DEFLATE]):
+            d = zlib.decompressobj(-15, zdict=BBS_ZDICT)
+            return d.decompress(payload[1:]) + d.flush()
+        if payload[:1] == bytes([DeflateCodec.MARK_PLAIN]):
+            return payload[1:]
+        return payload  # respuesta previa a la negociación
+
+    def pack(self, buf, cap):
+        """Comprime el mayor prefijo de buf que quepa en cap bytes. Devuelve (consumido, paquete)."""
+        room = cap - 1
+        take = utf8_cut(buf, room * 4)
+        while take > room:
+            z = self.compress(bytes(buf[:take]))
+            if len(z) <= room:
+                return take, bytes([self.MARK_DEFLATE]) + z
+            # Reducir proporcionalmente a lo que sobró y reintentar
+            take = utf8_cut(buf, int(take * room / len(z) * 0.95))
+        z = self.compress(bytes(buf[:take]))
+        if len(z) < take:
+            return take, bytes([self.MARK_DEFLATE]) + z
+        return take, bytes([self.MARK_PLAIN]) + bytes(buf[:take])
+
+
+class ArqSender:
+    """Transporte fiable hacia un nodo ('+r'): fragmentos numerados y repetición selectiva.
+
+    Cada paquete lleva 2 bytes de cabecera [tipo, seq]. El último fragmento de
+    una ráfaga (o el que llena la ventana) pide ACK (POLL); el nodo contesta
+    [ACK, siguiente seq esperada, mapa de 16 bits de los recibidos después,
+    seq del POLL] y solo se repiten los fragmentos anteriores al POLL que
+    faltan. Si el ACK no llega a tiempo se repite el más antiguo pidiendo ACK
+    y la ventana se reduce a la mitad; cada ACK sin pérdidas la agranda en uno.
+    """
+    DATA = 0x10
+    POLL = 0x01  # bit de tipo: pide ACK
+    SYNC = 0x02  # bit de tipo: el nodo debe empezar a contar desde esta seq
+    ACK = 0x18
+    HEADER = 2
+    ACK_LEN = 5
+
+    def __init__(self, window, counters=None):
+        self.max_window = self.window = max(1, min(window, 16))
+        self.next_seq = 0
+        self.unacked = collections.OrderedDict()  # {seq: cuerpo} sin confirmar
+        self.order = {}  # {seq: nº de transmisión}, para saber qué salió antes de cada POLL
+        self.sent = 0
+        self.resend = collections.deque()
+        self.polled = None  # seq del último POLL transmitido
+        self.deadline = None  # límite para su ACK
+        self.timeouts = 0  # esperas vencidas seguidas
+        self.sync = True
+        self.counters = counters if counters is not None else {}
+
+    def _count(self, what, n=1):
+        self.counters[what] = self.counters.get(what, 0) + n
+
+    def can_send(self):
+        return not self.resend and len(self.unacked) < self.window
+
+    def _frame(self, seq, body, poll):
+        kind = self.DATA | (self.POLL if poll else 0) | (self.SYNC if self.sync else 0)
+        self.sync = False
+        self.sent += 1
+        self.order[seq] = self.sent
+        if poll:
+            self.polled, self.deadline = seq, None  # el plazo se arma al salir por radio (armed)
+        return bytes([kind, seq]) + body
+
+    def new_frame(self, body, last):
+        """Fragmento nuevo con el siguiente número; pide ACK si es el último o llena la ventana."""
+        seq = self.next_seq
+        self.next_seq = (seq + 1) % 256
+        self.unacked[seq] = body
+        self._count("fragment")
+        return self._frame(seq, body, last or len(self.unacked) >= self.window)
+
+    def retransmit(self, now):
+        """Siguiente fragmento a repetir (perdido o con el ACK vencido), o None."""
+        if not self.resend and self.deadline is not None and now >= self.deadline and self.unacked:
+            self._count("timeout")
+            self.timeouts += 1
+            self.deadline = None
+            self.window = max(1, self.window // 2)
+            if self.lost():
+                return None
+            self.resend.append(next(iter(self.unacked)))
+        while self.resend:
+            seq = self.resend.popleft()
+            if seq in self.unacked:
+                self._count("retransmit")
+                return self._frame(seq, self.unacked[seq], not self.resend)
+        return None
+
+    def lost(self):
+        """ARQ_MAX_TRIES esperas de ACK vencidas seguidas: el nodo no contesta."""
+        return self.timeouts >= ARQ_MAX_TRIES
+
+    def give_up(self):
+        """Descarta lo pendiente y resincroniza con el próximo fragmento. Devuelve cuántos descartó."""
+        dropped = len(self.unacked)
+        self._count("dropped", dropped)
+        self.unacked.clear()
+        self.resend.clear()
+        self.order.clear()
+        self.deadline = self.polled = None
+        self.timeouts = 0
+        self.sync = True
+        return dropped
+
+    def armed(self, seq, deadline):
+        """El POLL `seq` acaba de salir: su ACK debe llegar antes de deadline."""
+        if seq == self.polled and seq in self.unacked:
+            self.deadline = deadline
+
+    def waiting(self):
+        """Hay fragmentos sin confirmar (la sesión sigue ocupando la cola de radio)."""
+        return bool(self.unacked)
+
+    def on_ack(self, payload):
+        if len(payload) < self.ACK_LEN:
+            return
+        nxt, bitmap, pseq = payload[1], int.from_bytes(payload[2:4], "big"), payload[4]
+        self._count("ack")
+        if not self.unacked:
+            return
+        oldest = next(iter(self.unacked))
+        if (nxt - oldest) % 256 > (self.next_seq - oldest) % 256:
+            # El nodo cuenta otra secuencia (p. ej. se reinició): repetir todo con SYNC
+            self.sync = True
+            self.resend = collections.deque(sorted(self.unacked, key=self.order.get))
+            return
+        poll_order = self.order.get(pseq, 0)
+        for seq in list(self.unacked):
+            d = (seq - nxt) % 256
+            if d >= 128 or (d and bitmap >> (d - 1) & 1):
+                del self.unacked[seq]
+                self.order.pop(seq, None)
+        lost = sorted((seq for seq in self.unacked if self.order[seq] < poll_order), key=self.order.get)
+        if pseq == self.polled:
+            self.deadline = None
+            self.timeouts = 0
+            if not lost:
+                self.window = min(self.max_window, self.window + 1)
+        self.resend.extend(seq for seq in lost if seq not in self.resend)
+
+
+class ArqReceiver:
+    """Lado del nodo del transporte fiable: reordena, entrega en orden y arma los ACK."""
+    def __init__(self):
+        self.expected = 0
+        self.buffer = {}  # {seq: cuerpo} llegados fuera de orden
+        self.duplicates = 0
+
+    @staticmethod
+    def is_frame(payload):
+        return len(payload) >= ArqSender.HEADER and payload[0] & 0xFC == ArqSender.DATA
+
+    def feed(self, payload):
+        """Un paquete recibido (sin dirección). Devuelve (cuerpos listos en orden, ACK o None)."""
+        kind, seq, body = payload[0], payload[1], payload[ArqSender.HEADER:]
+        if kind & ArqSender.SYNC and seq != self.expected:
+            self.expected = seq
+            self.buffer.clear()
+        d = (seq - self.expected) % 256
+        if d >= 128 or seq in self.buffer:
+            self.duplicates += 1
+        elif d < 32:
+            self.buffer[seq] = body
+        out = []
+        while self.expected in self.buffer:
+            out.append(self.buffer.pop(self.expected))
+            self.expected = (self.expected + 1) % 256
+        return out, (self.ack(seq) if kind & ArqSender.POLL else None)
+
+    def ack(self, pseq):
+        bitmap = sum(1 << i for i in range(16) if (self.expected + 1 + i) % 256 in self.buffer)
+        return bytes([ArqSender.ACK, self.expected]) + bitmap.to_bytes(2, "big") + bytes([pseq])
+
+
+class LiveFilter:
+    """Lado del nodo de la sala en vivo: qué difusión mostrar.
+
+    La trama de difusión la oye cualquier nodo al alcance, esté o no en la
+    sala. El BBS marca en la salida de cada nodo cuándo empieza y deja de
+    mostrarla (LIVE_ON con su nick, LIVE_OFF) y cada mensaje difundido lleva
+    el nick de quien lo publicó (LIVE_FROM). feed_session() quita las marcas
+    de lo recibido por la sesión; feed_broadcast() devuelve solo lo que hay
+    que mostrar: nada fuera de la sala ni con 'live off', y nunca el eco de
+    lo publicado por el propio nodo. Una marca partida entre dos paquetes
+    espera al siguiente.
+    """
+    SESSION_MARK = re.compile(f"{LIVE_ON}([^{LIVE_SEP}]*){LIVE_SEP}|{LIVE_OFF}".encode())
+    BROADCAST_MARK = re.compile(f"{LIVE_FROM}([^{LIVE_SEP}]*){LIVE_SEP}".encode())
+    HOLD_MAX = 64  # una marca sin cierre más larga que esto es de un paquete perdido: se descarta
+
+    def __init__(self):
+        self.nick = None  # nick con el que el nodo está suscrito; None = no mostrar la difusión
+        self.origin = None  # quien publicó el mensaje difundido en curso
+        self.held = {}  # {marca de inicio: bytes de una marca a medio llegar}
+
+    def feed_session(self, data):
+        out = bytearray()
+        for text, nick in self._split(data, self.SESSION_MARK, LIVE_ON):
+            out += text
+            if nick is not False:
+                self.nick = nick  # None con LIVE_OFF
+        return bytes(out)
+
+    def feed_broadcast(self, data):
+        out = bytearray()
+        for text, origin in self._split(data, self.BROADCAST_MARK, LIVE_FROM):
+            if self.nick is not None and self.origin != self.nick:
+                out += text
+            if origin is not False:
+                self.origin = origin
+        return bytes(out)
+
+    def _split(self, data, mark, start):
+        """[(texto, nick de la marca que lo sigue)]; False en el último trozo, que no tiene marca."""
+        start = start.encode()
+        data = self.held.pop(start, b"") + data
+        parts, pos = [], 0
+        for m in mark.finditer(data):
+            parts.append((data[pos:m.start()], m.group(1)))
+            pos = m.end()
+        rest = data[pos:]
+        cut = rest.find(start)
+        if 0 <= cut and len(rest) - cut <= self.HOLD_MAX:
+            self.held[start], rest = rest[cut:], rest[:cut]
+        parts.append((rest.replace(start, b""), False))
+        return parts
+
+
+def lora_airtime(payload_len, sf=LORA_SF, bw=LORA_BW, cr=LORA_CR, preamble=LORA_PREAMBLE):
+    """Tiempo al aire (s) de un paquete LoRa explícito con CRC (fórmula de Semtech AN1200.13)."""
+    t_sym = (2 ** sf) / bw
+    de = 1 if t_sym > 0.016 else 0  # low data rate optimize
+    n_payload = 8 + max(math.ceil((8 * payload_len - 4 * sf + 28 + 16) / (4 * (sf - 2 * de))) * (cr + 4), 0)
+    return (preamble + 4.25) * t_sym + n_payload * t_sym
+
+
+class Metrics:
+    """Contadores e histogramas en memoria, exportados en formato de texto de Prometheus.
+
+    En el camino caliente solo se usan inc() y observe() (un diccionario y una
+    búsqueda binaria bajo un lock). Lo que los componentes ya cuentan por su
+    cuenta (caché, trabajos, HTTP, radio) se lee al exportar mediante funciones
+    registradas con register(), sin coste mientras nadie consulta.
+    """
+    HELP = {
+        "bbs_response_seconds": "Tiempo desde que llega una línea hasta que el BBS vuelve a pedir entrada, "
+                                "por opción en la que se recibió",
+        "bbs_handler_seconds": "Duración de cada opción del menú (incluye lo que tarda el usuario)",
+        "bbs_handler_errors_total": "Excepciones no controladas por opción del menú",
+        "bbs_rx_bytes_total": "Bytes de texto recibidos de los nodos",
+        "bbs_tx_bytes_total": "Bytes de texto enviados por opción y perfil (antes de comprimir)",
+        "bbs_tx_queue_seconds": "Espera de la salida en la cola de radio hasta ser transmitida",
+        "bbs_http_seconds": "Tiempo hasta recibir las cabeceras de cada petición HTTP saliente",
+        "bbs_errors_total": "Errores por componente",
+        "bbs_arq_total": "Transporte fiable ('+r'): fragmentos, repeticiones, ACK, esperas vencidas y descartes",
+        "bbs_plugin_load_seconds": "Tiempo de importar e iniciar cada plugin (al primer uso)",
+        "bbs_broadcast_total": "Sala pública en vivo: mensajes difundidos y nodos que los recibieron en la misma trama",
+        "bbs_sessions_parked": "Sesiones esperando una línea en el menú o en una sala, sin hilo propio",
+    }
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counters = {}  # {(nombre, etiquetas): valor}
+        self.histograms = {}  # {(nombre, etiquetas): [cuentas por bucket + Inf, suma]}
+        self.collectors = []  # funciones -> [(nombre, tipo, {etiquetas}, valor)]
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += seconds
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def quantile(self, counts, q):
+        """Límite superior del bucket donde cae el cuantil q (None si cae en +Inf)."""
+        target = q * sum(counts)
+        seen = 0
+        for bound, n in zip(self.buckets, counts):
+            seen += n
+            if n and seen >= target:
+                return bound
+        return None
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        esc = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for k, v in items]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in esc) + "}"
+
+    def render(self):
+        """Texto en el formato de exposición de Prometheus."""
+        rows = {}  # {nombre: (tipo, [(etiquetas, valor)])}
+        for collector in self.collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    rows.setdefault(name, (kind, []))[1].append((tuple(sorted(labels.items())), value))
+            except Exception as e:
+                print(f"[ERROR en métricas] {e}")
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                rows.setdefault(name, ("counter", []))[1].append((labels, value))
+            hists = [(name, labels, list(counts), total)
+                     for (name, labels), (counts, total) in self.histograms.items()]
+        out = []
+        for name, (kind, samples) in sorted(rows.items()):
+            if name in self.HELP:
+                out.append(f"# HELP {name} {self.HELP[name]}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(f"{name}{self._labels(labels)} {value:g}" for labels, value in sorted(samples))
+        last = None
+        for name, labels, counts, total in sorted(hists):
+            if name != last:
+                if name in self.HELP:
+                    out.append(f"# HELP {name} {self.HELP[name]}")
+                out.append(f"# TYPE {name} histogram")
+                last = name
+            seen = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                seen += n
+                out.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {seen}")
+            out.append(f"{name}_sum{self._labels(labels)} {total:g}")
+            out.append(f"{name}_count{self._labels(labels)} {seen}")
+        return "\n".join(out) + "\n"
+
+    def latency_report(self):
+        """Resumen legible de los histogramas: muestras, media y p50/p95 aproximados."""
+        with self.lock:
+            hists = sorted((name, labels, list(counts), total)
+                           for (name, labels), (counts, total) in self.histograms.items())
+        def fmt(bound):
+            return f"<={bound:g}s" if bound is not None else f">{self.buckets[-1]:g}s"
+        lines = ["Latencias (n, media, p50, p95):"]
+        for name, labels, counts, total in hists:
+            n = sum(counts)
+            p50, p95 = (self.quantile(counts, q) for q in (0.5, 0.95))
+            tag = ",".join(str(v) for _, v in labels)
+            lines.append(f"  {name[4:]}{'[' + tag + ']' if tag else ''}: {n}, {total / n:.2f}s, "
+                         f"{fmt(p50)}, {fmt(p95)}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Escritura atómica para el colector textfile de node_exporter."""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Sirve GET /metrics en un hilo aparte."""
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class TxScheduler:
+    """Cola de salida: agrupa los send() de cada sesión en paquetes de hasta LORA_MTU.
+
+    Un paquete sale cuando se llena, cuando vence TX_FLUSH_DELAY desde el primer
+    byte pendiente o cuando la sesión pide entrada (flush). Las sesiones se
+    atienden por turnos y se respeta el presupuesto de duty cycle. En las
+    sesiones con transporte fiable (sess.arq) las repeticiones salen antes que
+    los fragmentos nuevos y no se manda más de una ventana sin confirmar.
+    Hay un TxScheduler por radio (ver Radio), con su SF para el tiempo al aire.
+    """
+    def __init__(self, write, metrics=None, name="", sf=LORA_SF):
+        self.write = write  # write(addr, payload)
+        self.metrics = metrics
+        self.name = name
+        self.sf = sf
+        self.cv = threading.Condition()
+        self.pending = collections.OrderedDict()  # {id(sess): sess}
+        self.history = collections.deque()  # [(t, airtime)] dentro de la ventana
+        self.window_airtime = 0.0
+        self.stats = {}  # {etiqueta: [bytes, paquetes, airtime]}
+        self.codec_stats = {}  # {etiqueta: [bytes sin comprimir, bytes comprimidos]}
+        self.arq_counters = {}  # {evento: n} de todas las sesiones '+r'
+        self.air_free = 0.0  # cuándo termina de salir al aire lo ya escrito en la Pico (estimado)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def enqueue(self, sess, data: bytes):
+        with self.cv:
+            if not sess.outbuf:
+                sess.out_since = time.monotonic()
+            sess.outbuf += data
+            self.pending[id(sess)] = sess
+            self.cv.notify()
+
+    def flush(self, sess):
+        with self.cv:
+            if sess.outbuf:
+                sess.flush_now = True
+                self.cv.notify()
+
+    @staticmethod
+    def capacity(sess):
+        return LORA_MTU - (0 if sess.addr is None else SLIP_ADDR_LEN)
+
+    def airtime(self, size):
+        return lora_airtime(size, sf=self.sf)
+
+    def release(self, sess):
+        """La sesión pasa a otra radio: deja de atenderla aquí. True si tenía algo pendiente."""
+        with self.cv:
+            return self.pending.pop(id(sess), None) is not None
+
+    def adopt(self, sess):
+        """Atiende la salida pendiente (y lo que falte confirmar con '+r') de una sesión que llega de otra radio."""
+        with self.cv:
+            self.pending[id(sess)] = sess
+            self.cv.notify()
+
+    def ack(self, sess, payload):
+        """ACK de un nodo con transporte fiable: libera la ventana o programa repeticiones."""
+        with self.cv:
+            sess.arq.on_ack(payload)
+            if not sess.outbuf and not sess.arq.waiting():
+                self.pending.pop(id(sess), None)
+            self.cv.notify()
+
+    def _next_packet(self):
+        """Saca el siguiente paquete listo (por turnos) o devuelve el tiempo a esperar."""
+        now = time.monotonic()
+        wait = None
+        done = []
+        for key, sess in self.pending.items():
+            arq = sess.arq
+            if arq is not None:
+                frame = arq.retransmit(now)
+                if frame is not None:
+                    self.pending.move_to_end(key)
+                    return sess, frame, now
+                if arq.lost():
+                    print(f"[!] Sin ACK de {sess.label()} tras {ARQ_MAX_TRIES} esperas: "
+                          f"{arq.give_up()} fragmentos y {len(sess.outbuf)} bytes descartados")
+                    sess.outbuf.clear()
+                if arq.deadline is not None:
+                    wait = arq.deadline - now if wait is None else min(wait, arq.deadline - now)
+                if not sess.outbuf or not arq.can_send():
+                    if not sess.outbuf and not arq.waiting():
+                        done.append(key)
+                    continue
+            cap = self.capacity(sess) - (ArqSender.HEADER if arq else 0)
+            due = sess.out_since + TX_FLUSH_DELAY
+            if sess.flush_now or len(sess.outbuf) >= cap or now >= due:
+                if sess.codec:
+                    cut, packet = sess.codec.pack(sess.outbuf, cap)
+                    st = self.codec_stats.setdefault(sess.label(), [0, 0])
+                    st[0] += cut
+                    st[1] += len(packet)
+                else:
+                    cut = utf8_cut(sess.outbuf, cap)  # no partir un carácter entre paquetes
+                    packet = bytes(sess.outbuf[:cut])
+                del sess.outbuf[:cut]
+                del self.pending[key]
+                since = sess.out_since
+                if not sess.outbuf:
+                    sess.flush_now = False
+                if arq is not None:
+                    packet = arq.new_frame(packet, last=not sess.outbuf)
+                if sess.outbuf or arq is not None:
+                    self.pending[key] = sess  # al final de la fila
+                return sess, packet, since
+            wait = due - now if wait is None else min(wait, due - now)
+        for key in done:
+            del self.pending[key]
+        return None, wait, None
+
+    def _budget_delay(self, airtime):
+        """Segundos a esperar para no superar LORA_DUTY_CYCLE en la ventana."""
+        now = time.monotonic()
+        while self.history and now - self.history[0][0] > LORA_DUTY_WINDOW:
+            self.window_airtime -= self.history.popleft()[1]
+        budget = LORA_DUTY_CYCLE * LORA_DUTY_WINDOW
+        excess = self.window_airtime + airtime - budget
+        delay = 0.0
+        for t, a in self.history:
+            if excess <= 0:
+                break
+            excess -= a
+            delay = t + LORA_DUTY_WINDOW - now
+        return max(delay, 0.0)
+
+    def _loop(self):
+        while True:
+            with self.cv:
+                sess, packet, since = self._next_packet()
+                if sess is None:
+                    self.cv.wait(timeout=packet)
+                    continue
+            air_len = len(packet) + (0 if sess.addr is None else SLIP_ADDR_LEN)
+            airtime = self.airtime(air_len)
+            delay = self._budget_delay(airtime)
+            if delay > 0:
+                print(f"[!] Duty cycle agotado, esperando {delay:.1f}s")
+                time.sleep(delay)
+            try:
+                self.write(sess.addr, packet)
+            except Exception as e:
+                print(f"[ERROR en tx] {e}")
+                if self.metrics:
+                    self.metrics.inc("bbs_errors_total", component="tx", radio=self.name)
+                continue
+            if self.metrics:
+                self.metrics.observe("bbs_tx_queue_seconds", time.monotonic() - since, radio=self.name)
+            self.air_free = max(time.monotonic(), self.air_free) + airtime
+            if sess.arq is not None and packet[0] & ArqSender.POLL:
+                # El ACK puede llegar cuando el POLL termina de salir y el nodo contesta
+                ack_air = self.airtime(ArqSender.ACK_LEN + SLIP_ADDR_LEN)
+                with self.cv:
+                    sess.arq.armed(packet[1], self.air_free + ack_air + ARQ_ACK_MARGIN)
+            self.history.append((time.monotonic(), airtime))
+            self.window_airtime += airtime
+            st = self.stats.setdefault(sess.label(), [0, 0, 0.0])
+            st[0] += air_len
+            st[1] += 1
+            st[2] += airtime
+
+    def duty_used(self):
+        """Fracción del presupuesto de duty cycle consumida en la ventana actual."""
+        return self.window_airtime / (LORA_DUTY_CYCLE * LORA_DUTY_WINDOW)
+
+    def pending_bytes(self):
+        with self.cv:
+            return sum(len(sess.outbuf) for sess in self.pending.values())
+
+    def collect(self):
+        """Totales de radio para Metrics.register()."""
+        pending = self.pending_bytes()
+        nbytes = packets = airtime = 0
+        for b, p, a in list(self.stats.values()):
+            nbytes, packets, airtime = nbytes + b, packets + p, airtime + a
+        raw = sum(r for r, _ in list(self.codec_stats.values()))
+        packed = sum(p for _, p in list(self.codec_stats.values()))
+        radio = {"radio": self.name}
+        return [
+            ("bbs_air_bytes_total", "counter", radio, nbytes),
+            ("bbs_air_packets_total", "counter", radio, packets),
+            ("bbs_airtime_seconds_total", "counter", radio, airtime),
+            ("bbs_duty_cycle_used_ratio", "gauge", radio, self.duty_used()),
+            ("bbs_tx_pending_bytes", "gauge", radio, pending),
+            ("bbs_deflate_bytes_total", "counter", dict(radio, stage="raw"), raw),
+            ("bbs_deflate_bytes_total", "counter", dict(radio, stage="packed"), packed),
+        ] + [("bbs_arq_total", "counter", dict(radio, event=event), n)
+             for event, n in list(self.arq_counters.items())]
+
+    def report(self):
+        lines = [f"Duty cycle {self.name}: {self.duty_used() * 100:.1f}% del presupuesto "
+                 f"({LORA_DUTY_CYCLE * 100:.0f}% en {LORA_DUTY_WINDOW}s)"]
+        for label, (nbytes, packets, airtime) in sorted(self.stats.items()):
+            lines.append(f"  {label}: {nbytes} bytes, {packets} paquetes, {airtime:.1f}s al aire")
+        for label, (raw, packed) in sorted(self.codec_stats.items()):
+            lines.append(f"  {label} deflate: {raw} -> {packed} bytes ({packed / raw:.0%})")
+        if self.arq_counters:
+            c = self.arq_counters
+            lines.append(f"  +r: {c.get('fragment', 0)} fragmentos, {c.get('retransmit', 0)} repetidos, "
+                         f"{c.get('ack', 0)} ACK, {c.get('timeout', 0)} esperas vencidas, "
+                         f"{c.get('dropped', 0)} descartados")
+        return "\n".join(lines)
+
+
+# Errores típicos al reutilizar un socket que el servidor ya cerró
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+                 ConnectionAbortedError, BrokenPipeError)
+
+
+class HttpPool:
+    """Conexiones HTTP(S) persistentes por host, compartidas por todas las integraciones.
+
+    Cada host guarda hasta max_idle conexiones en reposo; las que pasan más de
+    idle_timeout segundos sin uso se cierran. Si una conexión reutilizada resulta
+    estar cerrada por el servidor, la petición se repite una vez con una nueva.
+    """
+    def __init__(self, max_idle=HTTP_POOL_MAX_IDLE, idle_timeout=HTTP_IDLE_TIMEOUT, overrides=None,
+                 metrics=None):
+        self.metrics = metrics
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.overrides = {}  # {host: (https, host real)}
+        for host, url in (HTTP_HOST_OVERRIDES if overrides is None else overrides).items():
+            u = urllib.parse.urlsplit(url)
+            self.overrides[host] = (u.scheme == "https", u.netloc)
+        self.lock = threading.Lock()
+        self.idle = {}  # {(https, host): [(conexión, último uso)]}
+        self.stats = {}  # {host: contadores new/reused/retry/error y últimos tiempos}
+
+    def _acquire(self, key, timeout):
+        now = time.monotonic()
+        with self.lock:
+            conns = self.idle.get(key, [])
+            while conns:
+                conn, used = conns.pop()
+                if now - used <= self.idle_timeout:
+                    conn.timeout = timeout
+                    if conn.sock:
+                        conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        return self._connect(key, timeout), False
+
+    @staticmethod
+    def _connect(key, timeout):
+        https, host = key
+        cls = http.client.HTTPSConnection if https else http.client.HTTPConnection
+        return cls(host, timeout=timeout)
+
+    def _release(self, key, conn):
+        with self.lock:
+            conns = self.idle.setdefault(key, [])
+            conns.append((conn, time.monotonic()))
+            while len(conns) > self.max_idle:
+                conns.pop(0)[0].close()
+
+    def _record(self, host, what, elapsed=None):
+        with self.lock:
+            s = self.stats.setdefault(host, {"new": 0, "reused": 0, "retry": 0, "error": 0,
+                                             "times": collections.deque(maxlen=200)})
+            s[what] += 1
+            if elapsed is not None:
+                s["times"].append(elapsed)
+        if elapsed is not None and self.metrics:
+            self.metrics.observe("bbs_http_seconds", elapsed, host=host)
+
+    @contextlib.contextmanager
+    def open(self, method, host, path, body=None, headers=None, timeout=10, https=True):
+        """Respuesta en curso (para leerla por partes). La conexión vuelve al pool solo si
+        la respuesta se leyó entera; si se abandona a medias (p. ej. 'stop') se cierra."""
+        key = self.overrides.get(host, (https, host))
+        t0 = time.monotonic()
+        conn, reused = self._acquire(key, timeout)
+        try:
+            try:
+                conn.request(method, path, body, headers or {})
+                resp = conn.getresponse()
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                self._record(host, "retry")
+                conn, reused = self._connect(key, timeout), False
+                conn.request(method, path, body, headers or {})
+                resp = conn.getresponse()
+        except Exception:
+            conn.close()
+            self._record(host, "error")
+            raise
+        self._record(host, "reused" if reused else "new", time.monotonic() - t0)
+        done = False
+        try:
+            yield resp
+            done = True
+        finally:
+            if done and resp.isclosed() and not resp.will_close:
+                self._release(key, conn)
+            else:
+                conn.close()
+
+    def request(self, method, host, path, body=None, headers=None, timeout=10, https=True):
+        """Petición completa. Devuelve (status, reason, cuerpo en bytes)."""
+        with self.open(method, host, path, body, headers, timeout, https) as resp:
+            return resp.status, resp.reason, resp.read()
+
+    def sweep(self):
+        """Cierra las conexiones en reposo que superaron idle_timeout."""
+        now = time.monotonic()
+        with self.lock:
+            for key, conns in self.idle.items():
+                for conn, used in conns:
+                    if now - used > self.idle_timeout:
+                        conn.close()
+                self.idle[key] = [(c, u) for c, u in conns if now - u <= self.idle_timeout]
+
+    def collect(self):
+        rows = []
+        with self.lock:
+            for host, s in self.stats.items():
+                for what in ("new", "reused"):
+                    rows.append(("bbs_http_requests_total", "counter", {"host": host, "conn": what}, s[what]))
+                rows.append(("bbs_http_retries_total", "counter", {"host": host}, s["retry"]))
+                rows.append(("bbs_http_errors_total", "counter", {"host": host}, s["error"]))
+            rows.append(("bbs_http_idle_connections", "gauge", {}, sum(len(c) for c in self.idle.values())))
+        return rows
+
+    def report(self):
+        lines = ["HTTP (tiempo hasta cabeceras):"]
+        with self.lock:
+            for host, s in sorted(self.stats.items()):
+                times = sorted(s["times"])
+                avg = sum(times) / len(times) if times else 0.0
+                p95 = times[int(len(times) * 0.95)] if times else 0.0
+                lines.append(f"  {host}: {s['new'] + s['reused']} peticiones ({s['reused']} reutilizando "
+                             f"conexión, {s['retry']} reintentos), {s['error']} errores, "
+                             f"media {avg * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
+class UpstreamError(Exception):
+    """Fallo del servicio externo; el mensaje se muestra tal cual y no se guarda en caché."""
+
+
+class ResponseCache:
+    """Caché de respuestas externas con TTL por fuente y expulsión LRU.
+
+    Una entrada vencida se sigue sirviendo durante otro TTL mientras se
+    revalida en segundo plano; si la consulta falla (sin red) se sirve la
+    copia vieja hasta CACHE_STALE_MAX segundos.
+    """
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # {(fuente, clave): (timestamp, valor, tamaño)}
+        self.size = 0
+        self.counters = {}  # {fuente: {"hit", "miss", "stale", "error"}}
+        self.refreshing = set()
+        self.dirty = False
+        self.last_save = 0.0
+        self.load()
+
+    def _count(self, source, what):
+        c = self.counters.setdefault(source, {"hit": 0, "miss": 0, "stale": 0, "error": 0})
+        c[what] += 1
+
+    def put(self, source, key, value, ts=None):
+        self._insert(source, key, value, ts)
+        if time.time() - self.last_save > CACHE_SAVE_INTERVAL:
+            self.save()
+
+    def _insert(self, source, key, value, ts=None):
+        """Guarda en memoria (LRU y topes) sin escribir a disco."""
+        size = len(json.dumps(value, ensure_ascii=False))
+        with self.lock:
+            old = self.entries.pop((source, key), None)
+            if old:
+                self.size -= old[2]
+            self.entries[(source, key)] = (ts or time.time(), value, size)
+            self.size += size
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                _, (_, _, s) = self.entries.popitem(last=False)
+                self.size -= s
+            self.dirty = True
+
+    def fetch(self, source, key, loader, warm=False):
+        """Devuelve (valor, edad en s, fresco) usando loader() si no hay copia útil.
+
+        Con warm=True (claves que mantiene Warmer) cualquier copia de menos de
+        CACHE_STALE_MAX se sirve al momento y, si venció, se revalida en segundo plano.
+        """
+        key = key.strip().lower()
+        ttl = self.ttl.get(source, 3600)
+        with self.lock:
+            entry = self.entries.get((source, key))
+            if entry:
+                self.entries.move_to_end((source, key))
+        age = time.time() - entry[0] if entry else None
+        if entry and age <= ttl:
+            self._count(source, "hit")
+            return entry[1], age, True
+        if entry and (age <= 2 * ttl or warm and age <= CACHE_STALE_MAX):
+            self._count(source, "stale")
+            self._revalidate(source, key, loader)
+            return entry[1], age, False
+        self._count(source, "miss")
+        try:
+            value = loader()
+        except Exception:
+            self._count(source, "error")
+            if entry and age <= CACHE_STALE_MAX:
+                self._count(source, "stale")
+                return entry[1], age, False
+            raise
+        if value:
+            self.put(source, key, value)
+        return value, 0.0, True
+
+    def get(self, source, key):
+        """(valor, edad en s) si hay copia dentro del TTL, o None. Sin loader ni revalidación:
+        para respuestas caras de regenerar (LLM) que solo se guardan al completarse."""
+        key = key.strip().lower()
+        with self.lock:
+            entry = self.entries.get((source, key))
+            if entry:
+                self.entries.move_to_end((source, key))
+        age = time.time() - entry[0] if entry else None
+        if entry and age <= self.ttl.get(source, 3600):
+            self._count(source, "hit")
+            return entry[1], age
+        self._count(source, "miss")
+        return None
+
+    def age(self, source, key):
+        """Edad en segundos de la copia guardada, o None si no hay."""
+        with self.lock:
+            entry = self.entries.get((source, key.strip().lower()))
+        return time.time() - entry[0] if entry else None
+
+    def refresh(self, source, key, loader):
+        """Consulta y guarda sin mirar la copia actual (Warmer). Propaga el error."""
+        try:
+            value = loader()
+        except Exception:
+            self._count(source, "error")
+            raise
+        if value:
+            self.put(source, key.strip().lower(), value)
+
+    def _revalidate(self, source, key, loader):
+        with self.lock:
+            if (source, key) in self.refreshing:
+                return
+            self.refreshing.add((source, key))
+
+        def run():
+            try:
+                value = loader()
+                if value:
+                    self.put(source, key, value)
+            except Exception:
+                self._count(source, "error")
+            finally:
+                with self.lock:
+                    self.refreshing.discard((source, key))
+        threading.Thread(target=run, daemon=True).start()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for source, key, ts, value in rows:
+            if now - ts <= max(CACHE_STALE_MAX, self.ttl.get(source, 0)):
+                self._insert(source, key, value, ts)  # sin put(): guardaría con solo lo cargado hasta ahí
+        self.dirty = False
+        self.last_save = now
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            rows = [[source, key, ts, value] for (source, key), (ts, value, _) in self.entries.items()]
+            self.dirty = False
+            self.last_save = time.time()
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[ERROR guardando caché] {e}")
+
+    def collect(self):
+        rows = [("bbs_cache_entries", "gauge", {}, len(self.entries)),
+                ("bbs_cache_bytes", "gauge", {}, self.size)]
+        for source, c in list(self.counters.items()):
+            for what, n in list(c.items()):
+                rows.append(("bbs_cache_requests_total", "counter", {"source": source, "result": what}, n))
+        return rows
+
+    def report(self):
+        lines = [f"Caché: {len(self.entries)} entradas, {self.size // 1024} KB"]
+        for source, c in sorted(self.counters.items()):
+            total = c["hit"] + c["stale"] + c["miss"]
+            rate = (c["hit"] + c["stale"]) / total if total else 0.0
+            lines.append(f"  {source}: {c['hit']} aciertos, {c['stale']} viejos, {c['miss']} fallos, "
+                         f"{c['error']} errores ({rate:.0%} servido de caché)")
+        return "\n".join(lines)
+
+
+class Warmer:
+    """Mantiene caliente en la caché una lista fija de consultas (source, clave, loader).
+
+    Cada WARM_POLL segundos refresca las que pasaron WARM_LEAD de su TTL, solo
+    dentro de WARM_HOURS y mientras is_idle() (sin salida de radio ni trabajos
+    pendientes), para no competir con los usuarios por el enlace. `targets` puede
+    ser una función que devuelve la lista: se llama en el hilo de precarga.
+    """
+    def __init__(self, cache, targets, is_idle=lambda: True, hours=WARM_HOURS, lead=WARM_LEAD):
+        self.cache = cache
+        self.load_targets = targets if callable(targets) else (lambda: targets)
+        self.set_targets(() if callable(targets) else targets)
+        self.is_idle = is_idle
+        self.hours = hours
+        self.lead = lead
+        self.counters = {"refreshed": 0, "failed": 0, "deferred": 0}
+
+    def set_targets(self, targets):
+        self.targets = list(targets)
+        self.keys = {(source, key.strip().lower()) for source, key, _ in self.targets}
+
+    def is_warm(self, source, key):
+        return (source, key.strip().lower()) in self.keys
+
+    def due(self):
+        """Consultas sin copia o cuya copia pasó WARM_LEAD de su TTL, las más viejas primero."""
+        rows = []
+        for source, key, loader in self.targets:
+            age = self.cache.age(source, key)
+            if age is None or age > self.cache.ttl.get(source, 3600) * self.lead:
+                rows.append((float("inf") if age is None else age, (source, key, loader)))
+        rows.sort(key=lambda row: row[0], reverse=True)
+        return [target for _, target in rows]
+
+    def run_once(self):
+        if self.hours is not None and time.localtime().tm_hour not in self.hours:
+            return
+        for source, key, loader in self.due():
+            if not self.is_idle():
+                self.counters["deferred"] += 1
+                return
+            try:
+                self.cache.refresh(source, key, loader)
+                self.counters["refreshed"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                print(f"[!] Precarga {source} '{key}' falló: {e}")
+
+    def start(self, poll=WARM_POLL):
+        def run():
+            self.set_targets(self.load_targets())
+            while self.targets:
+                self.run_once()
+                time.sleep(poll)
+        threading.Thread(target=run, daemon=True).start()
+
+    def collect(self):
+        return [("bbs_warm_total", "counter", {"result": what}, n) for what, n in self.counters.items()]
+
+    def report(self):
+        c = self.counters
+        return (f"Precarga: {len(self.targets)} consultas, {c['refreshed']} refrescos, "
+                f"{c['failed']} fallidos, {c['deferred']} aplazados por actividad")
+
+
+class AppendLog:
+    """Registro solo-anexar en JSON Lines con índice de offsets y commit agrupado.
+
+    Se usa como una lista con append(): len(log), log[i] y log[-10:] leen del
+    disco solo esas líneas gracias al índice de offsets, que al arrancar se
+    construye buscando saltos de línea sin decodificar el JSON. Lo añadido se
+    junta en memoria y un hilo lo vuelca con un único write+fsync cada
+    STORE_COMMIT_DELAY segundos. Una línea a medio escribir (corte de luz) se
+    descarta al abrir.
+    """
+    def __init__(self, path, commit_delay=STORE_COMMIT_DELAY):
+        self.path = path
+        self.commit_delay = commit_delay
+        self.lock = threading.Condition()
+        self.write_lock = threading.RLock()
+        self.buffer = bytearray()  # registros aún no escritos; empiezan en self.size
+        self.commits = 0
+        self._open()
+        threading.Thread(target=self._commit_loop, daemon=True).start()
+
+    @staticmethod
+    def _encode(record):
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _open(self):
+        self.offsets = array.array("Q")  # byte de inicio de cada registro
+        with open(self.path, "a+b") as f:
+            f.seek(0)
+            pos = start = 0
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                for m in re.finditer(b"\n", chunk):
+                    self.offsets.append(start)
+                    start = pos + m.end()
+                pos += len(chunk)
+            if start < pos:
+                f.truncate(start)
+        self.size = start  # bytes ya escritos en disco
+        self.rfile = open(self.path, "rb")
+        self.wfile = open(self.path, "ab")
+
+    def __len__(self):
+        with self.lock:
+            return len(self.offsets)
+
+    def __getitem__(self, item):
+        with self.lock:
+            n = len(self.offsets)
+            if isinstance(item, slice):
+                start, stop, step = item.indices(n)
+                if step != 1:
+                    raise ValueError("AppendLog solo admite cortes contiguos")
+                raw = self._read(start, stop) if start < stop else b""
+            else:
+                index = item + n if item < 0 else item
+                if not 0 <= index < n:
+                    raise IndexError("AppendLog index out of range")
+                raw = self._read(index, index + 1)
+        records = [json.loads(line) for line in raw.split(b"\n")[:-1]]
+        return records if isinstance(item, slice) else records[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), 1000):
+            yield from self[start:start + 1000]
+
+    def _read(self, start, stop):
+        """Bytes de los registros [start, stop); parte del disco y parte del buffer."""
+        begin = self.offsets[start]
+        end = self.offsets[stop] if stop < len(self.offsets) else self.size + len(self.buffer)
+        data = b""
+        if begin < self.size:
+            self.rfile.seek(begin)
+            data = self.rfile.read(min(end, self.size) - begin)
+        if end > self.size:
+            data += self.buffer[max(begin - self.size, 0):end - self.size]
+        return data
+
+    def append(self, record):
+        line = self._encode(record)
+        with self.lock:
+            self.offsets.append(self.size + len(self.buffer))
+            self.buffer += line
+            self.lock.notify()
+
+    def _commit_loop(self):
+        while True:
+            with self.lock:
+                while not self.buffer:
+                    self.lock.wait()
+            time.sleep(self.commit_delay)  # juntar lo que llegue mientras tanto
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ERROR guardando {self.path}] {e}")
+                time.sleep(5)
+
+    def flush(self):
+        """Escribe lo pendiente con un solo write+fsync."""
+        with self.write_lock:
+            with self.lock:
+                data = bytes(self.buffer)
+            if not data:
+                return
+            self.wfile.write(data)
+            self.wfile.flush()
+            os.fsync(self.wfile.fileno())
+            with self.lock:
+                del self.buffer[:len(data)]
+                self.size += len(data)
+                self.commits += 1
+
+    def compact(self, records):
+        """Reescribe el registro solo con `records`: archivo temporal + os.replace (atómico)."""
+        with self.write_lock:
+            self.flush()
+            with self.lock:
+                tmp = self.path + ".tmp"
+                with open(tmp, "wb") as f:
+                    for record in records:
+                        f.write(self._encode(record))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.rfile.close()
+                self.wfile.close()
+                os.replace(tmp, self.path)
+                self._open()
+
+
+def fold_text(text):
+    """Minúsculas y sin tildes, carácter a carácter (mismas posiciones que el original)."""
+    return "".join(unicodedata.normalize("NFD", c)[0] for c in text.lower())
+
+
+def search_terms(text):
+    """Palabras indexables: sin tildes, de 2 o más letras y sin palabras vacías."""
+    return [w for w in re.findall(r"\w+", fold_text(text)) if len(w) > 1 and w not in SEARCH_STOPWORDS]
+
+
+class SearchIndex:
+    """Índice invertido de varias fuentes (chat, categorías del tablón) sobre sus AppendLog.
+
+    Cada documento es (fuente, posición en su registro). update() indexa solo
+    lo añadido desde la última vez, así que se llama tras cada post y al
+    arrancar (para ponerse al día con lo que el archivo del índice no tenía).
+    Las búsquedas puntúan por idf, con medio punto para prefijos ('lora' encuentra
+    'loras'), y desempatan por lo más reciente.
+    """
+    def __init__(self, path=SEARCH_INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.postings = {}  # {término: array de documentos, en orden creciente}
+        self.doc_source = array.array("H")  # fuente de cada documento (índice en self.source_names)
+        self.doc_pos = array.array("I")  # posición en el registro de su fuente
+        self.source_names = []
+        self.indexed = {}  # {fuente: registros ya indexados}
+        self.dirty = False
+        self.load()
+
+    def _source_id(self, source):
+        if source not in self.source_names:
+            self.source_names.append(source)
+        return self.source_names.index(source)
+
+    def update(self, source, log, text_of):
+        """Indexa los registros nuevos de `log`; text_of(registro) da el texto a indexar."""
+        with self.lock:
+            done = self.indexed.get(source, 0)
+            total = len(log)
+            if done > total:  # el registro perdió líneas (corte de luz): reindexar esa fuente
+                self._drop(source)
+                done = 0
+            if done == total:
+                return
+            sid = self._source_id(source)
+            for start in range(done, total, 1000):
+                for pos, record in enumerate(log[start:min(start + 1000, total)], start):
+                    doc = len(self.doc_pos)
+                    self.doc_source.append(sid)
+                    self.doc_pos.append(pos)
+                    for term in set(search_terms(text_of(record))):
+                        self.postings.setdefault(term, array.array("I")).append(doc)
+            self.indexed[source] = total
+            self.dirty = True
+
+    def _drop(self, source):
+        sid = self._source_id(source)
+        keep = [d for d in range(len(self.doc_pos)) if self.doc_source[d] != sid]
+        renum = {old: new for new, old in enumerate(keep)}
+        self.doc_source = array.array("H", (self.doc_source[d] for d in keep))
+        self.doc_pos = array.array("I", (self.doc_pos[d] for d in keep))
+        self.postings = {t: array.array("I", (renum[d] for d in ids if d in renum))
+                         for t, ids in self.postings.items()}
+        self.postings = {t: ids for t, ids in self.postings.items() if ids}
+        self.indexed.pop(source, None)
+
+    def search(self, query, sources, limit=SEARCH_HITS):
+        """(total de coincidencias, [(fuente, posición)] de las `limit` mejores)."""
+        terms = set(search_terms(query))
+        with self.lock:
+            allowed = {self.source_names.index(s) for s in sources if s in self.source_names}
+            n = len(self.doc_pos)
+            scores = {}
+            for term in terms:
+                matches = [(term, 1.0)]
+                if len(term) >= 3:
+                    matches += [(t, 0.5) for t in self.postings if t != term and t.startswith(term)]
+                for t, weight in matches:
+                    ids = self.postings.get(t, ())
+                    if not ids:
+                        continue
+                    idf = math.log(1 + n / len(ids)) * weight
+                    for doc in ids:
+                        if self.doc_source[doc] in allowed:
+                            scores[doc] = scores.get(doc, 0.0) + idf
+            best = sorted(scores, key=lambda d: (scores[d], d), reverse=True)[:limit]
+            return len(scores), [(self.source_names[self.doc_source[d]], self.doc_pos[d]) for d in best]
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.source_names = data["sources"]
+            self.indexed = data["indexed"]
+            self.doc_source = array.array("H", data["doc_source"])
+            self.doc_pos = array.array("I", data["doc_pos"])
+            self.postings = {t: array.array("I", ids) for t, ids in data["postings"].items()}
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"sources": self.source_names, "indexed": dict(self.indexed),
+                    "doc_source": self.doc_source.tolist(), "doc_pos": self.doc_pos.tolist(),
+                    "postings": {t: ids.tolist() for t, ids in self.postings.items()}}
+            self.dirty = False
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[ERROR guardando índice] {e}")
+
+
+class Mailbox:
+    """Buzón de mensajes privados sobre un AppendLog.
+
+    En memoria solo hay un índice por destinatario (id -> posición en el
+    registro); el texto se lee del disco al mostrar cada página. Un mensaje
+    se borra únicamente cuando su destinatario lo confirma (ack).
+    Registros: {"op": "add", "id", "to", "from", "msg"} y {"op": "del", "to", "ids"}.
+    """
+    def __init__(self, path=PRIVATE_LOG):
+        self.lock = threading.Lock()
+        self.log = AppendLog(path)
+        self._build_index()
+
+    def _build_index(self):
+        self.ids = {}  # {destinatario: [ids ordenados]}
+        self.pos = {}  # {id: posición en el registro}
+        self.next_id = 1
+        for pos, rec in enumerate(self.log):
+            if rec["op"] == "add":
+                msg_id = rec.get("id") or self.next_id  # registros sin id de versiones anteriores
+                self.ids.setdefault(rec["to"], []).append(msg_id)
+                self.pos[msg_id] = pos
+                self.next_id = max(self.next_id, msg_id + 1)
+            else:
+                self._drop(rec["to"], rec.get("ids"))
+
+    def _drop(self, user, ids=None):
+        """Quita ids (todos si None) del índice de user; devuelve los quitados."""
+        box = self.ids.get(user, [])
+        gone = set(box) if ids is None else set(ids) & set(box)
+        self.ids[user] = [i for i in box if i not in gone]
+        if not self.ids[user]:
+            del self.ids[user]
+        for i in gone:
+            del self.pos[i]
+        return sorted(gone)
+
+    def send(self, to_user, sender, msg):
+        with self.lock:
+            msg_id = self.next_id
+            self.next_id += 1
+            self.ids.setdefault(to_user, []).append(msg_id)
+            self.pos[msg_id] = len(self.log)
+            self.log.append({"op": "add", "id": msg_id, "to": to_user, "from": sender, "msg": msg})
+        return msg_id
+
+    def count(self, user):
+        with self.lock:
+            return len(self.ids.get(user, ()))
+
+    def page(self, user, after=0, limit=MAIL_PAGE):
+        """Hasta `limit` mensajes de user con id mayor que `after`, y cuántos quedan después."""
+        with self.lock:
+            box = self.ids.get(user, [])
+            start = bisect.bisect_right(box, after)
+            ids = box[start:start + limit]
+            rest = max(len(box) - start - limit, 0)
+            return [dict(self.log[self.pos[i]], id=i) for i in ids], rest
+
+    def ack(self, user, ids=None):
+        """Borra los mensajes confirmados (todos si ids es None). Devuelve cuántos."""
+        with self.lock:
+            gone = self._drop(user, ids)
+            if gone:
+                self.log.append({"op": "del", "to": user, "ids": gone})
+            if len(self.log) > max(PRIVATE_COMPACT_MIN, 2 * len(self.pos)):
+                live = [dict(self.log[p], id=i) for i, p in sorted(self.pos.items(), key=lambda kv: kv[1])]
+                next_id = self.next_id
+                self.log.compact(live)
+                self._build_index()
+                self.next_id = max(self.next_id, next_id)
+            return len(gone)
+
+
+class ReadCursors:
+    """Posición de lectura de cada usuario en un registro (p. ej. la sala pública).
+
+    El cursor es el número de mensajes ya vistos, así que los pendientes son
+    len(registro) - cursor y se leen con registro[cursor:], sin recorrer nada.
+    Se guardan en un AppendLog ({"user", "pos"}) que se compacta cuando la
+    mayoría de sus registros son posiciones ya superadas.
+    """
+    def __init__(self, path=CHAT_CURSORS_LOG):
+        self.lock = threading.Lock()
+        self.log = AppendLog(path)
+        self.pos = {}  # {usuario: mensajes vistos}
+        for rec in self.log:
+            self.pos[rec["user"]] = rec["pos"]
+
+    def get(self, user):
+        with self.lock:
+            return self.pos.get(user)
+
+    def unseen(self, user, total):
+        """(cursor, mensajes posteriores) de user en un registro de total mensajes.
+        Sin cursor, los últimos CHAT_NEW_PAGE son nuevos."""
+        pos = self.get(user)
+        if pos is None or pos > total:
+            pos = max(total - CHAT_NEW_PAGE, 0)
+        return pos, total - pos
+
+    def advance(self, user, pos):
+        """Mueve el cursor de user hasta pos (nunca hacia atrás)."""
+        with self.lock:
+            if pos <= self.pos.get(user, -1):
+                return
+            self.pos[user] = pos
+            self.log.append({"user": user, "pos": pos})
+            if len(self.log) > max(CURSORS_COMPACT_MIN, 2 * len(self.pos)):
+                self.log.compact([{"user": u, "pos": p} for u, p in self.pos.items()])
+
+
+class Job:
+    """Consulta lenta lanzada por una sesión y ejecutada por JobExecutor."""
+    def __init__(self, job_id, sess, label, fn, detached=False):
+        self.id = job_id
+        self.sess = sess
+        self.owner = sess.key if sess else None  # dirección del nodo (el nick no identifica: hay varios "Anon")
+        self.label = label
+        self.fn = fn  # fn(job) -> texto; puede consultar job.cancelled
+        self.state = "en cola"
+        self.result = ""
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.detached = detached  # True: la sesión no esperó y hay que entregarlo después
+        self.stream = detached  # el resultado se transmite mientras se genera ('stop')
+        self.submitted = time.monotonic()
+        self.started = None
+
+
+class JobExecutor:
+    """Pool acotado de hilos para consultas lentas con entrega diferida del resultado.
+
+    Con workers=0 los trabajos se ejecutan en el hilo que los envía (herramientas y pruebas).
+    """
+    def __init__(self, deliver, workers=JOB_WORKERS, max_queue=JOB_QUEUE_MAX):
+        self.deliver = deliver  # deliver(job) para trabajos terminados que nadie esperaba
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.jobs = {}  # {id: Job} en cola o en curso
+        self.next_id = 1
+        self.latencies = collections.deque(maxlen=200)  # [(espera, ejecución)]
+        self.finished = {"listo": 0, "error": 0, "cancelado": 0}
+        self.workers = workers
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, sess, label, fn, detached=False):
+        """Encola un trabajo; devuelve None si la cola está llena."""
+        with self.lock:
+            job = Job(self.next_id, sess, label, fn, detached)
+            self.next_id += 1
+            self.jobs[job.id] = job
+        if not self.workers:
+            self._run(job)
+            return job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.id]
+            return None
+        return job
+
+    def wait(self, job, timeout):
+        """Espera el resultado hasta timeout; si no llega, el trabajo queda para entrega diferida."""
+        job.done.wait(timeout)
+        with self.lock:
+            if not job.done.is_set():
+                job.detached = True
+                return False
+        return True
+
+    def cancel(self, job_id, owner):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return False
+        job.cancelled.set()
+        return True
+
+    def user_jobs(self, owner):
+        with self.lock:
+            return [job for job in self.jobs.values() if job.owner == owner]
+
+    def _worker(self):
+        while True:
+            self._run(self.queue.get())
+
+    def _run(self, job):
+        if not job.cancelled.is_set():
+            job.state = "en curso"
+            job.started = time.monotonic()
+            try:
+                job.result = job.fn(job)
+                job.state = "listo"
+            except Exception as e:
+                job.result = f"Error: {e}\n"
+                job.state = "error"
+        if job.cancelled.is_set():
+            job.state = "cancelado"
+        self._finish(job)
+
+    def _finish(self, job):
+        now = time.monotonic()
+        if job.started is not None:
+            self.latencies.append((job.started - job.submitted, now - job.started))
+        with self.lock:
+            self.jobs.pop(job.id, None)
+            self.finished[job.state] += 1
+            job.done.set()
+            detached = job.detached
+        if detached and job.state != "cancelado":
+            try:
+                self.deliver(job)
+            except Exception as e:
+                print(f"[ERROR entregando trabajo #{job.id}] {e}")
+
+    def collect(self):
+        queued = self.queue.qsize()
+        with self.lock:
+            running = len(self.jobs) - queued
+            rows = [("bbs_jobs_finished_total", "counter", {"state": state}, n)
+                    for state, n in self.finished.items()]
+        return rows + [("bbs_jobs_queued", "gauge", {}, queued), ("bbs_jobs_running", "gauge", {}, running)]
+
+    def report(self):
+        waits = sorted(w for w, _ in self.latencies)
+        runs = sorted(r for _, r in self.latencies)
+
+        def p95(values):
+            return values[int(len(values) * 0.95)] if values else 0.0
+        avg_run = sum(runs) / len(runs) if runs else 0.0
+        return (f"Trabajos: {self.queue.qsize()} en cola, {len(self.jobs) - self.queue.qsize()} en curso, "
+                f"{self.finished['listo']} listos, {self.finished['error']} con error, "
+                f"{self.finished['cancelado']} cancelados; espera p95 {p95(waits):.1f}s, "
+                f"ejecución media {avg_run:.1f}s, p95 {p95(runs):.1f}s")
+# ------------------------------------------------
+class SessionClosed(Exception):
+    """La sesión expiró por inactividad."""
+
+
+class Session:
+    """Estado de un nodo remoto: menú, nick, puntaje y cola de líneas recibidas."""
+    def __init__(self, addr, radio=None):
+        self.addr = addr  # None = terminal conectado sin tramas SLIP
+        self.key = addr  # clave en LoRaBBS.sessions (el terminal de cada radio tiene la suya)
+        self.radio = radio  # Radio por la que se oyó al nodo por última vez; sus respuestas salen por ella
+        self.name = None
+        self.score = 0
+        self.inbox = queue.Queue()
+        self.lines = LineBuffer()
+        self.outbuf = bytearray()  # salida pendiente de empaquetar (ver TxScheduler)
+        self.out_since = 0.0
+        self.flush_now = False
+        self.codec = None  # DeflateCodec si el cliente negoció '+z'
+        self.arq = None  # ArqSender si el cliente negoció '+r'
+        self.llm_max_tokens = LLM_MAX_TOKENS
+        self.llm_max_bytes = LLM_MAX_BYTES
+        self.llm_model = None  # modelo elegido en el modo LLM (None hasta elegirlo)
+        self.llm_models = []  # modelos ofrecidos mientras se espera la elección
+        self.trivia_answer = None  # letra correcta de la pregunta de trivia en curso
+        self.profile = DEFAULT_PROFILE
+        self.option = "menu"  # opción de menú en curso (contadores por opción)
+        self.option_since = 0.0
+        self.room = None  # plugin con handle() que recibe las líneas de la opción en curso; ver LoRaBBS._step
+        self.parked_at = 0.0  # monotonic al quedarse sin hilo esperando una línea
+        self.mail_after = 0  # último id de privado mostrado
+        self.mail_shown = []  # ids mostrados pendientes de 'ack'
+        self.live = CHAT_LIVE_DEFAULT  # recibe en vivo la sala pública mientras está en Chat/Foro
+        # Paginación de la respuesta en curso (ver LoRaBBS.send_paged)
+        self.page_bytes = PAGE_BYTES
+        self.pager_lock = threading.RLock()
+        self.pager_left = None  # bytes que quedan en la página actual; None = sin paginar
+        self.pager_buf = ""  # resto retenido hasta 'more'
+        self.pager_skip = False
+        self.pager_eol = True  # lo último enviado terminaba en salto de línea
+        self.pager_time = 0.0
+        self.line_at = None  # (monotonic, opción) de la última línea entregada, para bbs_response_seconds
+        self.last_seen = time.time()
+
+    def label(self):
+        if self.addr == BROADCAST_ADDR:
+            return "difusión"
+        return "serial" if self.addr is None else f"{self.addr:0{SLIP_ADDR_LEN * 2}X}"
+
+
+class Radio:
+    """Una Pico con su SX1278: puerto serie, cola de salida propia y sesión de difusión.
+
+    Cada radio tiene su TxScheduler (turnos, duty cycle y tiempo al aire con su
+    SF), así que una radio saturada no retrasa a las demás. Lo demás (chat,
+    tablón, privados, caché, trabajos) es común a todas.
+    """
+    def __init__(self, name, ser, sf=LORA_SF, description="", metrics=None):
+        self.name = name
+        self.ser = ser
+        self.sf = sf
+        self.description = description or f"{name} SF{sf}"
+        self.lock = threading.Lock()
+        self.tx = TxScheduler(self.write, metrics, name, sf)
+        self.broadcast = Session(BROADCAST_ADDR, self)  # tramas de difusión (sin '+z' ni '+r')
+        self.rx_packets = 0
+
+    def write(self, addr, data: bytes):
+        if addr is not None:
+            data = LoRaBBS._slip_encode(addr.to_bytes(SLIP_ADDR_LEN, "big") + data)
+        with self.lock:
+            self.ser.write(data)
+            self.ser.flush()
+
+    def load(self):
+        """Uso del duty cycle en la ventana actual (0 = libre, 1 = agotado)."""
+        return self.tx.duty_used()
+
+
+# Sesión atendida por el hilo/contexto actual
+_current_session = contextvars.ContextVar("bbs_session", default=None)
+
+
+class LoRaBBS:
+    def __init__(self, port, baud, ser=None, radios=None):
+        # ser: objeto tipo serial.Serial ya abierto (p. ej. el enlace simulado de benchmarks/)
+        # radios: [(puerto u objeto tipo serial.Serial, SF, descripción)] para varias Picos (ver RADIOS)
+        self.metrics = Metrics()
+        self.radios = []
+        for i, (rport, sf, description) in enumerate(radios or [(ser or port, LORA_SF, "")]):
+            if isinstance(rport, str):
+                name, rser = rport, serial.Serial(rport, baud, timeout=SERIAL_READ_TIMEOUT)
+            else:
+                name, rser = (port if not radios else f"radio{i + 1}"), rport
+            self.radios.append(Radio(name, rser, sf, description, self.metrics))
+        # --- Sesiones (una por dirección de nodo, en cualquiera de las radios) ---
+        self.sessions = {}  # {addr: Session}; el terminal sin tramas de cada radio, {nombre de la radio: Session}
+        self.sessions_lock = threading.Lock()
+        self.parked = set()  # sesiones sin hilo esperando una línea (ver _next_line)
+        self.parked_cv = threading.Condition()
+        self.handler_stats = {}  # {(opción, perfil): [usos, bytes enviados]}
+        self.cache = ResponseCache()
+        self.http = HttpPool(metrics=self.metrics)  # conexiones persistentes para todas las consultas externas
+        self.jobs = JobExecutor(self._deliver_job)
+        for collector in [radio.tx.collect for radio in self.radios] + [
+                self.http.collect, self.cache.collect, self.jobs.collect, self.collect_metrics]:
+            self.metrics.register(collector)
+        self.job_results = {}  # {clave de sesión: deque de resultados no entregados}
+        self.online_users = set()
+
+        # --- Plugins: nada se importa ni se lee de disco hasta el primer uso ---
+        self.plugins = {}  # {módulo: instancia}
+        self.plugins_lock = threading.RLock()
+        self.plugin_times = {}  # {módulo: segundos en importar e iniciar}
+        hidden = {option for option, name in PLUGINS.items() if name in PLUGINS_DISABLED}
+        self.menu_text = "".join(line for line in MENU_TEXT.splitlines(True)
+                                 if line.split(")", 1)[0] not in hidden)
+        self.search = None  # índice de chat y tablón, lo crea el primer plugin que lo usa
+        self.chat_logs = None  # (sala pública, buzón, cursores); ver chat_store()
+
+        # --- Precarga de noticias, clima y tasas más pedidos (carga sus plugins en su hilo) ---
+        self.warmer = Warmer(self.cache, self._warm_targets, self._radio_idle)
+        self.metrics.register(self.warmer.collect)
+        self.warmer.start()
+
+        # --- MultiTareas ---        
+        for radio in self.radios:
+            threading.Thread(target=self._reader_loop, args=(radio,), daemon=True).start()
+        threading.Thread(target=self._idle_loop, daemon=True).start()
+        print(f"[*] Servidor BBS activo en {', '.join(r.description for r in self.radios)} @ {baud} bps")
+
+    # --- sesión actual ---
+    @property
+    def session(self):
+        return _current_session.get()
+
+    @property
+    def session_name(self):
+        sess = self.session
+        return sess.name if sess else None
+
+    @property
+    def score(self):
+        sess = self.session
+        return sess.score if sess else 0
+
+    @score.setter
+    def score(self, value):
+        self.session.score = value
+
+    # --- utilidades ---
+    def send(self, text: str):
+        sess = self.session
+        if sess is None:
+            self.radios[0].write(None, text.encode('utf-8', errors='ignore'))
+            return
+        if sess.profile != "verbose":
+            text = to_ascii(text)
+        data = text.encode('utf-8', errors='ignore')
+        st = self.handler_stats.setdefault((sess.option, sess.profile), [0, 0])
+        st[1] += len(data)
+        sess.radio.tx.enqueue(sess, data)
+
+    def send_to(self, sess, text: str):
+        """Envía a otra sesión (p. ej. desde un hilo de trabajo), con su perfil."""
+        token = _current_session.set(sess)
+        try:
+            self.send(text)
+        finally:
+            _current_session.reset(token)
+
+    def send_broadcast(self, text: str, listeners):
+        """Envía text a varias sesiones a la vez: una sola trama a BROADCAST_ADDR por cada radio
+        con oyentes (sin compresión ni '+r', la decodifica cualquier nodo) y una copia a los
+        terminales conectados sin tramas. La trama lleva el nick de quien publica (LIVE_FROM)
+        para que su propio nodo no muestre el eco."""
+        tag = f"{LIVE_FROM}{to_ascii(self.session_name or '')}{LIVE_SEP}"
+        for radio in self.radios:
+            nodes = [s for s in listeners if s.addr is not None and s.radio is radio]
+            if not nodes:
+                continue
+            air = tag + (to_ascii(text) if all(s.profile != "verbose" for s in nodes) else text)
+            radio.tx.enqueue(radio.broadcast, air.encode('utf-8', errors='ignore'))
+            radio.tx.flush(radio.broadcast)
+            self.metrics.inc("bbs_broadcast_total", event="message")
+            self.metrics.inc("bbs_broadcast_total", len(nodes), event="recipient")
+        for sess in listeners:
+            if sess.addr is None:
+                self.send_to(sess, text)
+
+    def send_live(self, on):
+        """Marca en la salida del nodo si desde aquí muestra la difusión de la sala (ver LiveFilter).
+        El terminal conectado directamente no oye la difusión: recibe copias, no hace falta."""
+        sess = self.session
+        if sess.addr is not None:
+            self.send(f"{LIVE_ON}{to_ascii(sess.name or '')}{LIVE_SEP}" if on else LIVE_OFF)
+
+    def send_verbose(self, text: str, short: str = ""):
+        """Cabeceras y ayudas: completas en 'verbose', `short` en 'compact', nada en 'terse'."""
+        profile = self.session.profile if self.session else "verbose"
+        if profile == "verbose":
+            self.send(text)
+        elif profile == "compact" and short:
+            self.send(short)
+
+    def send_menu(self):
+        """El menú completo solo en 'verbose'; en los demás perfiles, una línea de prompt."""
+        profile = self.session.profile if self.session else "verbose"
+        if profile == "verbose":
+            self.send(self.menu_text)
+        elif profile == "compact":
+            self.send(MENU_PROMPT_COMPACT)
+        else:
+            self.send(MENU_PROMPT_TERSE)
+
+    # --- paginación ---
+    def page_start(self, sess=None, behind=False):
+        """Empieza una respuesta paginada: lo que se mande con send_paged() cuenta contra page_bytes.
+        Con behind=True (resultados diferidos, LLM) no descarta páginas aún sin leer: si hay texto
+        retenido, lo nuevo queda detrás y sale con 'more'."""
+        sess = sess or self.session
+        with sess.pager_lock:
+            if behind and sess.pager_buf and time.time() - sess.pager_time <= PAGER_IDLE_TIMEOUT:
+                return
+            sess.pager_left = sess.page_bytes or None
+            sess.pager_buf = ""
+            sess.pager_skip = False
+            sess.pager_time = time.time()
+
+    def send_paged(self, text, sess=None):
+        """Envía lo que cabe en la página actual; el resto queda retenido hasta 'more'.
+        Sirve también para salida que llega por partes (LLM en streaming)."""
+        sess = sess or self.session
+        with sess.pager_lock:
+            sess.pager_time = time.time()
+            if sess.pager_skip:
+                return
+            if sess.pager_buf:  # ya hay una página esperando: todo lo nuevo va detrás
+                sess.pager_buf += text
+                return
+            data = text.encode('utf-8', errors='ignore')
+            if sess.pager_left is None or len(data) <= sess.pager_left:
+                if sess.pager_left is not None:
+                    sess.pager_left -= len(data)
+                if text:
+                    sess.pager_eol = text.endswith("\n")
+                self.send_to(sess, text)
+                return
+            cut = self._page_cut(data, sess.pager_left, sess.pager_left < sess.page_bytes)
+            head = data[:cut].decode('utf-8', errors='ignore')
+            sess.pager_buf = data[cut:].decode('utf-8', errors='ignore')
+            sess.pager_left = 0
+            footer = ("-- más: 'more' sigue, 'skip' descarta --\n" if sess.profile == "verbose"
+                      else "-- more/skip --\n")
+            eol = head.endswith("\n") if head else sess.pager_eol
+            sess.pager_eol = True
+            self.send_to(sess, head + ("" if eol else "\n") + footer)
+
+    @staticmethod
+    def _page_cut(data, limit, started):
+        """Corte de página: tras el último fin de línea que quepa; si la página ya tiene texto,
+        pasar el trozo entero a la siguiente; si no, en un espacio, sin partir caracteres UTF-8."""
+        pos = data.rfind(b"\n", 0, limit)
+        if pos >= 0:
+            return pos + 1
+        if started:
+            return 0
+        pos = data.rfind(b" ", 0, limit)
+        return pos + 1 if pos >= limit // 2 else utf8_cut(data, limit)
+
+    def _common_command(self, cmd):
+        """Órdenes válidas en el menú, en las salas y en las preguntas de las opciones:
+        las de trabajos y las del paginador. True si la atendió."""
+        return self._job_command(cmd) or self._pager_command(cmd)
+
+    def _pager_command(self, cmd):
+        """'more', 'skip' y 'pagina <bytes>'. True si lo atendió."""
+        sess = self.session
+        low = cmd.lower()
+        if low in ("more", "mas", "más"):
+            with sess.pager_lock:
+                if sess.pager_buf and time.time() - sess.pager_time <= PAGER_IDLE_TIMEOUT:
+                    pending, sess.pager_buf = sess.pager_buf, ""
+                    sess.pager_left = sess.page_bytes or None
+                    self.send_paged(pending)
+                    return True
+                sess.pager_buf = ""
+            self.send("Nada más que mostrar.\n")
+            return True
+        if low == "skip":
+            with sess.pager_lock:
+                sess.pager_buf = ""
+                sess.pager_skip = True
+            self.send("Descartado.\n")
+            return True
+        m = re.fullmatch(r"p[aá]gina(?:\s+(\d+))?", low)  # la orden entera: "página web de..." es un prompt
+        if m:
+            if m.group(1):
+                sess.page_bytes = int(m.group(1))
+                self.send(f"Página: {sess.page_bytes or 'sin límite'} bytes\n")
+            else:
+                self.send(f"Uso: pagina <bytes> (0 = sin paginar). Actual: {sess.page_bytes}\n")
+            return True
+        return False
+
+    @staticmethod
+    def _slip_encode(payload: bytes) -> bytes:
+        payload = (payload.replace(bytes([SLIP_ESC]), bytes([SLIP_ESC, SLIP_ESC_ESC]))
+                   .replace(bytes([SLIP_END]), bytes([SLIP_ESC, SLIP_ESC_END])))
+        return bytes([SLIP_END]) + payload + bytes([SLIP_END])
+
+    def read_line_blocking(self, timeout=None, commands=True):
+        """Siguiente línea de la sesión actual.
+
+        Con timeout devuelve "" al expirar; sin timeout espera hasta
+        SESSION_IDLE_TIMEOUT y luego lanza SessionClosed. Con commands=True
+        las órdenes de trabajos y del paginador se atienden aquí y se sigue
+        esperando la respuesta a la pregunta.
+        """
+        sess = self.session
+        while True:
+            self._await_line(sess)
+            try:
+                line = sess.inbox.get(timeout=timeout or SESSION_IDLE_TIMEOUT)
+            except queue.Empty:
+                if timeout:
+                    return ""
+                raise SessionClosed()
+            line = self._took_line(sess, line)
+            if not (commands and self._common_command(line.strip())):
+                return line
+            self.send(MENU_PROMPT_TERSE)
+
+    def _await_line(self, sess):
+        sess.radio.tx.flush(sess)  # el usuario va a escribir: enviar lo pendiente ya
+        if sess.line_at is not None:
+            t0, option = sess.line_at
+            self.metrics.observe("bbs_response_seconds", time.monotonic() - t0, option=option)
+            sess.line_at = None
+
+    def _took_line(self, sess, line):
+        sess.last_seen = time.time()
+        sess.line_at = (time.monotonic(), sess.option)
+        self.metrics.inc("bbs_rx_bytes_total", len(line.encode('utf-8')) + 1)
+        return line
+
+    # --- funcionalidades ---
+    def cached(self, source, key, loader):
+        """Consulta externa a través de la caché; avisa de la edad si la copia no es fresca."""
+        value, note = self.cached_note(source, key, loader)
+        return value + note if isinstance(value, str) else value
+
+    def cached_note(self, source, key, loader):
+        """(valor, aviso de edad). Las consultas precargadas llevan siempre su edad."""
+        warm = self.warmer.is_warm(source, key)
+        value, age, fresh = self.cache.fetch(source, key, loader, warm)
+        if fresh and not (warm and age >= 60):
+            return value, ""
+        if age >= 2 * 3600:
+            return value, f"(datos en caché de hace {int(age // 3600)} h)\n"
+        return value, f"(datos en caché de hace {int(age // 60)} min)\n"
+
+    def _warm_targets(self):
+        """Consultas de WARM_* que sirven los plugins de noticias, clima y tasas."""
+        targets = []
+        for name, wanted in (("noticias", WARM_COUNTRIES), ("clima", WARM_CITIES), ("tasas", WARM_RATES)):
+            plugin = self.plugin(name) if wanted else None
+            if plugin is not None:
+                targets.extend(plugin.warm_targets())
+        return targets
+
+    def _radio_idle(self):
+        """Sin salida pendiente en ninguna radio ni trabajos en cola: momento para precargar."""
+        return not any(radio.tx.pending for radio in self.radios) and self.jobs.queue.empty()
+
+    # --- trabajos en segundo plano ---
+    def run_job(self, label, fn):
+        """Ejecuta fn(job) en el pool. Si tarda más de JOB_INLINE_WAIT el usuario sigue
+        usando el BBS y el resultado llega solo cuando esté listo."""
+        job = self.jobs.submit(self.session, label, fn)
+        if job is None:
+            self.send("Cola de trabajos llena, intenta más tarde.\n")
+            return
+        if self.jobs.wait(job, JOB_INLINE_WAIT):
+            if job.state != "cancelado":
+                self.page_start()
+                self.send_paged(job.result)
+            return
+        self.send(f"Trabajo #{job.id} en cola: {label} ('cancel {job.id}' para cancelar)\n")
+
+    def run_stream_job(self, label, fn):
+        """Como run_job, pero fn transmite su salida a medida que la genera; no se espera."""
+        job = self.jobs.submit(self.session, label, fn, detached=True)
+        if job is None:
+            self.send("Cola de trabajos llena, intenta más tarde.\n")
+            return
+        self.send(f"#{job.id} generando... ('stop' para interrumpir)\n")
+
+    def _deliver_job(self, job):
+        text = f"\n[#{job.id} {job.state}] {job.label}\n{job.result}"
+        sess = self._live_session(job)
+        if sess:
+            if not job.stream:  # el de un streaming va detrás de su propio texto paginado
+                self.page_start(sess, behind=True)
+            self.send_paged(text, sess)
+            sess.radio.tx.flush(sess)
+        elif job.owner is not None:
+            inbox = self.job_results.setdefault(job.owner, collections.deque(maxlen=JOB_INBOX_MAX))
+            inbox.append(text)
+
+    def _live_session(self, job):
+        """Sesión conectada del dueño del trabajo (la original o una nueva desde la misma dirección)."""
+        with self.sessions_lock:
+            sess = self.sessions.get(job.owner)
+        return sess if sess is not None and sess.name else None  # aún en el login: al buzón
+
+    def _job_command(self, cmd):
+        """Comandos de trabajos: jobs, stop, cancel N, resultados. True si lo atendió."""
+        name = self.session.key
+        low = cmd.lower()
+        if low == "jobs":
+            mine = self.jobs.user_jobs(name)
+            for job in mine:
+                self.send(f"#{job.id} {job.state}: {job.label}\n")
+            if not mine:
+                self.send("No tienes trabajos en curso.\n")
+            pending = len(self.job_results.get(name, ()))
+            if pending:
+                self.send(f"Resultados guardados: {pending} ('resultados' para verlos)\n")
+            self.send(f"Cola: {self.jobs.queue.qsize()}/{JOB_QUEUE_MAX}\n")
+            return True
+        if low == "stop":
+            streams = [job for job in self.jobs.user_jobs(name) if job.stream]
+            for job in streams:
+                self.jobs.cancel(job.id, name)
+            if not streams:
+                self.send("Nada que interrumpir.\n")
+            return True
+        m = re.fullmatch(r"(?:cancel|cancelar)\s+#?(\d+)", low)  # "cancelar una suscripción..." es un prompt
+        if m:
+            arg = m.group(1)
+            if self.jobs.cancel(int(arg), name):
+                self.send(f"Trabajo #{arg} cancelado.\n")
+            else:
+                self.send(f"No hay un trabajo #{arg} tuyo en curso.\n")
+            return True
+        if low == "resultados":
+            inbox = self.job_results.pop(name, None)
+            if inbox:
+                self.page_start()
+                for text in inbox:
+                    self.send_paged(text)
+            else:
+                self.send("No hay resultados guardados.\n")
+            return True
+        return False
+
+    # --- plugins ---
+    def plugin(self, name):
+        """Instancia del plugin plugins/<name>, importado e iniciado la primera vez que se
+        pide. None si está en PLUGINS_DISABLED."""
+        if name in PLUGINS_DISABLED:
+            return None
+        with self.plugins_lock:
+            plugin = self.plugins.get(name)
+            if plugin is None:
+                t0 = time.perf_counter()
+                plugin = self._new_plugin(importlib.import_module(f"plugins.{name}"))
+                self.plugins[name] = plugin
+                self.plugin_times[name] = time.perf_counter() - t0
+                print(f"[*] Plugin {name} cargado en {self.plugin_times[name] * 1000:.0f} ms")
+            return plugin
+
+    def _new_plugin(self, module):
+        return module.Plugin(self)
+
+    @staticmethod
+    def _legacy_json(log_path, path):
+        """Contenido del antiguo archivo .json si el registro aún no existe (migración)."""
+        if os.path.exists(log_path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def chat_store(self):
+        """(sala pública, buzón de privados, cursores de lectura) de Chat/Foro.
+
+        Se abren la primera vez que hacen falta (el login cuenta con ellos los
+        pendientes) sin importar el plugin de chat ni el índice de búsqueda; el
+        plugin usa estos mismos al elegir la opción 6.
+        """
+        with self.plugins_lock:
+            if self.chat_logs is None:
+                # Registro de mensajes "[fecha] usuario: texto"; no se carga entero en memoria
+                legacy = self._legacy_json(CHAT_LOG, "chat_public.json") or []
+                chat_public = AppendLog(CHAT_LOG)
+                for entry in legacy:
+                    chat_public.append(entry)
+                legacy = self._legacy_json(PRIVATE_LOG, "private_chat.json") or {}
+                mailbox = Mailbox(PRIVATE_LOG)
+                for to_user, senders in legacy.items():
+                    for sender, msg_list in senders.items():
+                        for msg in msg_list:
+                            mailbox.send(to_user, sender, msg)
+                self.chat_logs = (chat_public, mailbox, ReadCursors(CHAT_CURSORS_LOG))
+            return self.chat_logs
+
+    def flush_storage(self):
+        """Vacía los registros de los plugins cargados y de Chat/Foro, y guarda el índice de búsqueda."""
+        with self.plugins_lock:
+            plugins = list(self.plugins.values())
+            chat_logs = self.chat_logs
+        logs = [log for plugin in plugins for log in getattr(plugin, "logs", list)()]
+        if chat_logs:  # con el plugin de chat cargado son los mismos: vaciar dos veces no escribe nada
+            chat_public, mailbox, cursors = chat_logs
+            logs += [chat_public, mailbox.log, cursors.log]
+        for log in logs:
+            log.flush()
+        if self.search is not None:
+            self.search.save()
+
+    # --- búsqueda ---
+    @staticmethod
+    def _post_text(record):
+        """Texto visible de un registro del chat ("[fecha] usuario: texto") o del tablón (dict)."""
+        if isinstance(record, dict):
+            return f"{record.get('user')}: {record.get('msg', '')}"
+        return record.split("] ", 1)[-1]
+
+    def search_index(self):
+        with self.plugins_lock:
+            if self.search is None:
+                self.search = SearchIndex()
+            return self.search
+
+    def index_log(self, source, log):
+        """Pone al día el índice con lo publicado en un registro (chat o una categoría del tablón)."""
+        self.search_index().update(source, log, self._post_text)
+
+    def search_posts(self, query, logs):
+        """'search <término>' en los registros {fuente: log}: los SEARCH_HITS mejores
+        resultados, una línea recortada cada uno."""
+        terms = search_terms(query)
+        if not terms:
+            self.send("Uso: search <término>\n")
+            return
+        total, hits = self.search_index().search(query, list(logs))
+        if not hits:
+            self.send(f"Sin resultados para '{query}'.\n")
+            return
+        self.send_verbose(f"Resultados para '{query}' ({len(hits)} de {total}):\n", f"{len(hits)}/{total}:\n")
+        for source, pos in hits:
+            record = logs[source][pos]
+            text = self._post_text(record)
+            ts = (record.get("timestamp", "") if isinstance(record, dict) else record[1:20])[:16]
+            # Recortar alrededor de la primera palabra buscada
+            folded = fold_text(text)
+            at = min((folded.find(t) for t in terms if t in folded), default=0)
+            start = max(0, min(at - SEARCH_SNIPPET // 3, len(text) - SEARCH_SNIPPET))
+            snippet = ("…" if start else "") + text[start:start + SEARCH_SNIPPET]
+            snippet += "…" if start + SEARCH_SNIPPET < len(text) else ""
+            where = "" if source == "chat" else source.split(":", 1)[1] + " "
+            self.send(f"{where}#{pos} [{ts}] {snippet}\n")
+
+    # --- bucle principal (lectura del puerto y reparto por nodo) ---
+    def _reader_loop(self, radio):
+        decoder = SlipDecoder()
+        while True:
+            try:
+                # Bloquea en el puerto hasta el primer byte y luego lee todo lo pendiente
+                data = radio.ser.read(max(1, radio.ser.in_waiting))
+                if not data:
+                    continue
+                for addr, payload in decoder.feed(data):
+                    self._route(radio, addr, payload)
+            except Exception as e:
+                print(f"[ERROR en reader_loop {radio.name}] {e}")
+                self.metrics.inc("bbs_errors_total", component="reader", radio=radio.name)
+                time.sleep(1)
+
+    def _route(self, radio, addr, data: bytes):
+        """Entrega datos recibidos a la sesión del nodo, creándola si no existe. Un nodo
+        queda asignado a la radio por la que se le oyó por última vez."""
+        if addr == BROADCAST_ADDR:  # ningún nodo transmite con la dirección de difusión
+            return
+        if addr is not None:
+            radio.rx_packets += 1
+        key = addr if addr is not None else radio.name
+        is_ack = data[:1] == bytes([ArqSender.ACK])  # ACK del transporte fiable, no es texto
+        with self.sessions_lock:
+            sess = self.sessions.get(key)
+            if sess is not None and sess.radio is not radio:
+                self._move(sess, radio)
+            if sess is None and not is_ack:
+                sess = self.sessions[key] = Session(addr, radio)
+                sess.key = key
+                threading.Thread(target=self._session_loop, args=(sess, True), daemon=True).start()
+        if is_ack:
+            if sess is not None and sess.arq is not None:
+                radio.tx.ack(sess, data)
+            return
+        for line in sess.lines.feed(data):
+            sess.inbox.put(line)
+        self._wake(sess)
+
+    @staticmethod
+    def _move(sess, radio):
+        """El nodo se oye ahora por otra radio: lo pendiente y las respuestas salen por ella."""
+        old, sess.radio = sess.radio, radio
+        if old.tx.release(sess) or (sess.arq is not None and sess.arq.waiting()):
+            radio.tx.adopt(sess)
+        print(f"[*] Sesión {sess.label()} ({sess.name}) pasa de {old.name} a {radio.name}")
+
+    def _session_loop(self, sess, login=False, expired=False):
+        """Atiende la sesión mientras tenga líneas. Si espera una en el menú o en una sala,
+        el hilo termina y la sesión queda aparcada hasta que _route (o _idle_loop) la despierte."""
+        _current_session.set(sess)
+        try:
+            if expired and sess.inbox.empty():
+                raise SessionClosed()
+            if login:
+                self._login()
+            while True:
+                line = self._next_line(sess)
+                if line is None:
+                    return
+                if not self._step(line):
+                    break
+        except SessionClosed:
+            self.send("\nSesión cerrada por inactividad.\n")
+        except Exception as e:
+            print(f"[ERROR en sesión {sess.label()}] {e}")
+            self.metrics.inc("bbs_errors_total", component="session")
+        sess.radio.tx.flush(sess)
+        with self.sessions_lock:
+            if self.sessions.get(sess.key) is sess:
+                del self.sessions[sess.key]
+            # el nick sigue presente si otra sesión viva lo usa (mismo usuario desde otro nodo)
+            if sess.name and all(s.name != sess.name for s in self.sessions.values()):
+                self.online_users.discard(sess.name)
+        nbytes, packets, airtime = sess.radio.tx.stats.get(sess.label(), (0, 0, 0.0))
+        print(f"[*] Sesión {sess.label()} ({sess.name}) finalizada: "
+              f"{nbytes} bytes, {packets} paquetes, {airtime:.1f}s al aire")
+
+    def _next_line(self, sess):
+        """Siguiente línea ya recibida; si no hay ninguna, aparca la sesión y devuelve None."""
+        self._await_line(sess)
+        with self.parked_cv:
+            try:
+                line = sess.inbox.get_nowait()
+            except queue.Empty:
+                sess.parked_at = time.monotonic()
+                if not self.parked:
+                    self.parked_cv.notify()  # las siguientes vencen después que esta
+                self.parked.add(sess)
+                return None
+        return self._took_line(sess, line)
+
+    def _wake(self, sess, expired=False):
+        """Pone un hilo a atender una sesión aparcada (llegó una línea o venció su espera)."""
+        with self.parked_cv:
+            if sess not in self.parked:
+                return
+            self.parked.discard(sess)
+        threading.Thread(target=self._session_loop, args=(sess, False, expired), daemon=True).start()
+
+    def _idle_loop(self):
+        """Cierra las sesiones aparcadas más de SESSION_IDLE_TIMEOUT; duerme hasta el próximo vencimiento."""
+        while True:
+            with self.parked_cv:
+                now = time.monotonic()
+                due = [s for s in self.parked if now - s.parked_at >= SESSION_IDLE_TIMEOUT]
+                if not due:
+                    first = min((s.parked_at for s in self.parked), default=None)
+                    self.parked_cv.wait(None if first is None else first + SESSION_IDLE_TIMEOUT - now)
+                    continue
+            for sess in due:
+                self._wake(sess, expired=True)
+
+    def _login(self):
+        sess = self.session
+        first = self.read_line_blocking(commands=False)  # cualquier línea abre la sesión
+        if first.startswith("+"):
+            self._negotiate(first)
+        self.send("\n>>> Conexión aceptada.\n")
+        #self.send_menu() # mostrar el menu directamente
+        self.send("Nombre de usuario:\n> ")
+        name = self.read_line_blocking(timeout=30, commands=False)
+        if name:
+            sess.name = name.strip() or "Anon"
+        else:
+            sess.name = "Anon"
+        with self.sessions_lock:  # ver el descarte al cerrar en _session_loop
+            self.online_users.add(sess.name)
+        print(f"[*] Sesión {sess.label()} iniciada como {sess.name}")
+        self.send(f"Bienvenido a LoRa BBS Gateway v0.1, {sess.name}!\n")
+        self.send_verbose("(Escribe 'perfil c' para menús compactos y menos tiempo de aire)\n")
+        self._suggest_radio(sess)
+        if self.job_results.get(sess.key):
+            self.send(f"Tienes {len(self.job_results[sess.key])} resultados de trabajos ('resultados' para verlos).\n")
+        # Avisar de privados pendientes y de lo nuevo en la sala pública (se leen por páginas en Chat/Foro);
+        # solo con los registros, sin cargar el plugin ni el índice de búsqueda
+        chat_public, mailbox, cursors = self.chat_store() if "chat" not in PLUGINS_DISABLED else ((), None, None)
+        unread = mailbox.count(sess.name) if mailbox else 0
+        if unread:
+            self.send_verbose(f"Tienes {unread} mensajes privados ('viewprivate' en Chat/Foro, opción 6).\n",
+                              f"{unread} privados (6: viewprivate)\n")
+        unseen = cursors.unseen(sess.name, len(chat_public))[1] if cursors else 0
+        if unseen:
+            self.send_verbose(f"Hay {unseen} mensajes nuevos en la sala pública ('new' en Chat/Foro, opción 6).\n",
+                              f"{unseen} nuevos en sala (6: new)\n")
+        self.send_menu()
+
+    def _step(self, line):
+        """Atiende una línea: la pasa a la sala en curso o la ejecuta como orden del menú.
+        Devuelve False si el usuario se desconecta."""
+        sess = self.session
+        if sess.room is None:
+            cmd = line.strip()
+            sess.option = cmd if re.fullmatch(r"\d{1,2}", cmd) else "menu"
+            st = self.handler_stats.setdefault((sess.option, sess.profile), [0, 0])
+            st[0] += 1
+            sess.option_since = time.monotonic()
+        keep = True
+        try:
+            if sess.room is not None:
+                if self._common_command(line.strip()):  # páginas y trabajos pendientes, desde cualquier sala
+                    self.send(MENU_PROMPT_TERSE)
+                elif not sess.room.handle(line):
+                    sess.room = None
+                    self.send_menu()
+            else:
+                keep = self._handle_command(cmd)
+        except SessionClosed:
+            raise
+        except Exception as e:
+            print(f"[ERROR en sesión {sess.label()}] {e}")
+            self.metrics.inc("bbs_handler_errors_total", option=sess.option)
+            sess.room = None
+        if sess.room is None:  # terminó la opción (una sala, al salir de ella)
+            self.metrics.observe("bbs_handler_seconds", time.monotonic() - sess.option_since, option=sess.option)
+            sess.option = "menu"
+        return keep
+
+    def _suggest_radio(self, sess):
+        """Con varias radios: si la del nodo va cargada y otra está mucho más libre, sugiere cambiar.
+        Al oírse el nodo por la otra radio, su sesión pasa a ella (ver _route)."""
+        if sess.addr is None or len(self.radios) < 2:
+            return
+        load = sess.radio.load()
+        best = min(self.radios, key=Radio.load)
+        if load >= RADIO_MOVE_DUTY and best.load() < load / 2:
+            self.send_verbose(f"Esta radio va cargada ({load:.0%} del duty cycle). Más libre: {best.description}\n",
+                              f"Radio libre: {best.description}\n")
+
+    def _negotiate(self, line):
+        """Opciones en la primera línea: '+r [ventana]' y/o '+z <id>' (ej. '+r +z 1a2b3c4d')."""
+        opts = {}
+        for part in line.split():
+            if part.startswith("+"):
+                key = part
+                opts[key] = []
+            elif opts:
+                opts[key].append(part)
+        if "+r" in opts:  # antes que '+z': su respuesta ya sale en fragmentos numerados
+            self._negotiate_reliable(opts["+r"])
+        if "+z" in opts:
+            self._negotiate_compression(opts["+z"])
+
+    def _negotiate_reliable(self, args):
+        """'+r [ventana]': transporte fiable (ver ArqSender). La ventana es la menor entre la
+        del cliente, ARQ_WINDOW y los fragmentos llenos que caben en ARQ_WINDOW_AIRTIME."""
+        sess = self.session
+        if not ARQ_ENABLED or sess.addr is None:
+            self.send("+r no\n")
+            return
+        window = int(args[0]) if args and args[0].isdigit() else ARQ_WINDOW
+        window = max(1, min(window, ARQ_WINDOW, int(ARQ_WINDOW_AIRTIME / sess.radio.tx.airtime(LORA_MTU))))
+        sess.arq = ArqSender(window, sess.radio.tx.arq_counters)
+        self.send(f"+r ok {window}\n")
+
+    def _negotiate_compression(self, args):
+        """'+z <id>' al conectar: activa deflate si el diccionario del cliente coincide."""
+        sess = self.session
+        try:
+            dict_id = int(args[0], 16) if args else BBS_ZDICT_ID
+        except ValueError:
+            dict_id = None
+        if not COMPRESSION_ENABLED or sess.addr is None or dict_id != BBS_ZDICT_ID:
+            self.send("+z no\n")
+            return
+        sess.codec = DeflateCodec()
+        self.send(f"+z ok {BBS_ZDICT_ID:08x}\n")
+
+    def _handle_command(self, cmd):
+        """Ejecuta una opción del menú. Devuelve False si el usuario se desconecta."""
+        if cmd.lower() in ("q", "quit", "exit", "disconnect"):
+            self.send("Desconectando sesión...\n")
+            return False
+
+        if cmd in PLUGINS:
+            plugin = self.plugin(PLUGINS[cmd])
+            if plugin is None:
+                self.send("Opción desactivada.\n")
+            elif self._open_room(plugin):
+                return True  # el menú sale al dejar la sala
+            else:
+                plugin.run()
+            self.send_menu()
+            return True
+
+        if cmd == "0":
+            self.send("Hecho por Slam (2025)\n")
+            self.send("Github.com: https://github.com/aayes89\n")
+            self.send_menu()
+            return True
+        if self._job_command(cmd):
+            self.send_menu()
+            return True
+        if self._pager_command(cmd):
+            self.send(MENU_PROMPT_TERSE)  # sin repetir el menú entre páginas
+            return True
+        if cmd.lower() in ("m", "menu", "menú"):
+            self.send(self.menu_text)
+            return True
+        if cmd.lower().startswith("perfil"):
+            self.set_profile(cmd[6:].strip().lower())
+            self.send_menu()
+            return True
+        if cmd.lower() in ("metricas", "métricas", "metrics") and self.is_operator():
+            self.page_start()
+            self.send_paged(self.metrics_report() + "\n")
+            self.send_menu()
+            return True
+        self.send("Comando desconocido.\n")
+        self.send_menu()
+        return True
+
+    def _open_room(self, plugin):
+        """Plugins con handle() (ver plugins/__init__.py): la sesión entra en la sala y las líneas
+        siguientes van a handle() desde _step, sin un hilo esperando entre una y otra."""
+        if not hasattr(plugin, "handle"):
+            return False
+        self.session.room = plugin
+        if plugin.enter() is False:  # no se pudo entrar (ej. LLM sin modelos): vuelve al menú
+            self.session.room = None
+            self.send_menu()
+        return True
+
+    def set_profile(self, name):
+        sess = self.session
+        profile = PROFILE_ALIASES.get(name, name)
+        if profile in PROFILES:
+            sess.profile = profile
+            self.send(f"Perfil: {profile}\n")
+        else:
+            self.send(f"Perfil actual: {sess.profile}. Uso: perfil verbose|compact|terse (v/c/t)\n")
+
+    def profile_report(self):
+        """Bytes medios por uso de cada opción del menú, por perfil."""
+        lines = ["Bytes por opción (usos, media por uso):"]
+        for (option, profile), (uses, nbytes) in sorted(self.handler_stats.items()):
+            lines.append(f"  {option:>4} [{profile}]: {uses} usos, {nbytes // max(uses, 1)} bytes/uso")
+        return "\n".join(lines)
+
+    # --- métricas ---
+    def is_operator(self):
+        """Terminal serie conectado directamente o nick en OPERATORS (los nicks no se autentican)."""
+        sess = self.session
+        return sess is not None and (sess.addr is None or sess.name in OPERATORS)
+
+    def collect_metrics(self):
+        """Sesiones, uso por opción, carga de plugins y reserva de trivia para Metrics.register()."""
+        rows = [("bbs_sessions", "gauge", {}, len(self.sessions)),
+                ("bbs_sessions_parked", "gauge", {}, len(self.parked))]
+        with self.sessions_lock:
+            per_radio = collections.Counter(sess.radio.name for sess in self.sessions.values())
+        for radio in self.radios:
+            rows.append(("bbs_radio_sessions", "gauge", {"radio": radio.name}, per_radio[radio.name]))
+            rows.append(("bbs_radio_rx_packets_total", "counter", {"radio": radio.name}, radio.rx_packets))
+        for name, seconds in list(self.plugin_times.items()):
+            rows.append(("bbs_plugin_load_seconds", "gauge", {"plugin": name}, seconds))
+        trivia = self.plugins.get("trivia")
+        if trivia is not None:
+            rows.append(("bbs_trivia_pool", "gauge", {}, len(trivia.trivia)))
+        for (option, profile), (uses, nbytes) in list(self.handler_stats.items()):
+            rows.append(("bbs_handler_uses_total", "counter", {"option": option, "profile": profile}, uses))
+            rows.append(("bbs_tx_bytes_total", "counter", {"option": option, "profile": profile}, nbytes))
+        return rows
+
+    def radio_report(self):
+        """Por radio: sesiones asignadas, paquetes recibidos, cola pendiente y uso de aire por sesión."""
+        with self.sessions_lock:
+            per_radio = collections.Counter(sess.radio.name for sess in self.sessions.values())
+        lines = []
+        for radio in self.radios:
+            lines.append(f"Radio {radio.description}: {per_radio[radio.name]} sesiones, "
+                         f"{radio.rx_packets} paquetes recibidos, {radio.tx.pending_bytes()} bytes en cola")
+            lines.append(radio.tx.report())
+        return "\n".join(lines)
+
+    def metrics_report(self):
+        """Resumen para 'metricas': lo mismo que se imprime en la consola más las latencias."""
+        return "\n".join([f"Sesiones: {len(self.sessions)} ({len(self.parked)} en espera sin hilo)",
+                          self.metrics.latency_report(), self.radio_report(), self.profile_report(),
+                          self.cache.report(), self.warmer.report(), self.jobs.report(), self.http.report()])
+
+def main():
+    bbs = LoRaBBS(SERIAL_PORT, BAUDRATE, radios=RADIOS or None)
+    if METRICS_PORT:
+        try:
+            bbs.metrics.serve(METRICS_PORT)
+            print(f"[*] Métricas en http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"[ERROR métricas] no se pudo abrir el puerto {METRICS_PORT}: {e}")
+    try:
+        while True:
+            time.sleep(TX_REPORT_INTERVAL)
+            if any(radio.tx.stats for radio in bbs.radios):
+                print(f"[*] Uso de radio\n{bbs.radio_report()}\n{bbs.profile_report()}")
+            print(f"[*] {bbs.cache.report()}")
+            print(f"[*] {bbs.jobs.report()}")
+            print(f"[*] {bbs.warmer.report()}")
+            print(f"[*] {bbs.http.report()}")
+            print(f"[*] {bbs.metrics.latency_report()}")
+            if METRICS_FILE:
+                try:
+                    bbs.metrics.write(METRICS_FILE)
+                except OSError as e:
+                    print(f"[ERROR métricas] {e}")
+            bbs.http.sweep()
+            bbs.cache.save()
+            if bbs.search is not None:
+                bbs.search.save()
+    except KeyboardInterrupt:
+        bbs.cache.save()
+        bbs.flush_storage()
+
+if __name__ == "__main__":
+    # Los plugins importan 'bbs_server_rpi': que sea este mismo módulo y no una segunda copia
+    sys.modules.setdefault("bbs_server_rpi", sys.modules[__name__])
+    main()
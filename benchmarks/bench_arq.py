@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del transporte fiable ('+r') con pérdida de paquetes (MIT, ver LICENSE).
+
+Recorre la misma sesión guionizada (Wikipedia, noticias con 'more',
+calendario, chat y una consulta al LLM) sobre benchmarks/lora_sim.py con
+distintas probabilidades de pérdida de los paquetes del BBS hacia el nodo,
+con y sin '+r', y compara la transcripción recibida con la de un enlace
+perfecto. Las líneas que escribe el nodo no se pierden (para que el guion no
+se descoloque); los ACK se pierden con la misma probabilidad que los datos.
+
+Informa, por modo y pérdida: sesiones con la transcripción intacta, bytes de
+texto perdidos, tiempo al aire (bajada y subida) y duración.
+
+Uso:
+    python benchmarks/bench_arq.py                          # pérdidas 0, 5, 10 y 20 %
+    python benchmarks/bench_arq.py --loss 0.1 0.3 --runs 4 --no-compress
+"""
+import argparse
+import difflib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bbs_server_rpi  # noqa: E402
+import stub_servers  # noqa: E402
+from lora_sim import LoRaLink  # noqa: E402
+
+SCRIPT = ["bench", "2", "LoRa", "4", "México", "more", "9", "2025 12", "salir",
+          "6", "viewpublic", "salir", "5", "1", "qué es LoRa", "salir"]
+
+
+def session(loss, reliable, compress, seed, quiet):
+    """Una sesión completa. Devuelve (transcripción, airtime bajada, airtime subida, duración)."""
+    link = LoRaLink(loss=loss, seed=seed, loss_up=0.0)
+    bbs = bbs_server_rpi.LoRaBBS("lora-sim", bbs_server_rpi.BAUDRATE, ser=link.port)
+    bbs.cache.path = None  # las sesiones corren en paralelo: cada una con su caché en memoria
+    node = link.node(0x0100 + seed, compress=compress, reliable=reliable, ack_loss=loss)
+    t0 = time.monotonic()
+    for line in [node.hello()] + SCRIPT:
+        since = time.monotonic()
+        node.send_line(line)
+        node.wait_quiet(since, quiet)
+    text = b"".join(p for _, p in node.received).decode("utf-8", errors="replace")
+    if text.startswith("+r"):  # la respuesta a la negociación no cuenta
+        text = text.split("\n", 1)[1]
+    return text, link.stats["down"]["airtime"], link.stats["up"]["airtime"], time.monotonic() - t0
+
+
+def lost_bytes(ref, got):
+    matched = sum(b.size for b in difflib.SequenceMatcher(None, ref, got, autojunk=False).get_matching_blocks())
+    return len(ref.encode("utf-8")) - len(ref[:matched].encode("utf-8"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Transporte fiable con pérdida de paquetes")
+    ap.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.05, 0.1, 0.2])
+    ap.add_argument("--runs", type=int, default=3, help="sesiones (semillas) por modo y pérdida")
+    ap.add_argument("--no-compress", action="store_true")
+    ap.add_argument("--quiet", type=float, default=4.0, help="silencio que da por terminada una respuesta (s)")
+    args = ap.parse_args()
+    compress = not args.no_compress
+
+    proc, port = stub_servers.start_process(0.05)
+    bbs_server_rpi.HTTP_HOST_OVERRIDES.update(stub_servers.overrides(port, bbs_server_rpi.LM_BASE_URL))
+    bbs_server_rpi.WARM_COUNTRIES = bbs_server_rpi.WARM_CITIES = ()
+    bbs_server_rpi.WARM_RATES = False
+    workdir = tempfile.TemporaryDirectory(prefix="bbs_arq_")
+    os.chdir(workdir.name)
+
+    ref = session(0.0, False, compress, 0, args.quiet)[0]
+    cases = [(loss, reliable, seed) for loss in args.loss for reliable in (False, True)
+             for seed in range(1, args.runs + 1)]
+    results = {}
+    lock = threading.Lock()
+
+    def run(case):
+        loss, reliable, seed = case
+        text, down, up, elapsed = session(loss, reliable, compress, seed, args.quiet)
+        with lock:
+            results[case] = (text == ref, lost_bytes(ref, text), down, up, elapsed)
+
+    threads = [threading.Thread(target=run, args=(case,)) for case in cases]  # un enlace por sesión
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    proc.terminate()
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+
+    print(f"\nTranscripción de referencia: {len(ref.encode('utf-8'))} bytes\n")
+    print(f"{'pérdida':>7} {'modo':>5} {'intactas':>9} {'perdidos':>9} {'aire bajada':>12} "
+          f"{'aire subida':>12} {'duración':>9}")
+    for loss in args.loss:
+        for reliable in (False, True):
+            rows = [results[(loss, reliable, seed)] for seed in range(1, args.runs + 1)]
+            n = len(rows)
+            print(f"{loss:>7.0%} {'+r' if reliable else 'plano':>5} {sum(r[0] for r in rows):>5}/{n:<3} "
+                  f"{sum(r[1] for r in rows) / n:>7.0f} B {sum(r[2] for r in rows) / n:>10.1f}s "
+                  f"{sum(r[3] for r in rows) / n:>10.1f}s {sum(r[4] for r in rows) / n:>8.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la sala pública en vivo frente a consultar (MIT, ver LICENSE).
+
+N nodos entran al Chat/Foro sobre benchmarks/lora_sim.py y uno de ellos
+publica varios mensajes. Se compara el tiempo al aire que cuesta que los
+demás los vean:
+ - viewpublic: cada oyente pide los últimos 10 tras cada mensaje (antes).
+ - new: cada oyente pide solo lo que no ha visto ('new').
+ - live: el BBS difunde cada mensaje una sola vez a BROADCAST_ADDR.
+Solo se cuenta el aire desde la primera publicación (no el login). También
+comprueba que cada oyente recibió todos los mensajes.
+
+Uso:
+    python benchmarks/bench_broadcast.py                    # 1, 2, 4 y 8 oyentes
+    python benchmarks/bench_broadcast.py --listeners 3 6 --posts 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bbs_server_rpi  # noqa: E402
+import stub_servers  # noqa: E402
+from lora_sim import LoRaLink  # noqa: E402
+
+MODES = ("viewpublic", "new", "live")
+
+
+def run(mode, listeners, posts, quiet):
+    """Devuelve (aire bajada, aire subida, paquetes de bajada, oyentes que vieron todo)."""
+    workdir = tempfile.TemporaryDirectory(prefix="bbs_bcast_")
+    os.chdir(workdir.name)
+    with open(bbs_server_rpi.CHAT_LOG, "w", encoding="utf-8") as f:  # sala con historia previa
+        for i in range(10):
+            f.write(f'"[2025-06-01 10:00:{i:02d}] u{i % 3}: mensaje anterior {i}"\n')
+    link = LoRaLink()
+    bbs = bbs_server_rpi.LoRaBBS("lora-sim", bbs_server_rpi.BAUDRATE, ser=link.port)
+    bbs.cache.path = None
+    nodes = [link.node(0x0100 + i) for i in range(listeners + 1)]
+    poster, others = nodes[0], nodes[1:]
+
+    def step(node, line):
+        since = time.monotonic()
+        node.send_line(line)
+        node.wait_quiet(since, quiet)
+
+    for i, node in enumerate(nodes):
+        for line in ("hola", f"n{i}", "6", "viewpublic" if mode == "new" else "live on"):
+            step(node, line)  # en 'new' viewpublic deja a todos al día
+        if mode != "live":
+            step(node, "live off")
+    base = {d: dict(link.stats[d]) for d in ("down", "up")}
+    since = time.monotonic()
+    for k in range(posts):
+        step(poster, f"public aviso número {k} para la sala")
+        if mode != "live":
+            for node in others:
+                step(node, mode)
+    time.sleep(quiet)
+    seen = sum(all(f"aviso número {k} " in text for k in range(posts))
+               for text in (node.wait_quiet(since, 0)[1] for node in others))
+    down = link.stats["down"]["airtime"] - base["down"]["airtime"]
+    up = link.stats["up"]["airtime"] - base["up"]["airtime"]
+    packets = link.stats["down"]["packets"] - base["down"]["packets"]
+    bbs.flush_storage()
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+    return down, up, packets, seen
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sala pública en vivo frente a consultar")
+    ap.add_argument("--listeners", type=int, nargs="+", default=[1, 2, 4, 8], help="nodos que leen la sala")
+    ap.add_argument("--posts", type=int, default=3, help="mensajes publicados")
+    ap.add_argument("--quiet", type=float, default=1.5, help="silencio que da por terminada una respuesta (s)")
+    args = ap.parse_args()
+
+    # Nada sale a la red, pero la precarga no debe competir por la radio
+    dead = "http://127.0.0.1:9"
+    bbs_server_rpi.HTTP_HOST_OVERRIDES.update({h: dead for h in stub_servers.HOSTS + (bbs_server_rpi.LM_BASE_URL,)})
+    bbs_server_rpi.WARM_COUNTRIES = bbs_server_rpi.WARM_CITIES = ()
+    bbs_server_rpi.WARM_RATES = False
+
+    rows = []
+    for n in args.listeners:
+        for mode in MODES:
+            rows.append((n, mode) + run(mode, n, args.posts, args.quiet))
+    print(f"\n{args.posts} mensajes publicados\n")
+    print(f"{'oyentes':>7} {'modo':>10} {'aire bajada':>12} {'aire subida':>12} {'paquetes':>9} {'vieron todo':>12}")
+    for n, mode, down, up, packets, seen in rows:
+        print(f"{n:>7} {mode:>10} {down:>11.1f}s {up:>11.1f}s {packets:>9} {seen:>8}/{n:<3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de extremo a extremo del BBS sobre un enlace LoRa simulado (MIT, ver LICENSE).
+
+Arranca LoRaBBS con el puerto serie sustituido por benchmarks/lora_sim.py y
+los servicios externos sustituidos por benchmarks/stub_servers.py (en otro
+proceso), y recorre todas las opciones del menú con sesiones guionizadas.
+Para cada comando informa la latencia (desde que se envía la línea hasta el
+último paquete de respuesta, p50/p90/p99), los bytes y el tiempo al aire y
+la CPU del proceso del BBS por petición.
+
+Uso:
+    python benchmarks/bench_e2e.py                       # 3 iteraciones, 1 nodo
+    python benchmarks/bench_e2e.py -n 5 --nodes 3 --loss 0.02 --compress --reliable --profile c
+    python benchmarks/bench_e2e.py --options 2 5 --json resultado.json
+    python benchmarks/bench_e2e.py --nodes 4 --radios 2       # nodos repartidos entre 2 radios
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bbs_server_rpi  # noqa: E402
+import stub_servers  # noqa: E402
+from lora_sim import LoRaLink  # noqa: E402
+
+# Guion por opción del menú; {i} es el número de iteración (evita aciertos de caché)
+SCRIPTS = {
+    "1": ["1", "lora {i}"],
+    "2": ["2", "LoRa {i}"],
+    "3": ["3", "Madrid {i}"],
+    "4": ["4", "{country}"],
+    "5": ["5", "1", "qué es LoRa {i}", "salir"],
+    "6": ["6", "viewpublic", "public hola {i}", "viewprivate", "salir"],
+    "7": ["7", "list", "read general", "post general aviso {i}", "salir"],
+    "8": ["8", "B", "salir"],
+    "9": ["9", "2025 {month}", "salir"],
+    "10": ["10", "{country}"],
+    "0": ["0"],
+}
+COUNTRIES = ["México", "España", "Chile", "Argentina", "Colombia", "Perú", "Canadá", "Japón"]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+class Runner:
+    def __init__(self, link, addr, args, results, lock):
+        self.node = link.node(addr, compress=args.compress, reliable=args.reliable)
+        self.link = link
+        self.addr = addr
+        self.args = args
+        self.results = results  # {etiqueta: [(latencia, bytes, airtime, cpu)]}
+        self.lock = lock
+
+    def step(self, line, label=None):
+        air0 = list(self.link.by_node.get(self.addr, [0, 0.0]))
+        cpu0 = time.process_time()
+        t0 = time.monotonic()
+        self.node.send_line(line)
+        last, _ = self.node.wait_quiet(t0, self.args.quiet)
+        cpu = time.process_time() - cpu0
+        air1 = self.link.by_node.get(self.addr, [0, 0.0])
+        if label:
+            sample = (last - t0 if last else None, air1[0] - air0[0], air1[1] - air0[1], cpu)
+            with self.lock:
+                self.results.setdefault(label, []).append(sample)
+
+    def run(self):
+        self.step(self.node.hello())
+        self.step(f"bench{self.addr:04x}", "login")
+        if self.args.profile:
+            self.step(f"perfil {self.args.profile}")
+        for i in range(self.args.iterations):
+            fill = {"i": i, "country": COUNTRIES[i % len(COUNTRIES)], "month": i % 12 + 1}
+            for option in self.args.options:
+                for n, template in enumerate(SCRIPTS[option]):
+                    self.step(template.format(**fill), f"{option:>2} {n}:{template}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de extremo a extremo sobre LoRa simulado")
+    ap.add_argument("-n", "--iterations", type=int, default=3)
+    ap.add_argument("--nodes", type=int, default=1, help="nodos remotos en paralelo")
+    ap.add_argument("--radios", type=int, default=1, help="radios del BBS (un canal cada una, nodos por turnos)")
+    ap.add_argument("--options", nargs="+", default=list(SCRIPTS), choices=list(SCRIPTS))
+    ap.add_argument("--loss", type=float, default=0.0, help="probabilidad de perder cada paquete")
+    ap.add_argument("--compress", action="store_true", help="negociar compresión deflate")
+    ap.add_argument("--reliable", action="store_true", help="negociar transporte fiable ('+r')")
+    ap.add_argument("--profile", choices=["v", "c", "t"], help="perfil de salida de las sesiones")
+    ap.add_argument("--latency", type=float, default=0.05, help="latencia de los servicios simulados (s)")
+    ap.add_argument("--quiet", type=float, default=1.5, help="silencio que da por terminada una respuesta (s)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="guardar resultados en este archivo")
+    args = ap.parse_args()
+
+    proc, port = stub_servers.start_process(args.latency)
+    bbs_server_rpi.HTTP_HOST_OVERRIDES.update(stub_servers.overrides(port, bbs_server_rpi.LM_BASE_URL))
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.TemporaryDirectory(prefix="bbs_bench_")
+    os.chdir(workdir.name)  # chat, tablón, caché y trivia en un directorio temporal
+    links = [LoRaLink(loss=args.loss, seed=args.seed + r) for r in range(args.radios)]
+    if args.radios == 1:
+        bbs_server_rpi.LoRaBBS("lora-sim", bbs_server_rpi.BAUDRATE, ser=links[0].port)
+    else:
+        bbs_server_rpi.LoRaBBS("lora-sim", bbs_server_rpi.BAUDRATE,
+                               radios=[(link.port, link.sf, f"canal {r + 1}") for r, link in enumerate(links)])
+
+    results, lock = {}, threading.Lock()
+    runners = [Runner(links[n % args.radios], 0x0100 + n, args, results, lock) for n in range(args.nodes)]
+    threads = [threading.Thread(target=r.run) for r in runners]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+    proc.terminate()
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+
+    print(f"\n{'comando':<28} {'n':>3} {'p50':>7} {'p90':>7} {'p99':>7} {'bytes':>6} {'aire':>6} {'cpu':>7}")
+    rows = {}
+    for label in sorted(results, key=lambda k: (k == "login", k)):
+        samples = results[label]
+        lat = [s[0] for s in samples if s[0] is not None]
+        row = {
+            "n": len(samples), "sin_respuesta": len(samples) - len(lat),
+            "p50": percentile(lat, 0.5), "p90": percentile(lat, 0.9), "p99": percentile(lat, 0.99),
+            "bytes": sum(s[1] for s in samples) / len(samples),
+            "airtime": sum(s[2] for s in samples) / len(samples),
+            "cpu_ms": sum(s[3] for s in samples) / len(samples) * 1000,
+        }
+        rows[label] = row
+        print(f"{label[:28]:<28} {row['n']:>3} {row['p50']:>6.2f}s {row['p90']:>6.2f}s {row['p99']:>6.2f}s "
+              f"{row['bytes']:>6.0f} {row['airtime']:>5.1f}s {row['cpu_ms']:>5.1f}ms")
+    print(f"\nDuración {elapsed:.1f}s")
+    totals = []
+    for r, link in enumerate(links):
+        total = {d: dict(st) for d, st in link.stats.items()}
+        totals.append(total)
+        busy = sum(st["airtime"] for st in total.values())
+        print(f"{'Canal' if args.radios == 1 else f'Canal {r + 1}'} ocupado {busy:.1f}s ({busy / elapsed:.0%})")
+        for d, st in total.items():
+            print(f"  {'bajada' if d == 'down' else 'subida'}: {st['packets']} paquetes, {st['bytes']} bytes, "
+                  f"{st['airtime']:.1f}s al aire, {st['lost']} perdidos, {st['oversize']} > MTU")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "duration": elapsed, "link": totals[0] if args.radios == 1 else totals,
+                       "commands": rows}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de sesiones en espera (MIT, ver LICENSE).
+
+Cada medición es un proceso nuevo que importa bbs_server_rpi, conecta N
+nodos que se quedan esperando (en el menú o dentro del Chat/Foro) y luego
+mide, con todos ellos conectados, la latencia de un nodo más que sí envía
+órdenes. Informa:
+ - login: segundos hasta que los N nodos tienen el menú (en paralelo).
+ - hilos: hilos vivos del proceso con los N nodos esperando.
+ - RSS: memoria máxima del proceso.
+ - p50/p90: desde que llega una orden hasta la respuesta completa.
+El puerto serie es un búfer en memoria sin tiempo al aire ni duty cycle:
+se mide el coste del BBS por sesión, no el del enlace.
+
+Uso:
+    python benchmarks/bench_idle.py                         # 10, 100 y 500 nodos
+    git archive HEAD~1 | (mkdir -p /tmp/old && tar -x -C /tmp/old)
+    python benchmarks/bench_idle.py --src /tmp/old --nodes 100 500 --where menu chat
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEAD = "http://127.0.0.1:9"  # puerto 'discard': conexión rechazada al instante
+# (entrar, orden medida, marca de respuesta completa) según dónde esperan los nodos
+PLACES = {
+    "menu": (None, "0", b"Github.com"),
+    "chat": ("6", "getusers", b"Usuarios presentes"),
+}
+
+
+class MemoryPort:
+    """Puerto serie en memoria: las tramas del BBS se decodifican al escribirlas, sin tiempo al aire."""
+    def __init__(self, bbs_mod):
+        self.bbs_mod = bbs_mod
+        self.cv = threading.Condition()
+        self.rx = bytearray()
+        self.decoder = bbs_mod.SlipDecoder()
+        self.text = {}  # {dirección: bytearray recibido}
+
+    @property
+    def in_waiting(self):
+        return len(self.rx)
+
+    def read(self, size=1):
+        with self.cv:
+            while not self.rx:
+                self.cv.wait()
+            data = bytes(self.rx[:size])
+            del self.rx[:size]
+            return data
+
+    def write(self, data):
+        with self.cv:
+            for addr, payload in self.decoder.feed(data):
+                self.text.setdefault(addr, bytearray()).extend(payload)
+            self.cv.notify_all()
+
+    def flush(self):
+        pass
+
+    def send(self, addr, line):
+        """Línea de un nodo; devuelve la posición desde la que buscar su respuesta."""
+        frame = self.bbs_mod.LoRaBBS._slip_encode(
+            addr.to_bytes(self.bbs_mod.SLIP_ADDR_LEN, "big") + (line + "\n").encode())
+        with self.cv:
+            start = len(self.text.get(addr, b""))
+            self.rx += frame
+            self.cv.notify_all()
+        return start
+
+    def wait_for(self, addr, start, marker, timeout=120):
+        deadline = time.monotonic() + timeout
+        with self.cv:
+            while marker not in self.text.get(addr, b"")[start:]:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError(f"{addr:04X}: {marker}")
+                self.cv.wait(left)
+
+
+def child(src, nodes, where, rounds):
+    """Una medición; imprime una línea JSON."""
+    sys.path.insert(0, src)
+    import bbs_server_rpi as bbs_mod
+    sys.path.insert(0, HERE)
+    import stub_servers
+    bbs_mod.HTTP_HOST_OVERRIDES.update({host: DEAD for host in stub_servers.HOSTS + (bbs_mod.LM_BASE_URL,)})
+    bbs_mod.WARM_COUNTRIES = bbs_mod.WARM_CITIES = ()
+    bbs_mod.WARM_RATES = False
+    bbs_mod.LORA_DUTY_CYCLE = 1.0  # sin aire real, el presupuesto no debe frenar el envío
+    port = MemoryPort(bbs_mod)
+    bbs = bbs_mod.LoRaBBS("memoria", bbs_mod.BAUDRATE, ser=port)
+    bbs.cache.path = None
+    enter, command, marker = PLACES[where]
+
+    def all_of(addrs, line, mark):
+        starts = {addr: port.send(addr, line(addr)) for addr in addrs}
+        for addr, start in starts.items():
+            port.wait_for(addr, start, mark)
+
+    idle = [0x1000 + i for i in range(nodes)]
+    t0 = time.monotonic()
+    all_of(idle, lambda addr: "hola", b"Nombre de usuario")
+    all_of(idle, lambda addr: f"n{addr:04x}", b"q) Desconectar")
+    t_login = time.monotonic() - t0
+    if enter:
+        all_of(idle, lambda addr: enter, b"> ")
+    active = 0x0100
+    all_of([active], lambda addr: "hola", b"Nombre de usuario")
+    all_of([active], lambda addr: "activo", b"q) Desconectar")
+    if enter:
+        all_of([active], lambda addr: enter, b"> ")
+    time.sleep(1.0)  # que terminen los envíos pendientes y los hilos que ya no hacen falta
+    threads = threading.active_count()
+    lat = []
+    for _ in range(rounds):
+        t = time.monotonic()
+        all_of([active], lambda addr: command, marker)
+        lat.append(time.monotonic() - t)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"login": t_login, "threads": threads, "rss": rss,
+                      "p50": statistics.median(lat), "p90": statistics.quantiles(lat, n=10)[-1]}))
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def run_once(src, nodes, where, rounds):
+    workdir = tempfile.mkdtemp(prefix="bbs_idle_")
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", src, str(nodes), where, str(rounds)],
+                         cwd=workdir, capture_output=True, text=True, timeout=900)
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stdout[-2000:] + out.stderr[-2000:])
+    return json.loads(lines[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Hilos, memoria y latencia con muchas sesiones en espera")
+    ap.add_argument("--nodes", type=int, nargs="+", default=[10, 100, 500], help="nodos esperando")
+    ap.add_argument("--where", nargs="+", default=["menu", "chat"], choices=sorted(PLACES))
+    ap.add_argument("--rounds", type=int, default=20, help="órdenes medidas del nodo activo")
+    ap.add_argument("--src", action="append", default=[], help="otro árbol del BBS a comparar (repetible)")
+    ap.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        src, nodes, where, rounds = args.child
+        child(src, int(nodes), where, int(rounds))
+        return
+
+    print(f"{'árbol':<16} {'espera':>6} {'nodos':>6} {'login':>7} {'hilos':>6} {'RSS':>8} {'p50':>8} {'p90':>8}")
+    for src in [ROOT] + args.src:
+        for where in args.where:
+            for nodes in args.nodes:
+                r = run_once(src, nodes, where, args.rounds)
+                print(f"{os.path.basename(os.path.normpath(src))[:16]:<16} {where:>6} {nodes:>6} "
+                      f"{r['login']:>6.2f}s {r['threads']:>6} {r['rss'] / 1024:>6.1f}MB "
+                      f"{r['p50'] * 1000:>6.1f}ms {r['p90'] * 1000:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
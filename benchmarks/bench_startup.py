@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque del BBS (MIT, ver LICENSE).
+
+Cada medición es un proceso nuevo que importa bbs_server_rpi, crea LoRaBBS
+sobre benchmarks/lora_sim.py con un directorio de datos poblado (chat,
+privados, tablón, trivia e índice de búsqueda) y conecta un nodo. Informa:
+ - import: tiempo de importar bbs_server_rpi.
+ - listo: desde que arranca el proceso hasta que LoRaBBS acepta tramas.
+ - conexión: hasta que llega '>>> Conexión aceptada.' al nodo (incluye el aire).
+ - login: hasta que llega el menú tras enviar el nombre.
+ - RSS: memoria máxima del proceso al conectar y tras el login.
+Los servicios externos apuntan a un puerto local cerrado (la precarga y la
+trivia fallan al momento, sin red).
+
+Uso:
+    python benchmarks/bench_startup.py                      # árbol actual, 5 arranques
+    git archive HEAD~1 | (mkdir -p /tmp/old && tar -x -C /tmp/old)
+    python benchmarks/bench_startup.py --src /tmp/old -n 5  # comparar con otro árbol
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEAD = "http://127.0.0.1:9"  # puerto 'discard': conexión rechazada al instante
+
+
+def populate(path, chat, posts, private):
+    """Registros JSON Lines como los que deja un BBS con uso."""
+    with open(os.path.join(path, "chat_public.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(chat):
+            entry = f"[2025-06-01 10:{i // 60 % 60:02d}:{i % 60:02d}] u{i % 17}: mensaje {i} sobre antenas y nodos"
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    for cat in ("General", "LoRa", "Off-Topic"):
+        with open(os.path.join(path, f"boards_{cat}.jsonl"), "w", encoding="utf-8") as f:
+            for i in range(posts):
+                f.write(json.dumps({"user": f"u{i % 11}", "msg": f"anuncio {i} de {cat}",
+                                    "timestamp": "2025-06-01 09:00:00"}, ensure_ascii=False) + "\n")
+    with open(os.path.join(path, "private_chat.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(private):
+            f.write(json.dumps({"op": "add", "id": i + 1, "to": f"u{i % 5}", "from": "ana",
+                                "msg": f"privado {i}"}) + "\n")
+    trivia = [["¿Qué significa LoRa?\nA) Low Rate\nB) Long Range\nC) Local Radio\nD) Long Radio", "B"]] * 10
+    with open(os.path.join(path, "trivia_pool.json"), "w", encoding="utf-8") as f:
+        json.dump(trivia, f, ensure_ascii=False)
+
+
+def child(src, t_spawn, flush):
+    """Un arranque medido; imprime una línea JSON con los tiempos."""
+    t0 = time.time()
+    sys.path.insert(0, src)
+    import bbs_server_rpi as bbs_mod
+    t_import = time.time() - t0
+    sys.path.insert(0, HERE)
+    import stub_servers
+    from lora_sim import LoRaLink
+    bbs_mod.HTTP_HOST_OVERRIDES.update({host: DEAD for host in stub_servers.HOSTS + (bbs_mod.LM_BASE_URL,)})
+    link = LoRaLink()
+    bbs = bbs_mod.LoRaBBS("lora-sim", bbs_mod.BAUDRATE, ser=link.port)
+    t_ready = time.time()
+    node = link.node(0x0100)
+    node.send_line("hola")
+    wait_for(node, b"Conexi")
+    t_conn = time.time()
+    rss_conn = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    node.send_line("bench")
+    wait_for(node, b"q) Desconectar")
+    t_login = time.time()
+    rss_login = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if flush:
+        bbs.flush_storage()
+    print(json.dumps({"import": t_import, "ready": t_ready - t_spawn, "conn": t_conn - t_spawn,
+                      "login": t_login - t_spawn, "rss_conn": rss_conn, "rss_login": rss_login}))
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def wait_for(node, marker, timeout=60):
+    deadline = time.monotonic() + timeout
+    with node.cv:
+        while marker not in b"".join(p for _, p in node.received):
+            if time.monotonic() > deadline:
+                raise TimeoutError(marker)
+            node.cv.wait(timeout=0.05)
+
+
+def run_once(src, data, flush=False):
+    workdir = tempfile.mkdtemp(prefix="bbs_start_")
+    shutil.copytree(data, workdir, dirs_exist_ok=True)
+    t_spawn = time.time()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", src, str(t_spawn)]
+                         + (["--flush"] if flush else []),
+                         cwd=workdir, capture_output=True, text=True, timeout=300)
+    if flush:
+        shutil.copytree(workdir, data, dirs_exist_ok=True)
+    shutil.rmtree(workdir, ignore_errors=True)
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stdout + out.stderr)
+    return json.loads(lines[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tiempo de arranque y memoria del BBS")
+    ap.add_argument("-n", "--runs", type=int, default=5)
+    ap.add_argument("--src", action="append", default=[], help="otro árbol del BBS a comparar (repetible)")
+    ap.add_argument("--chat", type=int, default=20000, help="mensajes en la sala pública")
+    ap.add_argument("--posts", type=int, default=2000, help="anuncios por categoría del tablón")
+    ap.add_argument("--private", type=int, default=500, help="mensajes privados pendientes")
+    ap.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    ap.add_argument("--flush", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child[0], float(args.child[1]), args.flush)
+        return
+
+    data = tempfile.mkdtemp(prefix="bbs_data_")
+    populate(data, args.chat, args.posts, args.private)
+    for src in [ROOT] + args.src:
+        run_once(src, data, flush=True)  # deja guardado el índice de búsqueda de cada árbol
+    print(f"{'árbol':<24} {'import':>7} {'listo':>7} {'conexión':>9} {'login':>7} {'RSS conn':>9} {'RSS login':>10}")
+    for src in [ROOT] + args.src:
+        rows = [run_once(src, data) for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in rows) for k in rows[0]}
+        print(f"{os.path.basename(os.path.normpath(src))[:24]:<24} {med['import'] * 1000:>5.0f}ms "
+              f"{med['ready'] * 1000:>5.0f}ms {med['conn'] * 1000:>7.0f}ms {med['login'] * 1000:>5.0f}ms "
+              f"{med['rss_conn'] / 1024:>7.1f}MB {med['rss_login'] / 1024:>8.1f}MB")
+    shutil.rmtree(data, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del almacenamiento del chat (MIT, ver LICENSE).
+
+Compara la latencia de publicar un mensaje con el formato antiguo (reescribir
+todo el JSON con indent=2) y con AppendLog, con 1k, 10k y 100k mensajes de
+historia, y el tiempo de arranque (abrir + leer los últimos 10).
+
+Uso:
+    python benchmarks/bench_storage.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bbs_server_rpi import AppendLog  # noqa: E402
+
+
+def _msg(i):
+    return f"[2025-06-01 10:00:00] usuario{i % 50}: mensaje de prueba número {i} en la sala pública"
+
+
+def _ms(values):
+    values = sorted(values)
+    return sum(values) / len(values) * 1000, values[int(len(values) * 0.99)] * 1000
+
+
+def bench_legacy(path, size, posts):
+    history = [_msg(i) for i in range(size)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    t0 = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        history = json.load(f)
+    history[-10:]
+    startup = time.perf_counter() - t0
+    times = []
+    for i in range(posts):
+        t0 = time.perf_counter()
+        history.append(_msg(size + i))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+        times.append(time.perf_counter() - t0)
+    return startup, times, None  # sin fsync: un corte a mitad deja el archivo truncado
+
+
+def bench_log(path, size, posts):
+    with open(path, "wb") as f:
+        f.writelines(AppendLog._encode(_msg(i)) for i in range(size))
+    t0 = time.perf_counter()
+    log = AppendLog(path)
+    log[-10:]
+    startup = time.perf_counter() - t0
+    post, durable = [], []
+    for i in range(posts):
+        t0 = time.perf_counter()
+        log.append(_msg(size + i))
+        post.append(time.perf_counter() - t0)
+        if i % 10 == 9:  # ráfaga de 10 mensajes por commit agrupado
+            log.flush()
+            durable.append((time.perf_counter() - t0) / 10)
+    return startup, post, durable
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de almacenamiento del chat")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--posts", type=int, default=200, help="mensajes publicados por medición")
+    args = ap.parse_args()
+    print(f"{'historia':>9} {'formato':>9} {'arranque':>10} {'post media':>11} {'post p99':>9} "
+          f"{'con fsync':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for name, fn, posts in (("json", bench_legacy, min(args.posts, 20)),
+                                    ("appendlog", bench_log, args.posts)):
+                startup, post, durable = fn(os.path.join(tmp, f"{name}{size}"), size, posts)
+                avg, p99 = _ms(post)
+                synced = f"{_ms(durable)[0]:>8.3f}ms" if durable else f"{'-':>10}"
+                print(f"{size:>9} {name:>9} {startup * 1000:>8.1f}ms {avg:>9.3f}ms {p99:>7.3f}ms {synced}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comprueba que la caché de consultas sobrevive a reinicios (MIT, ver LICENSE).
+
+Guarda entradas de varias fuentes (incluidas respuestas del LLM), las
+escribe en disco y las vuelve a cargar en una ResponseCache nueva varias
+veces seguidas, como si el BBS se reiniciara. Tras cada recarga, tanto la
+memoria como el archivo en disco deben tener las mismas entradas, con sus
+valores y su edad, y un save() al salir no debe perder ninguna.
+
+Uso:
+    python benchmarks/check_cache.py
+    python benchmarks/check_cache.py --entries 50 --restarts 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bbs_server_rpi import ResponseCache  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Guardar y recargar la caché de consultas")
+    ap.add_argument("--entries", type=int, default=20)
+    ap.add_argument("--restarts", type=int, default=3)
+    args = ap.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="bbs_cache_")
+    path = os.path.join(workdir.name, "cache.json")
+    sources = ("wikipedia", "weather", "news", "llm")
+    cache = ResponseCache(path=path)
+    expected = {}
+    ts = time.time() - 600  # con edad, para comprobar que se conserva
+    for i in range(args.entries):
+        source = sources[i % len(sources)]
+        key, value = f"clave {i}", f"respuesta {i} de {source}\n"
+        cache.put(source, key, value, ts)
+        expected[(source, key)] = value
+    cache.save()
+
+    failures = 0
+    for n in range(1, args.restarts + 1):
+        cache = ResponseCache(path=path)
+        got = {k: v for k, (_, v, _) in cache.entries.items()}
+        with open(path, encoding="utf-8") as f:
+            disk = {(source, key): value for source, key, _, value in json.load(f)}
+        ok = got == expected == disk and all(abs(t - ts) < 1 for t, _, _ in cache.entries.values())
+        failures += not ok
+        print(f"[{'OK' if ok else 'FALLA'}] reinicio {n}: {len(got)}/{len(expected)} en memoria, "
+              f"{len(disk)} en disco")
+        cache.save()  # al salir (main)
+    workdir.cleanup()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enlace LoRa simulado para probar el BBS sin Picos ni radios (MIT, ver LICENSE).
+
+LoRaLink modela un canal half-duplex compartido: cada trama SLIP es un
+paquete LoRa que ocupa el canal durante lora_airtime() y llega al otro lado
+al terminar de transmitirse. Los paquetes de más de LORA_MTU bytes se
+descartan y cada paquete puede perderse con probabilidad `loss` (`loss_up`
+para los que van de los nodos al BBS, si es distinta). Las tramas a
+BROADCAST_ADDR son un solo paquete que reciben todos los nodos. Cada
+LoRaLink es un canal (frecuencia y SF); para varias radios, un LoRaLink por
+radio (LoRaBBS(..., radios=[(link.port, link.sf, "canal 1"), ...])).
+
+    link = LoRaLink(loss=0.01)
+    bbs = LoRaBBS("sim", BAUDRATE, ser=link.port)   # lado del BBS
+    node = link.node(0x0001)                          # un nodo remoto
+    node.send_line("hola")
+"""
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bbs_server_rpi import (  # noqa: E402
+    BBS_ZDICT_ID, BROADCAST_ADDR, LORA_MTU, LORA_SF, SLIP_ADDR_LEN, ArqReceiver, DeflateCodec, LiveFilter,
+    LoRaBBS, SlipDecoder, lora_airtime,
+)
+
+
+class LoRaLink:
+    """Canal LoRa half-duplex entre la Pico del BBS (port) y los nodos remotos."""
+    def __init__(self, loss=0.0, mtu=LORA_MTU, seed=None, loss_up=None, sf=LORA_SF):
+        self.loss = {"down": loss, "up": loss if loss_up is None else loss_up}
+        self.mtu = mtu
+        self.sf = sf
+        self.rng = random.Random(seed)
+        self.cv = threading.Condition()
+        self.busy_until = 0.0
+        self.queue = []  # heap [(t entrega, n, entregar, payload)]
+        self.seq = 0
+        self.nodes = {}  # {dirección: SimNode}
+        self.stats = {d: {"packets": 0, "bytes": 0, "airtime": 0.0, "lost": 0, "oversize": 0}
+                      for d in ("up", "down")}
+        self.by_node = {}  # {dirección: [bytes al aire, airtime]} en ambos sentidos
+        self.port = SimSerial(self)
+        threading.Thread(target=self._deliver_loop, daemon=True).start()
+
+    def node(self, addr, compress=False, reliable=False, ack_loss=None):
+        self.nodes[addr] = SimNode(self, addr, compress, reliable, ack_loss)
+        return self.nodes[addr]
+
+    def transmit(self, direction, payload, deliver, loss=None):
+        """Pone un paquete en el aire; deliver(payload) se llama cuando termina de llegar.
+        `loss` sustituye a la probabilidad de pérdida del sentido para este paquete."""
+        st = self.stats[direction]
+        with self.cv:
+            if len(payload) > self.mtu:
+                st["oversize"] += 1
+                return
+            airtime = lora_airtime(len(payload), sf=self.sf)
+            start = max(time.monotonic(), self.busy_until)
+            self.busy_until = start + airtime
+            st["packets"] += 1
+            st["bytes"] += len(payload)
+            st["airtime"] += airtime
+            node = self.by_node.setdefault(int.from_bytes(payload[:SLIP_ADDR_LEN], "big"), [0, 0.0])
+            node[0] += len(payload)
+            node[1] += airtime
+            if self.rng.random() < (self.loss[direction] if loss is None else loss):
+                st["lost"] += 1
+                return
+            self.seq += 1
+            heapq.heappush(self.queue, (start + airtime, self.seq, deliver, payload))
+            self.cv.notify()
+
+    def _deliver_loop(self):
+        while True:
+            with self.cv:
+                while not self.queue or self.queue[0][0] > time.monotonic():
+                    self.cv.wait(timeout=self.queue[0][0] - time.monotonic() if self.queue else None)
+                _, _, deliver, payload = heapq.heappop(self.queue)
+            deliver(payload)
+
+
+class SimSerial:
+    """Sustituto de serial.Serial del lado del BBS: tramas SLIP de entrada y salida."""
+    def __init__(self, link):
+        self.link = link
+        self.cv = threading.Condition()
+        self.rx = bytearray()
+        self.decoder = SlipDecoder()
+        self.raw = 0  # bytes escritos fuera de tramas (sin destino en el enlace)
+
+    @property
+    def in_waiting(self):
+        return len(self.rx)
+
+    def read(self, size=1, timeout=1.0):
+        with self.cv:
+            if not self.rx:
+                self.cv.wait(timeout)
+            data = bytes(self.rx[:size])
+            del self.rx[:size]
+            return data
+
+    def write(self, data):
+        for addr, payload in self.decoder.feed(data):
+            if addr is None:
+                self.raw += len(payload)
+                continue
+            frame = addr.to_bytes(SLIP_ADDR_LEN, "big") + payload
+            if addr == BROADCAST_ADDR:  # un solo paquete que oyen todos los nodos
+                self.link.transmit("down", frame, self._broadcast)
+                continue
+            node = self.link.nodes.get(addr)
+            self.link.transmit("down", frame, node.receive if node else (lambda p: None))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _broadcast(self, frame):
+        for node in list(self.link.nodes.values()):
+            node.receive(frame)
+
+    def receive(self, frame):
+        """Llega un paquete de un nodo: la Pico lo entrega al PC como trama SLIP."""
+        with self.cv:
+            self.rx += LoRaBBS._slip_encode(frame)
+            self.cv.notify()
+
+
+class SimNode:
+    """Nodo remoto: envía líneas al BBS y guarda lo recibido con su hora de llegada."""
+    def __init__(self, link, addr, compress=False, reliable=False, ack_loss=None):
+        self.link = link
+        self.addr = addr
+        self.compress = compress
+        self.arq = ArqReceiver() if reliable else None  # pedir '+r' en la primera línea
+        self.ack_loss = ack_loss  # pérdida propia de los ACK (None = la del enlace)
+        self.live = LiveFilter()  # como bbs_client.py: difusión solo dentro de la sala y sin el eco propio
+        self.cv = threading.Condition()
+        self.received = []  # [(t, bytes)]
+
+    def hello(self):
+        """Primera línea: las opciones que este nodo quiere negociar."""
+        opts = (["+r"] if self.arq else []) + ([f"+z {BBS_ZDICT_ID:08x}"] if self.compress else [])
+        return " ".join(opts) or "hola"
+
+    def send_line(self, text):
+        self._send((text + "\n").encode("utf-8"))
+
+    def _send(self, payload, loss=None):
+        self.link.transmit("up", self.addr.to_bytes(SLIP_ADDR_LEN, "big") + payload, self.link.port.receive, loss)
+
+    def receive(self, frame):
+        bodies = [frame[SLIP_ADDR_LEN:]]
+        if int.from_bytes(frame[:SLIP_ADDR_LEN], "big") == BROADCAST_ADDR:  # texto plano para todos
+            self._store([self.live.feed_broadcast(bodies[0])])
+            return
+        if self.arq is not None and ArqReceiver.is_frame(bodies[0]):
+            bodies, ack = self.arq.feed(bodies[0])
+            if ack:
+                self._send(ack, self.ack_loss)
+        bodies = [DeflateCodec.decompress(p) for p in bodies] if self.compress else bodies
+        self._store([self.live.feed_session(p) for p in bodies])
+
+    def _store(self, bodies):
+        now = time.monotonic()
+        with self.cv:
+            self.received.extend((now, payload) for payload in bodies if payload)
+            self.cv.notify_all()
+
+    def wait_quiet(self, since, quiet=1.5, timeout=120.0):
+        """Espera a que pasen `quiet` segundos sin recibir nada. Devuelve
+        (hora del último paquete recibido después de `since` o None, texto recibido)."""
+        deadline = time.monotonic() + timeout
+        with self.cv:
+            while True:
+                got = [(t, p) for t, p in self.received if t >= since]
+                last = got[-1][0] if got else since
+                now = time.monotonic()
+                if now - last >= quiet or now >= deadline:
+                    text = b"".join(p for _, p in got).decode("utf-8", errors="replace")
+                    return (got[-1][0] if got else None), text
+                self.cv.wait(timeout=last + quiet - now)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prueba de varias radios con pares pty en lugar de Picos (MIT, ver LICENSE).
+
+Crea un par pseudo-terminal por radio, arranca LoRaBBS con RADIOS apuntando
+al lado esclavo (pyserial real, como con las Picos) y usa el lado maestro
+como la radio: escribe tramas SLIP de los nodos y lee las que manda el BBS.
+Comprueba que:
+ - cada nodo recibe sus respuestas solo por la radio en la que se le oyó;
+ - chat y tablón son comunes (lo publicado en una radio se lee en otra);
+ - la difusión de la sala pública sale solo por las radios con oyentes;
+ - un nodo que se oye por otra radio pasa a ella;
+y muestra las estadísticas por radio. Solo Linux/macOS (os.openpty).
+
+Uso:
+    python benchmarks/pty_radios.py
+    python benchmarks/pty_radios.py --radios 3
+"""
+import argparse
+import os
+import select
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import bbs_server_rpi  # noqa: E402
+from bbs_server_rpi import BROADCAST_ADDR, SLIP_ADDR_LEN, LoRaBBS, SlipDecoder  # noqa: E402
+
+
+class PtyRadio:
+    """Lado 'aire' de una radio: lo que el BBS escribe en el pty sale por aquí."""
+    def __init__(self):
+        self.master, slave = os.openpty()
+        self.path = os.ttyname(slave)
+        self.slave = slave  # abierto hasta el final para que el pty no se cierre
+        self.decoder = SlipDecoder()
+        self.frames = []  # [(dirección, payload)]
+
+    def send(self, addr, line):
+        os.write(self.master, LoRaBBS._slip_encode(addr.to_bytes(SLIP_ADDR_LEN, "big") + (line + "\n").encode()))
+
+    def pump(self, seconds):
+        """Lee lo que llegue durante `seconds`."""
+        deadline = time.monotonic() + seconds
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            if select.select([self.master], [], [], left)[0]:
+                self.frames.extend(self.decoder.feed(os.read(self.master, 4096)))
+
+    def text(self, addr, start=0):
+        return b"".join(p for a, p in self.frames[start:] if a == addr).decode("utf-8", errors="replace")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Varias radios del BBS sobre pares pty")
+    ap.add_argument("--radios", type=int, default=2)
+    ap.add_argument("--wait", type=float, default=1.0, help="segundos de espera por respuesta")
+    args = ap.parse_args()
+
+    bbs_server_rpi.HTTP_HOST_OVERRIDES.update({h: "http://127.0.0.1:9" for h in (
+        "news.google.com", "wttr.in", "api.exchangerate-api.com", bbs_server_rpi.LM_BASE_URL)})
+    bbs_server_rpi.WARM_COUNTRIES = bbs_server_rpi.WARM_CITIES = ()
+    bbs_server_rpi.WARM_RATES = False
+    workdir = tempfile.TemporaryDirectory(prefix="bbs_pty_")
+    os.chdir(workdir.name)
+    radios = [PtyRadio() for _ in range(args.radios)]
+    bbs = LoRaBBS(None, bbs_server_rpi.BAUDRATE,
+                  radios=[(r.path, 9 - i % 3, f"pty {i + 1}") for i, r in enumerate(radios)])
+    failures = 0
+
+    def step(radio, addr, line):
+        start = len(radio.frames)
+        radio.send(addr, line)
+        for r in radios:
+            r.pump(args.wait / len(radios))
+        return radio.text(addr, start)
+
+    def check(what, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"[{'OK' if ok else 'FALLA'}] {what}")
+
+    # Un nodo por radio, cada uno con su nombre
+    nodes = [(radio, 0x0100 + i) for i, radio in enumerate(radios)]
+    for i, (radio, addr) in enumerate(nodes):
+        step(radio, addr, "hola")
+        out = step(radio, addr, f"nodo{i}")
+        check(f"nodo{i} atendido por {radio.path}", f"Bienvenido a LoRa BBS Gateway v0.1, nodo{i}!" in out)
+    check("cada nodo solo recibe por su radio",
+          all(a == addr for radio, addr in nodes for a, _ in radio.frames))
+
+    # Estado compartido: tablón publicado en la radio 1 y leído en la última
+    (r_first, a_first), (r_last, a_last) = nodes[0], nodes[-1]
+    step(r_first, a_first, "7")
+    step(r_first, a_first, "post general aviso desde la radio 1")
+    step(r_first, a_first, "salir")
+    step(r_last, a_last, "7")
+    out = step(r_last, a_last, "read general")
+    step(r_last, a_last, "salir")
+    check("tablón común a todas las radios", "aviso desde la radio 1" in out)
+
+    # Sala pública: oyente en la última radio; la difusión sale solo por ella
+    step(r_last, a_last, "6")
+    step(r_first, a_first, "6")
+    starts = [len(r.frames) for r in radios]
+    step(r_first, a_first, "public hola desde la radio 1")
+    for r in radios:
+        r.pump(args.wait)
+    sent = [[p for a, p in r.frames[s:] if a == BROADCAST_ADDR] for r, s in zip(radios, starts)]
+    check("difusión solo por la radio con oyentes",
+          any(b"hola desde la radio 1" in p for p in sent[-1]) and not any(sent[:-1]))
+
+    # El primer nodo se oye ahora por la última radio: su sesión (y sus respuestas) pasan a ella
+    out = step(r_last, a_first, "getusers")
+    check(f"nodo0 pasa a {r_last.path}", "Usuarios presentes" in out)
+    step(r_last, a_first, "salir")
+
+    print()
+    print(bbs.radio_report())
+    os.chdir(os.path.dirname(workdir.name))
+    workdir.cleanup()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
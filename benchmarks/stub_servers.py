@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidores HTTP de prueba que imitan a los servicios externos del BBS (MIT, ver LICENSE).
+
+Un único servidor local responde como DuckDuckGo, Wikipedia, wttr.in,
+Google News, exchangerate-api.com y LM Studio (con y sin streaming), con
+una latencia configurable. overrides(port) devuelve el mapa para
+HTTP_HOST_OVERRIDES / HttpPool(overrides=...).
+
+Uso independiente:
+    python benchmarks/stub_servers.py --port 8089 --latency 0.05
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOSTS = ("duckduckgo.com", "es.wikipedia.org", "en.wikipedia.org", "wttr.in", "news.google.com",
+         "api.exchangerate-api.com")
+
+LLM_TEXT = ("LoRa es una tecnología de comunicación inalámbrica de largo alcance y bajo consumo. "
+            "Permite enviar pequeños paquetes de datos a varios kilómetros de distancia usando "
+            "la modulación de espectro ensanchado por chirp. Es muy usada en la Internet de las cosas.")
+TRIVIA_TEXT = ("¿Qué significa LoRa?\nA) Low Rate\nB) Long Range\nC) Local Radio\nD) Long Radio\n"
+               "Respuesta: B")
+DDG_HTML = ('<html><body><div class="result"><a rel="nofollow" class="result__a" '
+            'href="//duckduckgo.com/l/?uddg=https%3A%2F%2Fes.wikipedia.org%2Fwiki%2FLoRa">'
+            '<b>LoRa</b> - Wikipedia, la enciclopedia libre</a></div></body></html>')
+NEWS = [f"Titular de prueba número {i} sobre la actualidad del país" for i in range(1, 11)]
+RATES = {"USD": 0.0588, "EUR": 0.0541, "JPY": 8.6712, "GBP": 0.0463, "MXN": 1.0, "CLP": 55.2}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como los servicios reales
+    latency = 0.05
+    token_delay = 0.01
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, ctype="application/json", status=200):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path
+        if path.startswith("/html/"):
+            self._reply(DDG_HTML, "text/html")
+        elif path.startswith("/api/rest_v1/page/summary/"):
+            title = path.rsplit("/", 1)[1]
+            self._reply(json.dumps({"title": title, "extract": LLM_TEXT * 2}))
+        elif path.startswith("/rss"):
+            items = "".join(f"<item><title>{t}</title></item>" for t in NEWS)
+            self._reply(f'<?xml version="1.0"?><rss><channel>{items}</channel></rss>', "application/xml")
+        elif path.startswith("/v4/latest/"):
+            base = path.rsplit("/", 1)[1]
+            ref = RATES.get(base, 1.0)
+            self._reply(json.dumps({"base": base, "rates": {code: rate / ref for code, rate in RATES.items()}}))
+        elif path.startswith("/v1/models"):
+            self._reply(json.dumps({"data": [{"id": "stub-model"}]}))
+        else:  # wttr.in: /<ciudad>?format=3
+            city = path[1:].split("?")[0]
+            self._reply(f"{city}: ⛅️  +18°C", "text/plain")
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = req["messages"][0]["content"]
+        text = TRIVIA_TEXT if "trivia" in prompt.lower() else LLM_TEXT
+        if not req.get("stream"):
+            self._reply(json.dumps({"choices": [{"message": {"content": text}}]}))
+            return
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for word in text.split(" "):
+                event = {"choices": [{"delta": {"content": word + " "}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                time.sleep(self.token_delay)
+            self._chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):  # el BBS cortó la respuesta ('stop')
+            pass
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def serve(port=0, latency=0.05, token_delay=0.01, ready=None):
+    StubHandler.latency = latency
+    StubHandler.token_delay = token_delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_process(latency=0.05, token_delay=0.01):
+    """Arranca los stubs en otro proceso (su CPU no cuenta en la del BBS). Devuelve (proceso, puerto)."""
+    ready = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=serve, args=(0, latency, token_delay, ready), daemon=True)
+    proc.start()
+    return proc, ready.get(timeout=10)
+
+
+def overrides(port, lm_host):
+    """Mapa host -> stub para HttpPool(overrides=...)."""
+    return {host: f"http://127.0.0.1:{port}" for host in HOSTS + (lm_host,)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidores de prueba para el BBS")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", type=float, default=0.05, help="segundos por respuesta")
+    ap.add_argument("--token-delay", type=float, default=0.01, help="segundos entre tokens del LLM")
+    args = ap.parse_args()
+    print(f"[*] Stubs en 127.0.0.1:{args.port}")
+    serve(args.port, args.latency, args.token_delay)
+
+
+if __name__ == "__main__":
+    main()
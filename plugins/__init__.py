@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+Opciones del menú de LoRa BBS Gateway, un módulo por opción (MIT, ver LICENSE).
+
+LoRaBBS.plugin(nombre) importa plugins/<nombre>.py la primera vez que alguien
+elige la opción (PLUGINS en bbs_server_rpi.py) y guarda la instancia de
+Plugin(bbs). Cada módulo define:
+ - enter() y handle(línea): el BBS llama a enter() al elegir la opción y a
+   handle() con cada línea hasta que devuelve False (una pregunta suelta, como
+   el término de una búsqueda, devuelve False tras la primera), sin ocupar un
+   hilo mientras el nodo no escribe; al salir vuelve a mandar el menú. Si
+   enter() devuelve False no se entra y la sesión vuelve al menú.
+ - run(): la opción entera con read_line_blocking() (enter() y handle() en
+   bucle), para quien no pasa por el menú (bbs_client.py --ratios).
+ - warm_targets() (opcional): consultas (fuente, clave, loader) para la precarga.
+ - logs() (opcional): registros AppendLog que flush_storage() debe vaciar.
+Los módulos en PLUGINS_DISABLED no se importan nunca y su opción sale del menú.
+"""
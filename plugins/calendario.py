@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Opción 9: calendario del mes actual y de cualquier año/mes."""
+import calendar
+from datetime import datetime
+
+# Nombres de meses en español (simple mapeo)
+MONTHS_ES = {1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril", 5: "Mayo", 6: "Junio",
+             7: "Julio", 8: "Agosto", 9: "Septiembre", 10: "Octubre", 11: "Noviembre", 12: "Diciembre"}
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+        # Configurar calendario con domingo como primer día (firstweekday=7)
+        self.cal = calendar.TextCalendar(firstweekday=7)
+
+    def format_month(self, year, month):
+        month_cal = self.cal.formatmonth(year, month, w=2, l=1)  # w=2 ancho día, l=1 líneas
+        # Reemplazar headers en inglés por español abreviado (D L M M J V S)
+        spanish_days = " D  L  M  M  J  V  S"
+        month_cal = month_cal.replace("Mo Tu We Th Fr Sa Su", spanish_days)
+        return month_cal.replace("Mo", " L").replace("Tu", " M").replace("We", " M").replace("Th", " J").replace("Fr", " V").replace("Sa", " S").replace("Su", " D")
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send_verbose("=== 📅 Calendario ===\n")
+        # Obtener mes actual
+        now = datetime.now()
+        year, month = now.year, now.month
+        month_name = MONTHS_ES.get(month, f"Mes {month}")
+        #self.bbs.send(f"{month_name} {year}\n")
+        self.bbs.send(self.format_month(year, month))
+        self.bbs.send(f"\nMes actual: {month_name} {year}\n")
+        self.bbs.send_verbose("Ingresa año y mes (ej: 2025 12) para ver otro, o 'salir':\n", "año mes | salir\n")
+        self.bbs.send("> ")
+
+    def handle(self, line):
+        """'año mes' muestra ese mes; False con 'salir'."""
+        if not line:
+            return True
+        cmd = line.strip().lower()
+        if cmd == "salir":
+            self.bbs.send_verbose("Saliendo del calendario.\n")
+            return False
+        parts = line.strip().split()
+        if len(parts) == 2:
+            try:
+                y, m = int(parts[0]), int(parts[1])
+                if 1 <= m <= 12:
+                    self.bbs.send(self.format_month(y, m))
+                else:
+                    self.bbs.send("Mes inválido (1-12).\n")
+            except ValueError:
+                self.bbs.send("Formato inválido. Usa: año mes (ej: 2025 12)\n")
+        self.bbs.send_verbose("Ingresa año y mes o 'salir':\n")
+        self.bbs.send("> ")
+        return True
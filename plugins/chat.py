@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Opción 6: sala pública y mensajes privados (buzón paginado con 'ack')."""
+import time
+
+from bbs_server_rpi import CHAT_LIVE, CHAT_NEW_PAGE
+
+
+class Plugin:
+    def __init__(self, bbs, chat_public=None, mailbox=None, cursors=None):
+        self.bbs = bbs
+        if chat_public is None:
+            chat_public, mailbox, cursors = bbs.chat_store()  # los mismos que usa el login
+        self.chat_public = chat_public
+        self.mailbox = mailbox
+        self.cursors = cursors
+        self.bbs.index_log("chat", self.chat_public)
+
+    def logs(self):
+        return [self.chat_public, self.mailbox.log, self.cursors.log]
+
+    def unseen(self, user):
+        """(cursor, mensajes públicos posteriores) de user."""
+        return self.cursors.unseen(user, len(self.chat_public))
+
+    def show_new(self):
+        """'new': la siguiente página de mensajes públicos que el usuario no ha visto."""
+        name = self.bbs.session_name
+        pos, _ = self.unseen(name)
+        msgs = self.chat_public[pos:pos + CHAT_NEW_PAGE]
+        if not msgs:
+            self.bbs.send("No hay mensajes nuevos.\n")
+            return
+        self.bbs.send_verbose(f"Sala pública (nuevos: {len(msgs)}):\n---\n", "Nuevos:\n")
+        for msg in msgs:
+            self.bbs.send(f"{msg}\n")
+        pos += len(msgs)
+        self.cursors.advance(name, pos)
+        rest = len(self.chat_public) - pos
+        self.bbs.send_verbose(f"---\n(Quedan {rest}: 'new' para seguir)\n" if rest else "---\n",
+                              f"({rest} más)\n" if rest else "")
+
+    def listeners(self):
+        """Otras sesiones en la sala (misma opción del menú que quien publica) suscritas en vivo."""
+        me = self.bbs.session
+        with self.bbs.sessions_lock:
+            return [s for s in self.bbs.sessions.values()
+                    if s is not me and s.live and s.name and s.option == me.option]
+
+    def publish(self, msg):
+        """Guarda un mensaje público y lo difunde en vivo. Quien lo publica y el terminal conectado
+        directamente lo dan por leído si estaban al día; los nodos no, porque la trama de difusión
+        no se confirma y puede perderse: lo verán con 'new'."""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        entry = f"[{timestamp}] {self.bbs.session_name}: {msg}"
+        before = len(self.chat_public)
+        self.chat_public.append(entry)
+        self.bbs.index_log("chat", self.chat_public)
+        listeners = self.listeners() if CHAT_LIVE else []
+        self.bbs.send_broadcast(f"{entry}\n", listeners)
+        for name in {self.bbs.session_name} | {s.name for s in listeners if s.addr is None}:
+            if self.unseen(name)[0] >= before:
+                self.cursors.advance(name, before + 1)
+
+    def set_live(self, args):
+        """'live [on|off]': recibir (o no) los mensajes públicos al momento mientras se está en la sala."""
+        sess = self.bbs.session
+        if args in ("on", "off"):
+            sess.live = args == "on"
+            self.bbs.send_live(sess.live and CHAT_LIVE)
+        elif args:
+            self.bbs.send("Uso: live [on|off]\n")
+            return
+        state = "activada" if sess.live and CHAT_LIVE else "desactivada"
+        self.bbs.send(f"Sala en vivo {state}.\n")
+
+    def show_private(self, restart=False):
+        """Muestra la siguiente página del buzón de la sesión ('viewprivate' / 'next')."""
+        sess = self.bbs.session
+        if restart:
+            sess.mail_after = 0
+        msgs, rest = self.mailbox.page(sess.name, sess.mail_after)
+        if not msgs:
+            self.bbs.send("No hay mensajes privados pendientes.\n" if restart else "No hay más mensajes.\n")
+            return
+        self.bbs.send_verbose("Mensajes privados pendientes:\n---\n", "Privados:\n")
+        for rec in msgs:
+            self.bbs.send(f"#{rec['id']} {rec['from']}: {rec['msg']}\n")
+        sess.mail_after = msgs[-1]["id"]
+        sess.mail_shown.extend(rec["id"] for rec in msgs)
+        self.bbs.send_verbose(f"---\n(Quedan {rest}: 'next' para seguir. 'ack' borra los ya leídos)\n"
+                              if rest else "---\n('ack' borra los ya leídos, 'ack <id>' uno concreto)\n",
+                              f"({rest} más)\n" if rest else "")
+
+    def ack_private(self, args):
+        """'ack' borra los privados mostrados; 'ack <id> ...' solo esos."""
+        sess = self.bbs.session
+        try:
+            ids = [int(a.lstrip("#")) for a in args.split()] if args.strip() else list(sess.mail_shown)
+        except ValueError:
+            self.bbs.send("Uso: ack [id ...]\n")
+            return
+        n = self.mailbox.ack(sess.name, ids)
+        sess.mail_shown = [i for i in sess.mail_shown if i not in ids]
+        self.bbs.send(f"{n} mensajes borrados.\n")
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send_verbose("=== Modo Chat/Foro ===\n"
+                              "Comandos:\n"
+                              "- public <mensaje>: Postear en sala pública\n"
+                              "- to <usuario> <mensaje>: Enviar privado (se guarda si no está presente)\n"
+                              "- getusers: Listar usuarios presentes\n"
+                              "- viewpublic: Ver últimos 10 mensajes públicos\n"
+                              "- new: Ver mensajes públicos desde tu última visita (de a 10; 'new' sigue)\n"
+                              "- live [on|off]: Recibir al momento los mensajes públicos mientras estás aquí\n"
+                              "- viewprivate: Ver privados pendientes (de a 5; 'next' sigue)\n"
+                              "- ack [id ...]: Borrar privados ya leídos\n"
+                              "- search <término>: Buscar en la sala pública\n"
+                              "- salir: Volver al menú\n",
+                              "Chat: public|to|getusers|viewpublic|new|live|viewprivate|next|ack|search|salir\n")
+        self.bbs.send_live(self.bbs.session.live and CHAT_LIVE)
+        self.bbs.send("> ")
+
+    def handle(self, line):
+        """Una línea en la sala. False al salir (el BBS vuelve al menú)."""
+        if not line:
+            return True
+        cmd = line.strip()
+        if cmd.lower() == "salir":
+            self.bbs.send_live(False)
+            self.bbs.send_verbose("Saliendo del modo Chat/Foro.\n")
+            return False
+        elif cmd == "getusers":
+            if self.bbs.online_users:
+                self.bbs.send(f"Usuarios presentes: {', '.join(sorted(self.bbs.online_users))}\n")
+            else:
+                self.bbs.send("No hay usuarios presentes.\n")
+        elif cmd == "viewpublic":
+            if self.chat_public:
+                total = len(self.chat_public)
+                recent = self.chat_public[-10:]
+                self.bbs.send("Sala pública (últimos 10):\n---\n")
+                for msg in recent:
+                    self.bbs.send(f"{msg}\n")
+                self.bbs.send("---\n")
+                if self.unseen(self.bbs.session_name)[0] >= total - len(recent):
+                    self.cursors.advance(self.bbs.session_name, total)  # ya vio todo lo nuevo
+            else:
+                self.bbs.send("Sala pública vacía.\n")
+        elif cmd == "new":
+            self.show_new()
+        elif cmd == "live" or cmd.startswith("live "):
+            self.set_live(cmd[4:].strip().lower())
+        elif cmd == "viewprivate":
+            self.show_private(restart=True)
+        elif cmd == "next":
+            self.show_private()
+        elif cmd == "ack" or cmd.startswith("ack "):
+            self.ack_private(cmd[3:])
+        elif cmd.lower() == "search" or cmd.lower().startswith("search "):
+            self.bbs.search_posts(cmd[6:].strip(), {"chat": self.chat_public})
+        elif cmd.startswith("public "):
+            msg = cmd[7:].strip()
+            if msg:
+                self.publish(msg)
+                self.bbs.send("Mensaje enviado a la sala pública.\n")
+            else:
+                self.bbs.send("Mensaje vacío, ignoro.\n")
+        elif cmd.startswith("to "):
+            parts = cmd[3:].split(maxsplit=1)
+            if len(parts) != 2:
+                self.bbs.send("Uso: to <usuario> <mensaje>\n")
+                return True
+            target, msg = parts[0].strip(), parts[1].strip()
+            if not msg:
+                self.bbs.send("Mensaje vacío, ignoro.\n")
+                return True
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            stored_msg = f"[{timestamp}] {msg}"
+            self.mailbox.send(target, self.bbs.session_name, stored_msg)
+            if target in self.bbs.online_users:
+                self.bbs.send(f"Mensaje privado enviado a {target}.\n")
+            else:
+                self.bbs.send(f"{target} no está presente. Mensaje guardado para cuando se conecte.\n")
+        else:
+            self.bbs.send("Comando desconocido. Revisa la ayuda implícita con los comandos.\n")
+        return True
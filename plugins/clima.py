@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Opción 3: clima actual de una ciudad (wttr.in)."""
+import urllib.parse
+
+from bbs_server_rpi import WARM_CITIES, UpstreamError
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send("Ciudad para el clima:\n> ")
+
+    def handle(self, q):
+        """La ciudad: la consulta va como trabajo y se vuelve al menú."""
+        if q:
+            self.bbs.run_job(f"Clima: {q}", lambda job: self.get_weather(q))
+        else:
+            self.bbs.send("Sin entrada.\n")
+        return False
+
+    def warm_targets(self):
+        return [("weather", city, lambda c=city: self._fetch_weather(c)) for city in WARM_CITIES]
+
+    def get_weather(self, city):
+        try:
+            return self.bbs.cached("weather", city, lambda: self._fetch_weather(city))
+        except Exception as e:
+            return f"Error clima: {e}\n"
+
+    def _fetch_weather(self, city):
+        path = f"/{urllib.parse.quote(city)}?format=3"
+        status, reason, data = self.bbs.http.request("GET", "wttr.in", path, timeout=6)
+        if status != 200:
+            raise UpstreamError(f"Error clima: {status} {reason}\n")
+        return f"{data.decode('utf-8', errors='ignore')}\n"
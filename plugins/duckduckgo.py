@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Opción 1: primer resultado de DuckDuckGo (scraping de la versión HTML)."""
+from bbs_server_rpi import UpstreamError
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send("Término para buscar (DuckDuckGo):\n> ")
+
+    def handle(self, q):
+        """El término: la búsqueda va como trabajo y se vuelve al menú."""
+        if q:
+            self.bbs.run_job(f"DuckDuckGo: {q}", lambda job: self.search_duckduckgo(q))
+        else:
+            self.bbs.send("Sin entrada.\n")
+        return False
+
+    def search_duckduckgo(self, query):
+        try:
+            return self.bbs.cached("duckduckgo", query, lambda: self._fetch_duckduckgo(query))
+        except UpstreamError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error DuckDuckGo: {e}\n"
+
+    def _fetch_duckduckgo(self, query):
+        import urllib.parse
+        import re
+
+        q = urllib.parse.quote_plus(query)
+        headers = {
+            "User-Agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/120.0.0.0 Safari/537.36"
+            ),
+            "Accept-Language": "es-ES,es;q=0.9"
+        }
+
+        status, reason, raw = self.bbs.http.request("GET", "duckduckgo.com", f"/html/?q={q}&kl=es-es",
+                                                    headers=headers, timeout=10)
+
+        if status != 200:
+            raise UpstreamError(f"Error de servidor DuckDuckGo: {status} {reason}\n")
+
+        html = raw.decode('utf-8', errors='ignore')
+
+        # Patrón robusto: cualquier <a> que sea un resultado de búsqueda
+        pattern = (
+            r'<a[^>]+class="[^"]*result__a[^"]*"[^>]+href="([^"]+)"[^>]*>'
+            r'(.*?)</a>'
+        )
+
+        matches = re.findall(pattern, html, re.S | re.I)
+
+        # fallback: intentar encontrar la primera coincidencia aunque sea parcial
+        if not matches:
+            fb = re.search(pattern, html, re.S | re.I)
+            if fb:
+                matches = [(fb.group(1), fb.group(2))]
+
+        if not matches:
+            return "No se encontraron resultados.\n"
+
+        link_raw, title_raw = matches[0]
+
+        # Limpieza del título
+        title = re.sub(r'<.*?>', '', title_raw)
+        title = re.sub(r'\s+', ' ', title).strip()
+        if len(title) > 200:
+            title = title[:200] + "..."
+
+        # Normalización del enlace
+        link = link_raw.strip()
+
+        # Formatos típicos de DuckDuckGo
+        if link.startswith('//'):
+            link = "https:" + link
+        elif link.startswith('/l/?uddg='):
+            # Redirección codificada
+            target = link.split("uddg=", 1)[1]
+            link = urllib.parse.unquote(target)
+        elif link.startswith('/'):
+            link = "https://duckduckgo.com" + link
+
+        return f"{title}\n{link}\n"
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Opción 5: consultas al LLM local (LM Studio) con respuesta en streaming.
+
+get_llm_models() y call_llm() también los usa el plugin de trivia. Las
+respuestas completas se guardan en la caché (fuente "llm") por modelo y
+prompt normalizado; call_llm() no pasa por ella (la trivia necesita una
+pregunta distinta cada vez).
+"""
+import json
+import re
+import time
+
+from bbs_server_rpi import (
+    LLM_MAX_BYTES, LLM_MAX_TOKENS, LLM_STREAM_CHUNK, LLM_STREAM_FLUSH, LLM_TIMEOUT, LM_BASE_URL, fold_text, utf8_cut,
+)
+
+
+def prompt_key(model, prompt):
+    """Clave de caché: modelo y prompt sin mayúsculas, tildes, signos ni espacios de más
+    ("Qué es LoRa?" y "que es lora" son la misma). "" si el prompt no tiene palabras."""
+    words = re.findall(r"\w+", fold_text(prompt))
+    return f"{model.strip().lower()}|{' '.join(words)}" if words else ""
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def run(self):
+        if self.enter() is False:
+            return
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        models, err = self.get_llm_models()
+        if err:
+            self.bbs.send(err)
+            return False
+        if not models:
+            self.bbs.send("No hay modelos disponibles.\n")
+            return False
+        self.bbs.session.llm_model = None
+        self.offer_models(models, "Selecciona modelo (número o nombre):\n> ")
+
+    def offer_models(self, models, ask):
+        """Lista los modelos; la próxima línea de la sesión es la elección (ver choose_model)."""
+        self.bbs.session.llm_models = models
+        self.bbs.send("Modelos disponibles:\n")
+        for i, m in enumerate(models):
+            self.bbs.send(f"{i+1}) {m}\n")
+        self.bbs.send(ask)
+
+    def choose_model(self, choice):
+        """Número o nombre del modelo. Sin elección al entrar vuelve al menú; al cambiar, sigue el anterior."""
+        sess = self.bbs.session
+        models, sess.llm_models = sess.llm_models, []
+        if choice.isdigit() and 1 <= int(choice) <= len(models):
+            choice = models[int(choice)-1]
+        if sess.llm_model is None:
+            if not choice:
+                self.bbs.send("Sin selección.\n")
+                return False
+            self.bbs.send(f"\nUsando modelo: {choice}\n")
+            self.bbs.send_verbose("Comandos: 'modelos' para cambiar, 'limite <tokens> [bytes]', 'stop' para cortar "
+                                  "una respuesta, 'more'/'skip' para paginar, '!<prompt>' para no usar una respuesta "
+                                  "guardada, 'salir'/'quit' para volver al menú\n",
+                                  "modelos | limite | stop | more | skip | !prompt | salir\n")
+        elif choice:
+            self.bbs.send(f"Modelo cambiado a: {choice}\n")
+        sess.llm_model = choice or sess.llm_model
+        self.bbs.send("Prompt:\n> ")
+        return True
+
+    def handle(self, line):
+        """Una línea en el modo LLM: la elección de modelo pendiente o un prompt. False al salir."""
+        sess = self.bbs.session
+        if sess.llm_models:
+            return self.choose_model(line.strip())
+        prompt, p_lower = line, line.lower().strip()
+        if not p_lower:
+            pass
+        elif p_lower in ("salir", "quit"):
+            self.bbs.send_verbose("Saliendo del modo LLM...\n")
+            return False
+        elif re.fullmatch(r"limite(\s+\d+){0,2}", p_lower):  # "limites de LoRa" es un prompt
+            self.set_llm_limits(p_lower[6:])
+        elif p_lower in ("modelos", "modelo", "cambiar"):
+            models, err = self.get_llm_models()
+            if err or not models:
+                self.bbs.send(err or "No hay modelos disponibles.\n")
+            else:
+                self.offer_models(models, "Selecciona nuevo modelo:\n> ")
+                return True
+        else:
+            model = sess.llm_model
+            fresh = prompt.startswith("!")  # '!<prompt>': pedir al LLM aunque haya respuesta guardada
+            prompt = prompt[1:].strip() if fresh else prompt
+            answer = None if fresh else self.cached_answer(model, prompt)
+            if answer is not None:
+                self.bbs.page_start(behind=True)
+                self.bbs.send_paged(answer)
+            else:
+                self.bbs.run_stream_job(f"LLM {model}: {prompt[:40]}",
+                                        lambda job, m=model, p=prompt: self._llm_stream_job(job, m, p))
+            self.bbs.send_verbose("(Escribe otro prompt, 'modelos' para cambiar o 'salir'/'quit' para volver)\n")
+        self.bbs.send("Prompt:\n> ")
+        return True
+
+    def get_llm_models(self):
+        try:
+            status, _, raw = self.bbs.http.request("GET", LM_BASE_URL, "/v1/models", timeout=8, https=False)
+            raw = raw.decode('utf-8', errors='ignore')
+            if status != 200:
+                return [], f"Error al obtener modelos ({status})\n"
+            j = json.loads(raw)
+            if isinstance(j, dict) and "data" in j:
+                models = [m.get("id", "sin_id") for m in j["data"]]
+            elif isinstance(j, list):
+                models = [m.get("id", "sin_id") for m in j]
+            else:
+                models = ["modelo_por_defecto"]
+            return models, ""
+        except Exception as e:
+            return [], f"Error LLM/models: {e}\n"
+
+    def cached_answer(self, model, prompt):
+        """Respuesta guardada para el mismo modelo y un prompt equivalente, recortada al tope de
+        bytes de la sesión y con su edad; None si no hay."""
+        key = prompt_key(model, prompt)
+        hit = self.bbs.cache.get("llm", key) if key else None
+        if hit is None:
+            return None
+        text, age = hit
+        max_bytes = self.bbs.session.llm_max_bytes
+        raw = text.encode('utf-8')
+        if len(raw) > max_bytes:
+            text = (raw[:utf8_cut(raw, max_bytes)].decode('utf-8', errors='ignore')
+                    + f"\n[respuesta recortada a {max_bytes} bytes]\n")
+        when = f"{int(age // 3600)} h" if age >= 2 * 3600 else f"{int(age // 60)} min"
+        return text + f"(respuesta guardada hace {when})\n"
+
+    def call_llm(self, model, prompt):
+        try:
+            payload = {
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 4096  # Aumentado para respuestas más largas; ajusta según el modelo si es necesario
+            }
+            body = json.dumps(payload)
+            headers = {"Content-Type": "application/json"}
+            with self.bbs.http.open("POST", LM_BASE_URL, "/v1/chat/completions", body, headers,
+                                    timeout=LLM_TIMEOUT, https=False) as resp:
+                # Leer la respuesta completa hasta EOF
+                chunks = []
+                while True:
+                    chunk = resp.read(4096)  # Leer en chunks para manejar respuestas muy grandes
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                status = resp.status
+            raw = b"".join(chunks).decode('utf-8', errors='ignore')
+            if status != 200:
+                return f"Error LLM ({status}): {raw}\n"
+            j = json.loads(raw)
+            text = None
+            if "choices" in j and len(j["choices"]) > 0:
+                c = j["choices"][0]
+                if isinstance(c, dict) and "message" in c and "content" in c["message"]:
+                    text = c["message"]["content"]
+                elif "text" in c:
+                    text = c["text"]
+            if not text:
+                text = json.dumps(j)
+            # Sin truncado: retorna el texto completo
+            return text + "\n"
+        except Exception as e:
+            return f"Error LLM/chat: {e}\n"
+
+    def stream_llm(self, model, prompt, on_text, cancelled=None,
+                   max_tokens=LLM_MAX_TOKENS, max_bytes=LLM_MAX_BYTES):
+        """Completion en streaming (SSE): pasa el texto a on_text en trozos de ~LLM_STREAM_CHUNK
+        bytes según llega. Se corta si se activa `cancelled` o se supera max_bytes.
+        Devuelve el texto completo enviado; si llegó entero, lo guarda en la caché."""
+        parts, pending = [], []
+        pending_len = total = 0
+        last = time.monotonic()
+        note = ""
+        finish = None
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        # Si se corta antes del final (stop, tope de bytes) el pool cierra la conexión
+        with self.bbs.http.open("POST", LM_BASE_URL, "/v1/chat/completions", json.dumps(payload),
+                                {"Content-Type": "application/json"}, timeout=LLM_TIMEOUT, https=False) as resp:
+            if resp.status != 200:
+                text = f"Error LLM ({resp.status}): {resp.read().decode('utf-8', errors='ignore')}\n"
+                on_text(text)
+                return text
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    note = "\n[interrumpido]\n"
+                    break
+                line = resp.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                try:
+                    choice = json.loads(data)["choices"][0]
+                    delta = choice.get("delta", {}).get("content") or ""
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                finish = choice.get("finish_reason") or finish
+                raw = delta.encode('utf-8')
+                if total + len(raw) > max_bytes:
+                    raw = raw[:utf8_cut(raw, max_bytes - total)]
+                    delta = raw.decode('utf-8', errors='ignore')
+                    note = f"\n[respuesta recortada a {max_bytes} bytes]\n"
+                parts.append(delta)
+                pending.append(delta)
+                pending_len += len(raw)
+                total += len(raw)
+                if note:
+                    break
+                if pending_len >= LLM_STREAM_CHUNK or time.monotonic() - last >= LLM_STREAM_FLUSH:
+                    on_text("".join(pending))
+                    pending, pending_len = [], 0
+                    last = time.monotonic()
+            if not note:
+                resp.read()  # consumir el resto del cuerpo para reutilizar la conexión
+        pending.append(note or "\n")
+        parts.append(note or "\n")
+        on_text("".join(pending))
+        key = prompt_key(model, prompt)
+        if key and not note and finish != "length":  # ni cortada (stop, bytes) ni agotados los tokens
+            self.bbs.cache.put("llm", key, "".join(parts))
+        return "".join(parts)
+
+    def _llm_stream_job(self, job, model, prompt):
+        """Trabajo de LLM en streaming: transmite mientras la sesión siga conectada; si se
+        desconecta, el texto completo queda como resultado para entregarlo después."""
+        sess = job.sess
+        missed = []
+        self.bbs.page_start(sess, behind=True)
+
+        def on_text(text):
+            with self.bbs.sessions_lock:
+                live = self.bbs.sessions.get(sess.key) is sess
+            if live:
+                self.bbs.send_paged(text, sess)
+            else:
+                missed.append(text)
+        try:
+            text = self.stream_llm(model, prompt, on_text, job.cancelled, sess.llm_max_tokens, sess.llm_max_bytes)
+        except Exception as e:
+            text = f"Error LLM/chat: {e}\n"
+            on_text(text)
+        return text if missed else ""
+
+    def set_llm_limits(self, args):
+        """'limite <tokens> [bytes]' en el modo LLM."""
+        sess = self.bbs.session
+        parts = args.split()
+        if parts and all(p.isdigit() and int(p) > 0 for p in parts[:2]):
+            sess.llm_max_tokens = int(parts[0])
+            if len(parts) > 1:
+                sess.llm_max_bytes = int(parts[1])
+        else:
+            self.bbs.send("Uso: limite <tokens> [bytes]\n")
+        self.bbs.send(f"Límite: {sess.llm_max_tokens} tokens, {sess.llm_max_bytes} bytes\n")
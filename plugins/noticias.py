@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Opción 4: titulares de Google News por país (RSS)."""
+import xml.etree.ElementTree as ET
+
+from bbs_server_rpi import WARM_COUNTRIES, UpstreamError
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send("País para ver noticias:\n>")
+
+    def handle(self, q):
+        """El país: la consulta va como trabajo y se vuelve al menú."""
+        if q:
+            self.bbs.run_job(f"Noticias: {q}", lambda job: self.get_news_google_rss(q))
+        else:
+            self.bbs.send("Sin entrada.\n")
+        return False
+
+    def warm_targets(self):
+        targets = []
+        for country in WARM_COUNTRIES:
+            code, hl = self._news_code(country)
+            if code:
+                targets.append(("news", f"{code}:{hl}", lambda c=country, k=code, h=hl: self._fetch_news(c, k, h)))
+        return targets
+
+    def get_news_google_rss(self, country, hl="es-419"):
+        code, hl = self._news_code(country, hl)
+        if code is None:
+            return f"País no reconocido: '{country}'. Usa ej. 'México', 'España', 'USA'.\n"
+        try:
+            return self.bbs.cached("news", f"{code}:{hl}", lambda: self._fetch_news(country, code, hl))
+        except UpstreamError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error noticias: {e}\n"
+
+    @staticmethod
+    def _news_code(country, hl="es-419"):
+        """(código de país, idioma) para Google News, o (None, hl) si no se reconoce."""
+        # Mapeo de nombres de países comunes a códigos ISO (gl y ceid)
+        country_to_code = {
+            "México": "MX", "Mexico": "MX","MX":"MX",
+            "Estados Unidos": "US", "USA": "US", "United States": "US",
+            "España": "ES", "Spain": "ES",
+            "Argentina": "AR",
+            "Brasil": "BR", "Brazil": "BR",
+            "Chile": "CL",
+            "China":"CH",
+            "Colombia": "CO",
+            "Cuba":"CU","CU":"CU",
+            "Perú": "PE", "Peru": "PE",
+            "Puerto Rico":"PR",
+            "Venezuela": "VE",
+            "Francia": "FR", "France": "FR",
+            "Alemania": "DE", "Germany": "DE",
+            "Reino Unido": "GB", "UK": "GB", "United Kingdom": "GB",
+            "Italia": "IT", "Italy": "IT",
+            "Canadá": "CA", "Canada": "CA",
+            "Australia": "AU"            
+        }
+        code = country_to_code.get(country.title().strip(), None)
+        # Ajustar hl según el país (español para América Latina, es-ES para España)
+        if code == "ES":
+            hl = "es-ES"
+        return code, hl
+
+    def _fetch_news(self, country, code, hl):
+        _, _, xml_data = self.bbs.http.request("GET", "news.google.com", f"/rss?hl={hl}&gl={code}&ceid={code}:{hl}",
+                                               timeout=8)
+        xml_data = xml_data.decode('utf-8', errors='ignore')
+        try:
+            root = ET.fromstring(xml_data)
+        except ET.ParseError:
+            raise UpstreamError("Error al parsear el feed RSS.\n")
+        items = root.findall(".//item")[:10]
+        if not items:
+            return "No hay noticias disponibles para este país.\n"
+        out = f"Últimas noticias de {country.title()}:\n"
+        for it in items:
+            title = it.findtext("title", "Sin título")
+            out += f"- {title}\n"
+        return out
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Opción 7: tablón de anuncios por categorías."""
+import time
+
+from bbs_server_rpi import BOARD_CATEGORIES, BOARDS_LOG, AppendLog
+
+
+class Plugin:
+    def __init__(self, bbs, boards=None):
+        self.bbs = bbs
+        self.boards_file = BOARDS_LOG
+        self.boards = boards
+        if boards is None:
+            self.load_boards()
+        for cat, log in self.boards.items():
+            self.bbs.index_log(f"tablon:{cat}", log)
+
+    def logs(self):
+        return list(self.boards.values())
+
+    def load_boards(self):
+        # {categoria: AppendLog de {'user', 'msg', 'timestamp'}}
+        legacy = self.bbs._legacy_json(self.boards_file.format(BOARD_CATEGORIES[0]), "boards.json") or {}
+        self.boards = {cat: AppendLog(self.boards_file.format(cat)) for cat in BOARD_CATEGORIES}
+        for cat, posts in legacy.items():
+            if cat in self.boards:
+                for post in posts:
+                    self.boards[cat].append(post)
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send_verbose("=== Tablón de Anuncios ===\nCategorías: General, LoRa, Off-Topic\n"
+                              "Comandos: list (categorías), read <cat>, post <cat> <msg>, search <término>, salir\n",
+                              "Tablon: list|read <cat>|post <cat> <msg>|search <txt>|salir\n")
+        self.bbs.send("> ")
+
+    def handle(self, line):
+        """Una línea en el tablón. False al salir (el BBS vuelve al menú)."""
+        if not line:
+            return True
+        cmd = line.strip().lower()
+        if cmd == "salir":
+            self.bbs.send_verbose("Saliendo del tablón.\n")
+            return False
+        elif cmd == "list":
+            self.bbs.send(f"Categorías disponibles: {', '.join(self.boards.keys())}\n")
+        elif cmd.startswith("read "):
+            cat = cmd[5:].strip().title()
+            if cat in self.boards:
+                posts = self.boards[cat][-5:]  # Últimos 5
+                self.bbs.send(f"Tablón '{cat}' (últimos 5):\n---\n")
+                for post in posts:
+                    self.bbs.send(f"[{post['timestamp']}] {post['user']}: {post['msg']}\n")
+                self.bbs.send("---\n")
+            else:
+                self.bbs.send("Categoría no existe.\n")
+        elif cmd.startswith("post "):
+            parts = cmd[5:].split(maxsplit=1)
+            if len(parts) == 2:
+                cat, msg = parts[0].strip().title(), parts[1].strip()
+                if cat in self.boards and msg:
+                    ts = time.strftime("%Y-%m-%d %H:%M:%S")
+                    self.boards[cat].append({"user": self.bbs.session_name, "msg": msg, "timestamp": ts})
+                    self.bbs.index_log(f"tablon:{cat}", self.boards[cat])
+                    self.bbs.send("Post enviado.\n")
+                else:
+                    self.bbs.send("Categoría inválida o mensaje vacío.\n")
+            else:
+                self.bbs.send("Uso: post <cat> <msg>\n")
+        elif cmd == "search" or cmd.startswith("search "):
+            self.bbs.search_posts(line.strip()[6:].strip(),
+                                  {f"tablon:{cat}": log for cat, log in self.boards.items()})
+        else:
+            self.bbs.send("Comando desconocido.\n")
+        return True
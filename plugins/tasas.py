@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Opción 10: tasas de cambio y conversión entre monedas (exchangerate-api.com)."""
+import json
+import re
+
+from bbs_server_rpi import RATES_REFERENCE, UpstreamError
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def warm_targets(self):
+        return [("rates", RATES_REFERENCE, lambda: self._fetch_rates(RATES_REFERENCE))]
+
+    def fetch_rates(self, base_currency):
+        """(tasas de 1 base_currency en cada moneda, aviso de edad de los datos).
+
+        Solo se descarga la tabla de RATES_REFERENCE; cualquier otra base sale de
+        dividir por su tasa (tasa cruzada), sin más consultas a la API.
+        """
+        table, note = self.bbs.cached_note("rates", RATES_REFERENCE, lambda: self._fetch_rates(RATES_REFERENCE))
+        ref = table.get(base_currency) if table else None
+        if not ref:
+            return {}, note
+        return {code: rate / ref for code, rate in table.items()}, note
+
+    def _fetch_rates(self, base_currency):
+        # Fetch de exchangerate-api.com (gratuito, sin clave para uso básico)
+        status, reason, raw = self.bbs.http.request("GET", "api.exchangerate-api.com", f"/v4/latest/{base_currency}",
+                                                    timeout=10)
+        if status != 200:
+            raise UpstreamError(f"Error al obtener tasas: {status} {reason}\n")
+        data = json.loads(raw.decode('utf-8'))
+        return data.get('rates', {})
+
+    def convert_currency(self, amount, base, target):
+        """'100 USD MXN': importe convertido con la tasa cruzada."""
+        try:
+            rates, note = self.fetch_rates(base)
+        except Exception as e:
+            self.bbs.send(f"Error en tasas fiat: {e}\n")
+            return
+        if not rates:
+            self.bbs.send(f"Moneda '{base}' no disponible.\n")
+            return
+        if target not in rates:
+            self.bbs.send(f"Moneda '{target}' no disponible.\n")
+            return
+        value = amount * rates[target]
+        self.bbs.send(f"{amount:g} {base} = {value:.4f} {target}\n" if value < 100 else
+                      f"{amount:g} {base} = {value:,.2f} {target}\n")
+        self.bbs.send(note)
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send_verbose("=== 💱 Tasas de Cambio ===\n")
+        self.bbs.send_verbose("Ingresa el país (ej: México, España, USA, Japón)\n"
+                              "o monedas: 'EUR', 'EUR MXN', '100 USD MXN':\n", "País o monedas:\n")
+        self.bbs.send("> ")
+
+    def handle(self, line):
+        """País o monedas: muestra las tasas y vuelve al menú."""
+        country_input = line.strip()
+        if not country_input:
+            self.bbs.send("País no ingresado.\n")
+            return False
+
+        # Mapeo de países comunes a códigos de moneda base (ISO 4217)
+        country_to_currency = {
+            "México": "MXN", "Mexico": "MXN", "MX": "MXN",
+            "Cuba":"CUP",
+            "Estados Unidos": "USD", "USA": "USD", "United States": "USD", "US": "USD",
+            "España": "EUR", "Spain": "EUR", "ES": "EUR",
+            "Alemania": "EUR", "Germany": "EUR", "DE": "EUR",
+            "Francia": "EUR", "France": "EUR", "FR": "EUR",
+            "Italia": "EUR", "Italy": "EUR",
+            "Reino Unido": "GBP", "UK": "GBP", "United Kingdom": "GBP", "GB": "GBP",
+            "Japón": "JPY", "Japan": "JPY", "JP": "JPY",
+            "Argentina": "ARS", "AR": "ARS",
+            "Brasil": "BRL", "Brazil": "BRL", "BR": "BRL",
+            "Chile": "CLP", "CL": "CLP",
+            "Colombia": "COP", "CO": "COP",
+            "Perú": "PEN", "Peru": "PEN", "PE": "PEN",
+            "Venezuela": "VES", "VE": "VES",
+            "Canadá": "CAD", "Canada": "CAD", "CA": "CAD",
+            "Australia": "AUD", "AU": "AUD",
+            "China": "CNY", "CH": "CNY"
+        }
+        base_currency = country_to_currency.get(country_input.title(), None)
+        amount = 1.0
+        # Sin país conocido: códigos ISO 4217 con importe opcional ('EUR', '100 USD MXN', '5 eur a jpy')
+        m = re.fullmatch(r"(?:(\d+(?:[.,]\d+)?)\s+)?([A-Za-z]{3})(?:\s+(?:a\s+|en\s+)?([A-Za-z]{3}))?",
+                         country_input)
+        if not base_currency and m:
+            amount = float(m.group(1).replace(",", ".")) if m.group(1) else 1.0
+            base_currency = m.group(2).upper()
+            if m.group(3):
+                self.convert_currency(amount, base_currency, m.group(3).upper())
+                self.bbs.send_verbose("\nSaliendo de Tasas de Cambio.\n")
+                return False
+        if not base_currency:
+            self.bbs.send(f"País '{country_input}' no reconocido. Moneda base no disponible.\n")
+            self.bbs.send("Países disponibles: México, USA, España, UK, Japón, etc.\n")
+            return False
+
+        self.bbs.send(f"Moneda base para {country_input}: {base_currency}\n")
+        self.bbs.send_verbose("Obteniendo tasas... (usando API gratuita)\n")
+
+        # Monedas fiat objetivo
+        fiat_targets = {"USD": "Dólar EE.UU.", "EUR": "Euro", "JPY": "Yen Japonés", "GBP": "Libra Esterlina"}
+
+        try:
+            rates, note = self.fetch_rates(base_currency)
+            if not rates:
+                self.bbs.send(f"Moneda '{base_currency}' no disponible.\n")
+                return False
+
+            self.bbs.send("Tasas de cambio ({amount:g} {base} ≈):\n".format(amount=amount, base=base_currency))
+            for code, name in fiat_targets.items():
+                rate = rates.get(code, 0) * amount
+                if rate > 0:
+                    self.bbs.send(f"{name} ({code}): {rate:.4f}\n")
+                else:
+                    self.bbs.send(f"{name} ({code}): No disponible\n")
+            self.bbs.send(note)
+
+        except Exception as e:
+            self.bbs.send(f"Error en tasas fiat: {e}\n")
+            return False
+
+        # Opcional: Criptomonedas
+        """
+        self.bbs.send("\n¿Mostrar tasas a criptos (BTC, XMR, DASH, XRP)? (s/n):\n> ")
+        crypto_choice = self.bbs.read_line_blocking().strip().lower()
+        if crypto_choice in ('s', 'si', 'y', 'yes'):
+            self.bbs.send("Obteniendo tasas a criptos (usando CoinGecko API gratuita)...\n")
+            crypto_targets = {
+                "bitcoin": "BTC - Bitcoin",
+                "monero": "XMR - Monero",
+                "dash": "DASH - Dash",
+                "ripple": "XRP - Ripple"
+            }
+
+            try:
+                # Fetch de CoinGecko para precios en USD, luego convertir
+                # Primero, obtener precio de base en USD si no es USD
+                base_to_usd = 1.0 if base_currency == "USD" else rates.get("USD", 1.0)
+                usd_to_base = 1 / base_to_usd if base_to_base > 0 else 1.0
+
+                # IDs de CoinGecko para criptos
+                crypto_ids = "bitcoin,monero,dash,ripple"
+                url_crypto = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_ids}&vs_currencies=usd"
+                with urllib.request.urlopen(url_crypto, timeout=10) as response:
+                    crypto_data = json.loads(response.read().decode('utf-8'))
+
+                self.bbs.send("Tasas de cambio a criptos (1 {base} ≈):\n".format(base=base_currency))
+                for id_, name in crypto_targets.items():
+                    usd_price = crypto_data.get(id_, {}).get('usd', 0)
+                    if usd_price > 0:
+                        # crypto por base: (usd_price / base_to_usd)
+                        crypto_per_base = usd_price / base_to_usd
+                        self.bbs.send(f"{name}: {crypto_per_base:.8f}\n")
+                    else:
+                        self.bbs.send(f"{name}: No disponible\n")
+
+            except Exception as e:
+                self.bbs.send(f"Error en tasas cripto: {e}\n")
+                return
+        """
+        self.bbs.send_verbose("\nSaliendo de Tasas de Cambio.\n")
+        return False
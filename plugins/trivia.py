@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Opción 8: trivia con preguntas generadas por el LLM de antemano y corregidas localmente."""
+import collections
+import json
+import os
+import re
+import threading
+
+from bbs_server_rpi import TRIVIA_POOL_DEPTH, TRIVIA_POOL_FILE, TRIVIA_PROMPT, UpstreamError
+
+
+def parse_trivia(text):
+    """Separa la pregunta generada por el LLM de su línea 'Respuesta: X'.
+    Devuelve (pregunta con opciones, letra) o None si no tiene las 4 opciones y la respuesta."""
+    matches = list(re.finditer(r"^.*respuesta(?: correcta)?\W*([ABCD])\b.*$", text, re.I | re.M))
+    if not matches:
+        return None
+    m = matches[-1]
+    question = (text[:m.start()] + text[m.end():]).strip()
+    if not all(re.search(rf"^\W*{letter}\s*[).:-]", question, re.M) for letter in "ABCD"):
+        return None
+    return question, m.group(1).upper()
+
+
+class TriviaPool:
+    """Reserva de preguntas de trivia ya generadas y validadas.
+
+    take() saca una pregunta al instante y pide reponer en segundo plano hasta
+    tener `depth` preguntas; generate() devuelve el texto crudo del LLM.
+    """
+    def __init__(self, generate, depth=TRIVIA_POOL_DEPTH, path=TRIVIA_POOL_FILE):
+        self.generate = generate
+        self.depth = depth
+        self.path = path
+        self.lock = threading.Lock()
+        self.questions = collections.deque()  # [(pregunta, letra)]
+        self.refilling = False
+        self.generated = self.rejected = 0
+        self.load()
+
+    def __len__(self):
+        return len(self.questions)
+
+    def take(self):
+        """Pregunta lista (pregunta, letra) o None si la reserva está vacía."""
+        with self.lock:
+            item = self.questions.popleft() if self.questions else None
+        if item:
+            self.save()
+        self.refill()
+        return item
+
+    def generate_one(self):
+        """Genera y valida una pregunta; None si el LLM no devolvió una válida."""
+        item = parse_trivia(self.generate())
+        with self.lock:
+            self.generated += 1
+            if item is None:
+                self.rejected += 1
+        return item
+
+    def refill(self):
+        with self.lock:
+            if self.refilling or len(self.questions) >= self.depth:
+                return
+            self.refilling = True
+
+        def run():
+            failures = 0
+            try:
+                while len(self.questions) < self.depth and failures < 3:  # LLM caído: reintentar en el próximo take()
+                    try:
+                        item = self.generate_one()
+                    except Exception:
+                        item = None
+                    if item is None or item in self.questions:
+                        failures += 1
+                        continue
+                    failures = 0
+                    with self.lock:
+                        self.questions.append(item)
+                    self.save()
+            finally:
+                with self.lock:
+                    self.refilling = False
+        threading.Thread(target=run, daemon=True).start()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.questions.extend(tuple(item) for item in json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            rows = [list(item) for item in self.questions]
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[ERROR guardando trivia] {e}")
+
+
+class Plugin:
+    def __init__(self, bbs, pool=None):
+        self.bbs = bbs
+        self.trivia = pool
+        if pool is None:
+            self.trivia = TriviaPool(self._generate_trivia)
+            self.trivia.refill()
+
+    def run(self):
+        if self.enter() is False:
+            return
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send_verbose("=== Trivia Tech ===\nResponde preguntas generadas por LLM. ¡Acumula puntos!\n'salir' para parar.\n",
+                              "Trivia ('salir' para parar)\n")
+        self.bbs.score = 0
+        return self.ask()
+
+    def ask(self):
+        """Manda la siguiente pregunta y guarda su letra en la sesión. False si el LLM falla."""
+        item = self.trivia.take()
+        if item is None:  # reserva vacía: generar en el momento
+            self.bbs.send_verbose("Generando pregunta...\n")
+            try:
+                item = self.trivia.generate_one()
+            except Exception:
+                item = None
+            if item is None:
+                self.bbs.send("Error en LLM. Juego cancelado.\n")
+                self.bbs.send(f"¡Fin del juego! Puntuación final: {self.bbs.score}\n")
+                return False
+        question, self.bbs.session.trivia_answer = item
+        self.bbs.send(f"Pregunta:\n{question}\nTu respuesta (A/B/C/D): ")
+        return True
+
+    def handle(self, line):
+        """La respuesta a la pregunta en curso; False con 'salir' o si no hay más preguntas."""
+        ans = line.strip().upper()
+        if ans.lower() == 'salir':
+            self.bbs.send(f"¡Fin del juego! Puntuación final: {self.bbs.score}\n")
+            return False
+        # La letra correcta viene de la línea 'Respuesta: X': sin segunda consulta al LLM
+        correct = self.bbs.session.trivia_answer
+        if ans[:1] == correct:
+            self.bbs.score += 1
+            self.bbs.send("¡Correcto! +1 punto.\n")
+        else:
+            self.bbs.send(f"Incorrecto, era la {correct}. Sigue intentándolo.\n")
+        self.bbs.send(f"Puntuación: {self.bbs.score}\n")
+        return self.ask()
+
+    def _generate_trivia(self):
+        llm = self.bbs.plugin("llm")
+        if llm is None:
+            raise UpstreamError("LLM desactivado\n")
+        models, err = llm.get_llm_models()
+        if err or not models:
+            raise UpstreamError(err or "Sin modelos LLM\n")
+        return llm.call_llm(models[0], TRIVIA_PROMPT)  # Usa el primero
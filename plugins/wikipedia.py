@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Opción 2: resumen de un artículo de Wikipedia (API REST)."""
+import json
+import urllib.parse
+
+from bbs_server_rpi import UpstreamError
+
+
+class Plugin:
+    def __init__(self, bbs):
+        self.bbs = bbs
+
+    def run(self):
+        self.enter()
+        while self.handle(self.bbs.read_line_blocking()):
+            pass
+
+    def enter(self):
+        self.bbs.send("Término para Wikipedia:\n> ")
+
+    def handle(self, q):
+        """El término: la búsqueda va como trabajo y se vuelve al menú."""
+        if q:
+            self.bbs.run_job(f"Wikipedia: {q}", lambda job: self.search_wikipedia(q))
+        else:
+            self.bbs.send("Sin entrada.\n")
+        return False
+
+    def search_wikipedia(self, term, lang="es"):
+        try:
+            return self.bbs.cached("wikipedia", f"{lang}:{term}", lambda: self._fetch_wikipedia(term, lang))
+        except UpstreamError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error Wikipedia: {e}\n"
+
+    def _fetch_wikipedia(self, term, lang):
+        # Encoding robusto para títulos con acentos/español
+        title = urllib.parse.quote(term.replace(" ", "_").encode('utf-8').decode('utf-8'))
+        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        status, _, raw = self.bbs.http.request("GET", f"{lang}.wikipedia.org", f"/api/rest_v1/page/summary/{title}",
+                                               headers=headers, timeout=10)
+        raw = raw.decode('utf-8', errors='ignore')
+        if status >= 500:
+            raise UpstreamError(f"Error de servidor Wikipedia ({status})\n")
+        if status != 200:
+            return f"No se encontró página para '{term}' ({status})\n"
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            raise UpstreamError(f"Respuesta inválida de Wikipedia para '{term}'\n")
+        summary = data.get("extract") or "Sin resumen disponible."
+        if len(summary) > 900:
+            summary = summary[:900] + "..."
+        return f"{summary}\n"